@@ -0,0 +1,90 @@
+# This file contains a benchmark of the rational arithmetic implementations (see Rationals)
+# on the stoichiometric matrix of the bundled Acinetobacter baumannii model. It times the
+# nullspace computation, the enzyme subset detection, peelOff and integralize with Fraction
+# and, where installed, with gmpy2 and python-flint, and checks that the results agree.
+# Usage: python3 BenchmarkRationals.py [model.xml] [--dense]
+# With --dense, the original dense Gauss-Jordan elimination is timed too (it takes minutes).
+# If libsbml is not installed, the matrix is read from the SBML file by readStoichiometry.
+
+import sys, time
+import xml.etree.ElementTree as ElementTree
+from ModelProcessing import *
+
+try:
+    from ModelParsing import parseSBML
+except ImportError:
+    parseSBML = None
+
+def readStoichiometry(Filename):
+    # This function reads the internal stoichiometric matrix of an SBML file with the standard
+    # library only. As in parseSBML, the species of the unique compartment whose name contains
+    # 'extra' or 'outside', if any, are external; the rows of the other species and the columns
+    # of the reactions are in the order of the file. Species are referenced by id or by name.
+    root = ElementTree.parse(Filename).getroot()
+    namespace = root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+    compartments = [comp.get('id', comp.get('name')) for comp in root.iter(namespace + 'compartment')]
+    extra = [comp for comp in compartments if 'extra' in comp.lower() or 'outside' in comp.lower()]
+    allSpecies = list(root.iter(namespace + 'species'))
+    internal = [species for species in allSpecies if len(extra) != 1 or species.get('compartment') != extra[0]]
+    index = {species.get('id', species.get('name')): ind for ind, species in enumerate(internal)}
+    reactions = list(root.iter(namespace + 'reaction'))
+    N = [[zero]*len(reactions) for species in internal]
+    for j, reaction in enumerate(reactions):
+        for (tag, sign) in [('listOfReactants', -1), ('listOfProducts', 1)]:
+            for part in reaction.iter(namespace + tag):
+                for item in part.iter(namespace + 'speciesReference'):
+                    name = item.get('species')
+                    if name in index:
+                        N[index[name]][j] += sign * convertToFraction(item.get('stoichiometry', '1'))
+    return N
+
+def timeCall(function, *args):
+    start = time.time()
+    result = function(*args)
+    return (result, time.time() - start)
+
+def runBenchmark(N):
+    # Returns the results and the timings of the benchmarked operations for the current settings
+    timings = {}
+    (B, timings['NullspaceBasis']) = timeCall(NullspaceBasis, N)
+    # as in reduceMatrix, the subsets are only looked for among the unblocked reactions
+    (subsets, timings['findSubsets']) = timeCall(findSubsets, [row for row in B if any(row)], True)
+    vectors = [{j: x for j, x in enumerate(column) if x} for column in transpose(B)]
+    (peeled, timings['peelOff']) = timeCall(lambda: [peelOff(vectors[i], vectors[:i]) for i in range(len(vectors))])
+    (integral, timings['integralize']) = timeCall(lambda: [integralize(row) for row in B if any(row)])
+    return ((B, subsets, peeled, integral), timings)
+
+def main(Filename, dense = False):
+    if parseSBML is not None:
+        N = parseSBML(Filename).Matrix
+    else:
+        print('Note: libsbml is not installed; reading the stoichiometric matrix directly')
+        N = readStoichiometry(Filename)
+    m, n = getSize(N)
+    print(('The internal matrix has ' + str(m) + ' metabolites and ' + str(n) + ' reactions'))
+    settings = [('fraction', 'bareiss'), ('fraction', 'sparse'), ('fraction', 'modular')]
+    if dense:
+        settings += [('fraction', 'dense')]
+    if gmpy2 is not None:
+        settings += [('gmpy2', 'bareiss'), ('gmpy2', 'sparse')]
+    else:
+        print('Note: gmpy2 is not installed')
+    if hasFlint():
+        settings += [('fraction', 'flint')]
+    else:
+        print('Note: python-flint is not installed')
+    reference = None
+    for (numbers, elimination) in settings:
+        setRationals(numbers)
+        setElimination(elimination)
+        (results, timings) = runBenchmark(N)
+        if reference is None:
+            reference = results
+        elif results != reference:
+            print(('Error: the results with ' + numbers + '/' + elimination + ' differ from the reference!'))
+        print((numbers + '/' + elimination + ': ' + ', '.join([key + ' ' + '%.2f' % value + 's' for key, value in timings.items()])))
+    return
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--dense']
+    main(args[0] if args else 'Acinetobacter Baumannii.xml', '--dense' in sys.argv[1:])
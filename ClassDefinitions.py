@@ -22,8 +22,14 @@ class Network:
         self.fullMatrix = None
         self.reducedMatrix = None
         self.reactionSubsets = None
+        self.reductionMemo = None
         self.biomassCoefficients = [zero] * len(self.reactions)
         self.description = description
+    def __getstate__(self):
+        # The reduction memo is only kept for the current session, since it can be large
+        state = dict(self.__dict__)
+        state['reductionMemo'] = None
+        return state
     def createMatrices(self):
         selfReacts = [reaction.pairs for reaction in self.reactions]
         numReacts = len(self.reactions)
@@ -40,13 +46,29 @@ class Network:
         else:
             checkAtomicBalance(allFormulas, self.reactions)
     def updateReduction(self):
+        # The linear programs of the successive updates are cached with the network (see useCache).
         if self.reducedMatrix is not None:
             print('Rerunning network reduction to update the reduced network.')
-            self.reduceNetwork('NewReduction.txt')
-    def reduceNetwork(self, filename = 'Reduction.txt'):
+            if getattr(self, 'lpCache', None) is None:
+                self.lpCache = LPCache()
+            previous = useCache(self.lpCache)
+            try:
+                self.reduceNetwork('NewReduction.txt', incremental = True)
+            finally:
+                restoreCache(previous)
+    def reduceNetwork(self, filename = 'Reduction.txt', incremental = False, checkpoint = None, workers = 0, cache = None):
+        # If incremental is True, the results of the previous reduction are reused for the
+        # parts of the network that have not changed since then (see ReductionMemo).
+        # If checkpoint is the name of a file, an interrupted reduction can be resumed from it.
+        # If workers > 1, the linear programs are solved by as many processes (see reduceMatrix).
+        # If cache is a ReductionCache, the reduction of an identical network is taken from it.
         N = self.Matrix
         Irr = self.findIrreversibleReactions()
-        reduction = reduceMatrix(N, Irr, filename)
+        memo = getattr(self, 'reductionMemo', None)
+        if not incremental or memo is None:
+            memo = ReductionMemo()
+        reduction = reduceMatrix(N, Irr, filename, workers = workers, memo = memo, checkpoint = checkpoint, cache = cache)
+        self.reductionMemo = memo
         self.applyReduction(reduction)
     def applyReduction(self, reducedMatrix):
         self.reducedMatrix = reducedMatrix[0]
@@ -0,0 +1,516 @@
+# This file contains the exact (rational arithmetic-based) elimination routines used by Mongoose
+# to compute echelon forms, pivot columns and nullspace bases of stoichiometric matrices.
+# The sparse routines store each row as a dictionary {column: value} of its nonzero entries,
+# so that their cost depends on the number of nonzeros and the fill-in rather than on m*n^2.
+
+import multiprocessing
+
+from functools import reduce
+from math import gcd, isqrt
+from fractions import Fraction
+from Utilities import *
+from Rationals import *
+
+zero, one = Fraction(0), Fraction(1)
+
+ELIMINATION = 'auto'
+MODULAR_WORKERS = 0
+
+def setElimination(method, workers = 0):
+    # Selects the elimination used by GaussJordan, NullspaceBasis and findRedundant in
+    # ModelProcessing: 'bareiss' (fraction-free, on integers), 'sparse' (on Fractions),
+    # 'auto' (the default: 'flint' if python-flint is installed, else 'bareiss' if the matrix
+    # integralizes, 'sparse' otherwise), 'flint' (see flintEchelon), 'modular' (modulo several
+    # primes, see modularEchelon; workers > 1 gives the number of processes among which the
+    # primes are split) or 'dense' (the original list-based Gauss-Jordan elimination).
+    global ELIMINATION, MODULAR_WORKERS
+    if method not in ['auto', 'bareiss', 'sparse', 'flint', 'modular', 'dense']:
+        print(('Error: unknown elimination method ' + str(method)))
+        return
+    ELIMINATION = method
+    MODULAR_WORKERS = workers
+    return
+
+def getElimination():
+    return ELIMINATION
+
+def toSparseRows(N):
+    # This function converts a matrix into a list of rows, each a dictionary of its nonzero entries.
+    return [{j: convertToFraction(x) for (j, x) in row} for row in findSparseRows(N)]
+
+def toIntegralRows(N):
+    # This function converts a matrix into a list of rows, each a dictionary of its nonzero
+    # entries, after multiplying every row by the least common multiple of its denominators.
+    # This does not change the rowspace or the nullspace. Returns None if some entry is not
+    # a number, in which case the matrix does not integralize.
+    rows = []
+    for row in findSparseRows(N):
+        current = {}
+        for (j, x) in row:
+            value = convertToFraction(x)
+            if type(value) != type(zero):
+                return None
+            current[j] = value
+        mult = 1
+        for x in current.values():
+            mult = mult * x.denominator // gcd(mult, x.denominator)
+        rows.append({j: x.numerator * (mult // x.denominator) for j, x in current.items()})
+    return rows
+
+def normalizeRows(rows, R):
+    # This function divides each echelon row by its pivot, converting its entries into Fractions.
+    return [{j: Fraction(x, row[pivot]) for j, x in row.items()} for (row, pivot) in zip(rows, R)]
+
+def toDenseRows(rows, m, n):
+    # This function converts a list of sparse rows into a matrix with m rows and n columns,
+    # padding it with zero rows at the bottom if there are fewer than m sparse rows.
+    A = [[zero]*n for i in range(m)]
+    for i, row in enumerate(rows):
+        for j, x in row.items():
+            A[i][j] = x
+    return A
+
+def eliminate(row, pivotRow, pivot, modulus = None):
+    # Subtracts the multiple of pivotRow (whose pivot entry is 1) that cancels the pivot
+    # entry of row from row, in place. Returns the columns that became nonzero or zero.
+    # If a modulus is given, the entries are residues and the arithmetic is modular.
+    kmul = row[pivot]
+    filled, cancelled = [], []
+    for j, x in pivotRow.items():
+        if j in row:
+            value = row[j] - kmul * x
+            if modulus:
+                value %= modulus
+            if value:
+                row[j] = value
+            else:
+                del row[j]
+                cancelled.append(j)
+        else:
+            row[j] = (-kmul * x) % modulus if modulus else -kmul * x
+            filled.append(j)
+    return (filled, cancelled)
+
+def indexColumns(rows, n):
+    # Returns, for each of the n columns, the set of indices of the rows with a nonzero in it
+    colRows = [set() for j in range(n)]
+    for i, row in rows.items():
+        for j in row:
+            colRows[j].add(i)
+    return colRows
+
+def findEchelon(N, reduced = True, verbose = False):
+    # This function computes a (reduced if reduced is True) row echelon form of N with the
+    # elimination selected by setElimination. Returns (rows, R) as sparseEchelon does, but
+    # the pivots of the rows are not necessarily 1 (see normalizeRows).
+    if ELIMINATION == 'modular':
+        return modularEchelon(N, MODULAR_WORKERS)
+    if ELIMINATION == 'flint' or (ELIMINATION == 'auto' and hasFlint()):
+        if hasFlint():
+            return flintEchelon(N)
+        print('Warning: python-flint is not installed; using the fraction-free elimination instead')
+    if ELIMINATION in ['auto', 'bareiss']:
+        intRows = toIntegralRows(N)
+        if intRows is not None:
+            return bareissEchelon(intRows, getSize(N)[1], reduced, verbose)
+        if ELIMINATION == 'bareiss':
+            print('Warning: the matrix does not integralize; using the rational elimination instead')
+    return sparseEchelon(N, reduced, verbose)
+
+def sparseEchelon(N, reduced = True, verbose = False):
+    # This function computes a row echelon form of N, or its reduced row echelon form.
+    # The columns are processed from left to right, so the pivot columns (and the reduced
+    # form, which is unique) are the same as those found by the dense Gauss-Jordan method.
+    # Among the rows that can serve as the pivot in a column, the one with the fewest
+    # nonzeros is chosen: this is the Markowitz rule for a fixed column, and it minimizes
+    # the fill-in created by the elimination step. Ties are broken by the row index.
+    # Returns (rows, R); rows: the nonzero rows of the echelon form as dictionaries, each
+    # normalized so that its pivot is 1; R: the indices of the pivot columns.
+    # The arithmetic uses gmpy2 if it is installed (see Rationals).
+    m, n = getSize(N)
+    rows = [{j: toRational(x) for j, x in row.items()} for row in toSparseRows(N)]
+    (rows, R) = reduceRows(rows, n, reduced, verbose)
+    return ([{j: fromRational(x) for j, x in row.items()} for row in rows], R)
+
+def reduceRows(rows, n, reduced = True, verbose = False, modulus = None):
+    # Performs the elimination described in sparseEchelon on a list of sparse rows; if a
+    # modulus is given, the rows contain residues modulo this prime and so does the result.
+    active = dict(enumerate(rows))
+    # colRows[j] contains the active (not yet pivot) rows with a nonzero in column j
+    colRows = indexColumns(active, n)
+    if verbose:
+        print(('There are ' + str(n) + ' columns to be processed'))
+    rows, R = [], []
+    for pivot in range(n):
+        if verbose and pivot % 100 == 0:
+            print(('Processing column ' + str(pivot)))
+        if not colRows[pivot]:
+            continue
+        best = min(colRows[pivot], key = lambda i: (len(active[i]), i))
+        pivotRow = active.pop(best)
+        for j in pivotRow:
+            colRows[j].discard(best)
+        m0 = pivotRow[pivot]
+        if modulus:
+            inverse = pow(m0, -1, modulus)
+            pivotRow = {j: x * inverse % modulus for j, x in pivotRow.items()}
+        elif m0 != one:
+            pivotRow = {j: x / m0 for j, x in pivotRow.items()}
+        for i in list(colRows[pivot]):
+            (filled, cancelled) = eliminate(active[i], pivotRow, pivot, modulus)
+            for j in filled:
+                colRows[j].add(i)
+            for j in cancelled:
+                colRows[j].discard(i)
+        rows.append(pivotRow)
+        R.append(pivot)
+        if not active:
+            # we are all the way down!
+            break
+    if reduced:
+        # back substitution, starting from the last pivot
+        for k in range(len(R) - 1, 0, -1):
+            pivot = R[k]
+            for i in range(k):
+                if pivot in rows[i]:
+                    eliminate(rows[i], rows[k], pivot, modulus)
+    return (rows, R)
+
+def bareissStep(row, pivotRow, pivot, previous):
+    # Performs one step of Bareiss elimination on row, in place: row becomes
+    # (p * row - row[pivot] * pivotRow) / previous, where p is the pivot of pivotRow and
+    # previous is the pivot of the preceding step; the division is always exact.
+    # Returns the columns that became nonzero or zero, as eliminate does.
+    p = pivotRow[pivot]
+    kmul = row[pivot]
+    filled, cancelled = [], []
+    for j in row:
+        if j not in pivotRow:
+            row[j] = p * row[j] // previous
+    for j, x in pivotRow.items():
+        if j in row:
+            value = (p * row[j] - kmul * x) // previous
+            if value:
+                row[j] = value
+            else:
+                del row[j]
+                cancelled.append(j)
+        else:
+            row[j] = -kmul * x // previous
+            filled.append(j)
+    return (filled, cancelled)
+
+def makePrimitive(row):
+    # Divides an integer row, in place, by the greatest common divisor of its entries
+    content = reduce(gcd, row.values(), 0)
+    if content > 1:
+        for j in row:
+            row[j] //= content
+    return row
+
+def bareissEchelon(rows, n, reduced = True, verbose = False):
+    # This function computes a row echelon form of a matrix given by its integer sparse rows
+    # with the fraction-free Bareiss elimination, which only ever divides exactly by the pivot
+    # of the preceding step, so that no gcd is ever computed during the forward elimination.
+    # The pivots are chosen as in sparseEchelon. A row that is not involved in a step would
+    # need to be multiplied by its pivot and divided by the previous one; this is done lazily
+    # instead, when the row is next involved, using the pivots of the steps it missed.
+    # If reduced is True, the rows are then made primitive and back substitution is used to
+    # obtain a reduced form in which each row is a multiple of the reduced row echelon form.
+    # Returns (rows, R) with integer rows; use normalizeRows to get the usual reduced form.
+    # The arithmetic uses gmpy2 if it is installed (see Rationals).
+    active = {i: {j: toInteger(x) for j, x in row.items()} for i, row in enumerate(rows)}
+    colRows = indexColumns(active, n)
+    # pivots[k] is the pivot of step k (pivots[0] = 1); updated[i] is the step of row i
+    pivots = [1]
+    updated = dict.fromkeys(active, 0)
+    def bringUp(i):
+        # brings the active row i up to date with the current step
+        row = active[i]
+        step = updated[i]
+        if step < len(pivots) - 1:
+            for j in row:
+                row[j] = row[j] * pivots[-1] // pivots[step]
+            updated[i] = len(pivots) - 1
+        return row
+    if verbose:
+        print(('There are ' + str(n) + ' columns to be processed'))
+    echelon, R = [], []
+    for pivot in range(n):
+        if verbose and pivot % 100 == 0:
+            print(('Processing column ' + str(pivot)))
+        if not colRows[pivot]:
+            continue
+        best = min(colRows[pivot], key = lambda i: (len(active[i]), i))
+        pivotRow = bringUp(best)
+        del active[best]
+        for j in pivotRow:
+            colRows[j].discard(best)
+        for i in list(colRows[pivot]):
+            (filled, cancelled) = bareissStep(bringUp(i), pivotRow, pivot, pivots[-1])
+            updated[i] = len(pivots)
+            for j in filled:
+                colRows[j].add(i)
+            for j in cancelled:
+                colRows[j].discard(i)
+        pivots.append(pivotRow[pivot])
+        echelon.append(pivotRow)
+        R.append(pivot)
+        if not active:
+            # we are all the way down!
+            break
+    if reduced:
+        for row in echelon:
+            makePrimitive(row)
+        # back substitution, starting from the last pivot
+        for k in range(len(R) - 1, 0, -1):
+            pivot = R[k]
+            p = echelon[k][pivot]
+            for i in range(k):
+                row = echelon[i]
+                if pivot in row:
+                    kmul = row[pivot]
+                    for j in row:
+                        row[j] *= p
+                    for j, x in echelon[k].items():
+                        value = row.get(j, 0) - kmul * x
+                        if value:
+                            row[j] = value
+                        else:
+                            del row[j]
+                    makePrimitive(row)
+    return ([{j: fromInteger(x) for j, x in row.items()} for row in echelon], R)
+
+def flintEchelon(N):
+    # This function computes the reduced row echelon form of N with python-flint, which
+    # eliminates the whole matrix in C; the result has the same format as sparseEchelon's.
+    m, n = getSize(N)
+    if m == 0 or n == 0:
+        return ([], [])
+    entries = [0]*(m*n)
+    for i, row in enumerate(toSparseRows(N)):
+        for j, x in row.items():
+            entries[i*n + j] = flint.fmpq(x.numerator, x.denominator)
+    (A, rank) = flint.fmpq_mat(m, n, entries).rref()
+    rows, R = [], []
+    for i in range(rank):
+        row = {}
+        for j in range(n):
+            x = A[i, j]
+            if x != 0:
+                row[j] = Fraction(int(x.p), int(x.q))
+        R.append(min(row))
+        rows.append(row)
+    return (rows, R)
+
+def isPrime(n):
+    # Deterministic Miller-Rabin test, valid for all n below 3.4 * 10^14
+    if n < 2:
+        return False
+    for p in [2, 3, 5, 7, 11, 13, 17]:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for a in [2, 3, 5, 7, 11, 13, 17]:
+        x = pow(a, d, n)
+        if x in [1, n - 1]:
+            continue
+        for r in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+PRIMES = []
+
+def getPrimes(count):
+    # Returns the count largest primes below 2^31, which fit in a machine word
+    candidate = PRIMES[-1] - 2 if PRIMES else 2**31 - 1
+    while len(PRIMES) < count:
+        if isPrime(candidate):
+            PRIMES.append(candidate)
+        candidate -= 2
+    return PRIMES[:count]
+
+def reduceModulo(args):
+    # Computes the reduced row echelon form of integer sparse rows modulo a prime
+    (rows, n, p) = args
+    residues = [{j: x % p for j, x in row.items() if x % p} for row in rows]
+    (echelon, R) = reduceRows(residues, n, True, False, p)
+    return (p, echelon, R)
+
+def reconstructRational(a, M):
+    # Returns the fraction r/s with r = a * s modulo M and |r|, |s| <= sqrt(M/2) if there is one,
+    # or None otherwise (the extended Euclidean algorithm, stopped halfway).
+    bound = isqrt(M // 2)
+    (r0, s0), (r1, s1) = (M, 0), (a % M, 1)
+    while r1 > bound:
+        q = r0 // r1
+        (r0, s0), (r1, s1) = (r1, s1), (r0 - q * r1, s0 - q * s1)
+    if s1 == 0 or abs(s1) > bound or gcd(r1, abs(s1)) != 1:
+        return None
+    return Fraction(r1, s1)
+
+def reconstructRows(results, R):
+    # Combines the reduced forms modulo several primes, which must all have the pivots R,
+    # with the Chinese remainder theorem, and reconstructs their entries as fractions.
+    # Returns None if some entry cannot be reconstructed, i.e. more primes are needed.
+    rows = []
+    for k, pivot in enumerate(R):
+        columns = set()
+        for (p, echelon, curR) in results:
+            columns.update(echelon[k])
+        row = {pivot: one}
+        for j in columns:
+            if j == pivot:
+                continue
+            (value, M) = (0, 1)
+            for (p, echelon, curR) in results:
+                residue = echelon[k].get(j, 0)
+                value += M * ((residue - value) * pow(M, -1, p) % p)
+                M *= p
+            entry = reconstructRational(value, M)
+            if entry is None:
+                return None
+            if entry:
+                row[j] = entry
+        rows.append(row)
+    return rows
+
+def checkEchelon(intRows, rows, R):
+    # Checks exactly that every row of the matrix is the combination of the reduced rows with
+    # its entries in the pivot columns as coefficients; this is the same as N * B = 0 for the
+    # nullspace basis B obtained from the reduced rows, and it proves that R are the pivots.
+    for row in intRows:
+        total = {}
+        for k, pivot in enumerate(R):
+            coeff = row.get(pivot)
+            if coeff:
+                for j, x in rows[k].items():
+                    total[j] = total.get(j, 0) + coeff * x
+        for j in set(total).union(row):
+            if total.get(j, 0) != row.get(j, 0):
+                return False
+    return True
+
+MAX_PRIMES = 1024
+
+def modularEchelon(N, workers = 0):
+    # This function computes the reduced row echelon form of N, as sparseEchelon does, by
+    # eliminating modulo several word-size primes and reconstructing the rational entries
+    # from their residues; the coefficient growth of exact elimination is thus avoided.
+    # A prime dividing some minor of N may give fewer or later pivots; only the primes that
+    # agree with the best pivots found (most numerous, then earliest) are kept. The primes
+    # are added in batches, doubling in size, until the reconstructed form passes an exact
+    # check (see checkEchelon). If workers > 1, each batch is split among as many processes.
+    intRows = toIntegralRows(N)
+    if intRows is None:
+        print('Warning: the matrix does not integralize; using the rational elimination instead')
+        return sparseEchelon(N)
+    m, n = getSize(N)
+    results = []
+    used, batch = 0, max(2, workers)
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        while used < MAX_PRIMES:
+            primes = getPrimes(used + batch)[used:]
+            used += batch
+            tasks = [(intRows, n, p) for p in primes]
+            results += (pool.map(reduceModulo, tasks) if pool is not None else list(map(reduceModulo, tasks)))
+            R = min([result[2] for result in results], key = lambda x: (-len(x), x))
+            results = [result for result in results if result[2] == R]
+            rows = reconstructRows(results, R)
+            if rows is not None and checkEchelon(intRows, rows, R):
+                return (rows, R)
+            batch *= 2
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print('Warning: the modular elimination did not converge; using the fraction-free elimination instead')
+    return bareissEchelon(intRows, n)
+
+def sparseNullspaceBasis(rows, R, n):
+    # This function computes the nullspace basis from a sparse reduced row echelon form;
+    # the result is the same as that of NullspaceBasis in ModelProcessing (one row per column).
+    # The rows need not be normalized: every entry is divided by the pivot of its row here,
+    # which is the only point at which the rows of bareissEchelon are turned into Fractions.
+    m = len(R)
+    if m > n:
+        print ('Error: this cannot happen!')
+    elif m == n:
+        return []
+    pivots = set(R)
+    Rcomp = [x for x in range(n) if x not in pivots]
+    position = {x: ind for ind, x in enumerate(Rcomp)}
+    NullBasis = [[] for i in range(n)]
+    for ind, pivot in enumerate(R):
+        vector = [zero]*(n - m)
+        scale = rows[ind][pivot]
+        for j, x in rows[ind].items():
+            if j != pivot:
+                vector[position[j]] = Fraction(-x, scale)
+        NullBasis[pivot] = vector
+    for ind, i in enumerate(Rcomp):
+        NullBasis[i] = [zero]*(n - m)
+        NullBasis[i][ind] = one
+    return NullBasis
+
+def denseGaussJordan(N, pivoting = True, Gauss = False, verbose = False):
+    # This function returns the (pivoted) Row-Reduced Echelon Form of N.
+    # It was adapted from http://adorio-research.org/wordpress/?p=192.
+    # pivoting = True for partial row pivoting, False if no pivoting.
+    # Gauss = True if a Row Echelon Form of N is needed, False otherwise.
+    # Returns (A, R); A: transformed input matrix; R: indices of pivots.
+    nrow, ncol = getSize(N)
+    A = [[convertToFraction(N[i][j]) for j in range(ncol)] for i in range(nrow)]
+    R = []
+    # Triangularization
+    currow = 0
+    # This holds the index of the row we are currently searching
+    if verbose:
+        print(('There are ' + str(ncol) + ' columns to be processed'))
+    for pivot in range(ncol):
+        if verbose and pivot % 10 == 0:
+            print(('Processing column ' + str(pivot)))
+        if pivoting:
+            absVals = [abs(A[x][pivot]) for x in range(currow, nrow)]
+            bestPivot = max(absVals)
+            best = currow + absVals.index(bestPivot)
+            # exchange pivot row with best row.
+            if currow != best:
+                A[best], A[currow] = A[currow], A[best]
+        m = A[currow][pivot]
+        if m == zero:
+            # In solving a system, this would mean the algorithm broke down;
+            # however, in our case, this simply means we found a zero column!
+            continue
+        else:
+            R.append(pivot)
+            for row in range(0, nrow):
+                # NOTE: For Gaussian elimination, only eliminate the rows below the current one!
+                if ((Gauss and row > currow) or (not Gauss and row != currow)) and (A[row][pivot] != zero):
+                    kmul = A[row][pivot] / m
+                    # Apply rectangular rule (Reduction)
+                    for col in range(pivot + 1, ncol):
+                        A[row][col] -= (kmul * A[currow][col])
+                    A[row][pivot] = zero
+            currow += 1
+            if currow == nrow:
+                # we are all the way down!
+                break
+    if not Gauss:
+        # NOTE: For Gaussian elimination, we also don't need to normalize the rows at the end!
+        nonPivots = [x for x in range(ncol) if x not in R]
+        for row in range(len(R)):
+            pivot = R[row]
+            m = A[row][pivot]
+            A[row][pivot] = one
+            for col in nonPivots:
+                if A[row][col]:
+                    A[row][col] /= m
+    return (A, R)
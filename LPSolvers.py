@@ -0,0 +1,1113 @@
+# This file contains the linear programming problem description and solver back-ends
+# used by Mongoose. Problems are built once in memory and then handed to a back-end;
+# the esolver back-end writes an LP file, the qsoptex back-end solves in-process.
+
+import os, sys, re, json, csv, time, subprocess, tempfile, shutil, multiprocessing, multiprocessing.util, hashlib, shelve, copy, itertools, threading, pickle
+
+from collections import OrderedDict
+from fractions import Fraction
+from Utilities import *
+
+try:
+    import qsoptex
+except ImportError:
+    qsoptex = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+except ImportError:
+    linprog = None
+
+zero = Fraction(0)
+
+#Docker ESOLVER_PATH:
+ESOLVER_PATH = "/qsopt-ex/build/esolver/.libs/esolver"
+#ESOLVER_PATH = "/Users/christopherle/Documents/Leonid/qsopt-ex/build/esolver/.libs/esolver"
+#ESOLVER_PATH = "/Users/Admin/Downloads/DownloadedSoftware/qsopt-ex/build/esolver/.libs/esolver"
+
+MAXIMIZE, MINIMIZE = 'Maximize', 'Minimize'
+EQUAL, LESS, GREATER = '=', '<=', '>='
+
+class SolverLimit:
+    # The status returned in place of the objective value when a solve was stopped by a limit.
+    # It is neither infeasible ([]) nor a number, so callers must test for it with isLimited.
+    def __init__(self, reason):
+        self.reason = reason
+    def __repr__(self):
+        return 'SolverLimit(' + repr(self.reason) + ')'
+
+TIMEOUT = SolverLimit('time')
+OUT_OF_MEMORY = SolverLimit('memory')
+
+def isLimited(val):
+    # Determines whether the value returned by the solver indicates a solve stopped by a limit
+    return isinstance(val, SolverLimit)
+
+LIMITS = {'timeout': None, 'memory': None}
+
+def setLimits(timeout = None, memory = None):
+    # Sets the default limits for each solve: wall-clock time in seconds and address space
+    # in bytes; None means unlimited. Stopped solves return TIMEOUT or OUT_OF_MEMORY. They
+    # apply to the esolver runs as well as to the in-process qsoptex solves, which are then
+    # made in a child process (see solveExactProblem).
+    LIMITS['timeout'] = timeout
+    LIMITS['memory'] = memory
+    return
+
+class Cancelled(Exception):
+    # Raised by checkCancelled once the current cancellation token has been cancelled
+    pass
+
+class CancelToken:
+    # A cooperative cancellation flag; long computations call checkCancelled regularly, and
+    # a running esolver process is killed as soon as the token of its thread is cancelled.
+    def __init__(self):
+        self.event = threading.Event()
+    def cancel(self):
+        self.event.set()
+    def isCancelled(self):
+        return self.event.is_set()
+
+CURRENT = threading.local()
+
+def setCancelToken(token):
+    # Sets the cancellation token checked by the computations running in the current thread
+    CURRENT.token = token
+    return
+
+def getCancelToken():
+    return getattr(CURRENT, 'token', None)
+
+def checkCancelled():
+    # Raises Cancelled if the cancellation token of the current thread has been cancelled
+    token = getCancelToken()
+    if token is not None and token.isCancelled():
+        raise Cancelled()
+    return
+
+class LPStats:
+    # Records every linear problem solved through solveProblem or a SolverPool: the call site
+    # (the function that asked for it), the size of the problem, the time spent building it,
+    # solving it and parsing the solution, and the outcome. getSummary aggregates the calls
+    # by call site; dump writes either the summary and the calls (.json) or the calls (.csv).
+    # Both take an optional index of the first call to include, as returned by getCount.
+    FIELDS = ['site', 'rows', 'cols', 'build', 'solve', 'parse', 'status', 'cached']
+    def __init__(self):
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.calls = []
+    def record(self, site, size, build, solve, parse, status, cached = False):
+        if not self.enabled:
+            return
+        (rows, cols) = size
+        with self.lock:
+            self.calls.append(OrderedDict(zip(self.FIELDS, [site, rows, cols, build, solve, parse, status, cached])))
+        return
+    def extend(self, calls):
+        # Adds calls recorded elsewhere, e.g. by the processes that analyse separate components
+        if not self.enabled:
+            return
+        with self.lock:
+            self.calls.extend(calls)
+        return
+    def getCount(self):
+        return len(self.calls)
+    def getCalls(self, site = None, start = 0):
+        return [call for call in self.calls[start:] if site is None or call['site'] == site]
+    def getSummary(self, start = 0):
+        summary = OrderedDict()
+        for call in self.calls[start:]:
+            if call['site'] not in summary:
+                summary[call['site']] = OrderedDict([('calls', 0), ('cached', 0), ('maxRows', 0), ('maxCols', 0), ('build', 0.0), ('solve', 0.0), ('parse', 0.0), ('statuses', OrderedDict())])
+            cur = summary[call['site']]
+            cur['calls'] += 1
+            cur['cached'] += int(call['cached'])
+            cur['maxRows'] = max(cur['maxRows'], call['rows'] or 0) # None if unknown
+            cur['maxCols'] = max(cur['maxCols'], call['cols'] or 0)
+            for field in ['build', 'solve', 'parse']:
+                cur[field] += call[field]
+            cur['statuses'][call['status']] = cur['statuses'].get(call['status'], 0) + 1
+        return summary
+    def dump(self, Filename, start = 0):
+        if Filename.endswith('.csv'):
+            with open(Filename, 'w', newline = '') as f:
+                writer = csv.DictWriter(f, self.FIELDS)
+                writer.writeheader()
+                writer.writerows(self.calls[start:])
+        else:
+            with open(Filename, 'w') as f:
+                json.dump(OrderedDict([('summary', self.getSummary(start)), ('calls', self.calls[start:])]), f, indent = 1)
+        return
+    def reset(self):
+        with self.lock:
+            self.calls = []
+        return
+
+STATS = LPStats()
+
+def getLPStats():
+    return STATS
+
+def resetLPStats():
+    STATS.reset()
+    return
+
+def dumpLPStats(Filename, start = 0):
+    # Writes the recorded LP calls to a .json or a .csv file (see LPStats)
+    STATS.dump(Filename, start)
+    return
+
+# Functions outside this module that only pass problems on to it; the call site recorded
+# for a problem is the function that called them.
+SITE_WRAPPERS = set(['solve', 'findFeasibleBatch', 'findInfeasibleCandidates'])
+
+def findCallSite():
+    # Returns the name of the innermost function on the stack that is neither in this
+    # module nor an LP wrapper (comprehensions are attributed to their enclosing function)
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_code.co_name
+        if frame.f_globals is not globals() and name not in SITE_WRAPPERS and not name.startswith('<'):
+            return name
+        frame = frame.f_back
+    return 'unknown'
+
+def setParseTime(seconds):
+    # Called by the back-ends to report how long reading the last solution took; the rest
+    # of the time spent in a back-end's solve method is counted as solving time.
+    CURRENT.parseTime = seconds
+    return
+
+def takeParseTime():
+    seconds = getattr(CURRENT, 'parseTime', 0.0)
+    CURRENT.parseTime = 0.0
+    return seconds
+
+def timeSolve(solver, problem, opt = False, skip = ()):
+    # Solves a problem with a given back-end and returns the result with its solve and parse times
+    takeParseTime()
+    start = time.time()
+    result = solver.solve(problem, opt, skip)
+    parse = takeParseTime()
+    return (result, time.time() - start - parse, parse)
+
+def getStatus(result, opt = False):
+    # Describes the outcome of a solve, as returned by solveProblem, in a single word
+    value = result[0] if (opt and type(result) == type(())) else result
+    if value is None:
+        return 'failed'
+    if isLimited(value):
+        return value.reason
+    if type(value) == type([]):
+        return 'unbounded' if value else 'infeasible'
+    return 'optimal'
+
+class LinearProblem:
+    # A solver-independent description of a linear program. Variables are nonnegative
+    # unless their bounds are changed with setBounds; None stands for an infinite bound.
+    # Constraints are lists of (variable, coefficient) pairs with a sense and a rhs.
+    # A frozen problem remembers the text and variables of its current constraints, so
+    # that the problems derived from it only need to process their own extra constraints.
+    def __init__(self, name = 'trial', sense = MAXIMIZE):
+        self.name = name
+        self.sense = sense
+        self.objective = []
+        self.constraints = []
+        self.bounds = {}
+        self.frozen = None
+        self.created = time.time()
+    def setObjective(self, terms):
+        self.objective = [(var, coeff) for (var, coeff) in terms if coeff]
+    def addConstraint(self, terms, sense, rhs):
+        terms = [(var, coeff) for (var, coeff) in terms if coeff]
+        if terms or rhs:
+            self.constraints.append((terms, sense, rhs))
+    def setBounds(self, var, lower = 0, upper = None):
+        self.bounds[var] = (lower, upper)
+    def getBounds(self, var):
+        return self.bounds.get(var, (0, None))
+    def freeze(self):
+        # Stores the text and the variables of the current constraints for later reuse
+        seen = {}
+        for (terms, sense, rhs) in self.constraints:
+            for (var, coeff) in terms:
+                seen[var] = True
+        self.frozen = (len(self.constraints), formatConstraints(self.constraints), list(seen.keys()))
+        return
+    def derive(self, name = None):
+        # Returns a copy of the problem sharing the frozen part of its constraints
+        copy = LinearProblem(self.name if name is None else name, self.sense)
+        copy.objective = list(self.objective)
+        copy.constraints = list(self.constraints)
+        copy.bounds = dict(self.bounds)
+        copy.frozen = self.frozen
+        copy.created = time.time()
+        return copy
+    def getVariables(self):
+        # Returns the variables that appear in the objective or the constraints, in order
+        # of first appearance; bounds on any other variables are irrelevant to the solver.
+        seen = {}
+        for (var, coeff) in self.objective:
+            seen[var] = True
+        start = 0
+        if self.frozen is not None:
+            (start, text, variables) = self.frozen
+            for var in variables:
+                seen[var] = True
+        for (terms, sense, rhs) in self.constraints[start:]:
+            for (var, coeff) in terms:
+                seen[var] = True
+        return list(seen.keys())
+    def getSize(self):
+        return (len(self.constraints), len(self.getVariables()))
+    def iterLP(self, Cplex = False):
+        # Generates the text of the problem in the LP format accepted by QSOpt_ex (or CPLEX),
+        # in pieces of at most one line each (except for the frozen block of constraints).
+        if not Cplex:
+            yield 'Problem\n' + self.name + '\n'
+        yield self.sense + '\n'
+        if self.objective:
+            yield 'obj: ' + ' + '.join([str(coeff) + ' ' + var for (var, coeff) in self.objective]) + '\n'
+        else:
+            yield '\n'
+        yield 'Subject' + ' To' * int(Cplex) + '\n'
+        start = 0
+        if self.frozen is not None:
+            start = self.frozen[0]
+            yield self.frozen[1]
+        for constraint in self.constraints[start:]:
+            yield formatConstraint(constraint)
+        yield 'Bounds\n'
+        for var in self.getVariables():
+            if var in self.bounds:
+                yield formatBound(var, self.bounds[var])
+        yield 'End\n'
+    def toLP(self, Cplex = False):
+        # Returns the text of the problem in the LP format accepted by QSOpt_ex (or CPLEX)
+        text = ''.join(self.iterLP(Cplex))
+        if Cplex:
+            text = text.replace('+ -', '-')
+        return text
+    def writeFile(self, Filename, Cplex = False):
+        # Writes the problem into a file through a buffered stream, piece by piece
+        f = open(Filename, 'w', buffering = 1 << 16)
+        if Cplex:
+            f.writelines([piece.replace('+ -', '-') for piece in self.iterLP(Cplex)])
+        else:
+            f.writelines(self.iterLP(Cplex))
+        f.close()
+        return
+
+def formatConstraint(constraint):
+    # Returns the line of the Subject section describing a given constraint
+    (terms, sense, rhs) = constraint
+    return ' + '.join([str(coeff) + ' ' + var for (var, coeff) in terms]) + ' ' + sense + ' ' + str(rhs) + '\n'
+
+def formatConstraints(constraints):
+    # Returns the lines of the Subject section describing the given constraints
+    return ''.join([formatConstraint(constraint) for constraint in constraints])
+
+def formatBound(var, bound):
+    # Returns the line of the Bounds section describing the given bound on a variable
+    (lower, upper) = bound
+    if lower is None and upper is None:
+        return var + ' free\n'
+    elif lower is not None and lower == upper:
+        return var + ' = ' + str(lower) + '\n'
+    elif upper is None:
+        return (var + ' >= ' + str(lower) + '\n') if lower else ''
+    elif lower is None:
+        return '-inf <= ' + var + ' <= ' + str(upper) + '\n'
+    elif not lower:
+        return var + ' <= ' + str(upper) + '\n'
+    else:
+        return str(lower) + ' <= ' + var + ' <= ' + str(upper) + '\n'
+
+def toExact(value):
+    # Converts a number appearing in a problem description into a Fraction
+    if value is None:
+        return None
+    if type(value) == type(0.0):
+        return convertToFraction(value)
+    return Fraction(value)
+
+class EsolverBackend:
+    # Solves problems by writing them into an LP file and running the esolver executable.
+    # The LP and solution files get a unique name in the specified directory, by default
+    # a private scratch directory of the current process (see getScratchDirectory).
+    # The time and memory limits default to the ones set with setLimits.
+    def __init__(self, path = None, suppressOutput = True, directory = None, timeout = None, memory = None):
+        self.path = path
+        self.suppressOutput = suppressOutput
+        self.directory = directory
+        self.timeout = timeout
+        self.memory = memory
+    def solve(self, problem, opt = False, skip = ()):
+        directory = self.directory if self.directory is not None else getScratchDirectory()
+        Filename = os.path.join(directory, os.path.basename(problem.name) + '_' + str(next(FILE_COUNTER)) + '.lp')
+        problem.writeFile(Filename)
+        timeout = self.timeout if self.timeout is not None else LIMITS['timeout']
+        memory = self.memory if self.memory is not None else LIMITS['memory']
+        return processFile(Filename, opt, suppressOutput = self.suppressOutput, path = self.path, skip = skip, timeout = timeout, memory = memory)
+
+class QSoptexBackend:
+    # Solves problems in-process with the python-qsoptex binding to QSopt_ex.
+    # The time and memory limits default to the ones set with setLimits.
+    def __init__(self, timeout = None, memory = None):
+        if qsoptex is None:
+            print('Error: the qsoptex module is not available!')
+        self.timeout = timeout
+        self.memory = memory
+    def build(self, problem):
+        return buildExactProblem(problem)
+    def solve(self, problem, opt = False, skip = (), verbose = False):
+        return solveExactProblem(problem, problem.getVariables(), opt, skip, verbose, self.timeout, self.memory)
+
+def buildExactProblem(problem):
+    # Builds a qsoptex.ExactProblem from a LinearProblem; returns it with the list of its variables
+    p = qsoptex.ExactProblem()
+    if problem.sense == MAXIMIZE:
+        p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
+    else:
+        p.set_objective_sense(qsoptex.ObjectiveSense.MINIMIZE)
+    objective = dict(problem.objective)
+    variables = problem.getVariables()
+    for var in variables:
+        (lower, upper) = problem.getBounds(var)
+        p.add_variable(name = var, objective = toExact(objective.get(var, 0)), lower = toExact(lower), upper = toExact(upper))
+    senses = {EQUAL: qsoptex.ConstraintSense.EQUAL, LESS: qsoptex.ConstraintSense.LESS, GREATER: qsoptex.ConstraintSense.GREATER}
+    for (terms, sense, rhs) in problem.constraints:
+        p.add_linear_constraint(senses[sense], {var: toExact(coeff) for (var, coeff) in terms}, rhs = toExact(rhs))
+    return (p, variables)
+
+def solveExactProblem(p, variables, opt = False, skip = (), verbose = False, timeout = None, memory = None):
+    # Solves a LinearProblem, or a problem built directly with the python-qsoptex binding, with
+    # QSopt_ex and returns the result in the format of solveProblem; if opt is True, the solution
+    # contains the nonzero values among the specified variables. This is shared by QSoptexBackend
+    # and the functions of ModelProcessingRevised that build their problems directly.
+    # The binding cannot be interrupted, so if there is a time or a memory limit (by default
+    # the ones set with setLimits), the problem is sent to a child process which is killed
+    # when it exceeds the time limit or when the current thread's token is cancelled; a problem
+    # built directly must then be picklable, as a TrackedProblem in ModelProcessingRevised is.
+    if timeout is None:
+        timeout = LIMITS['timeout']
+    if memory is None:
+        memory = LIMITS['memory']
+    if timeout or memory:
+        return solveExactInChild(p, variables, opt, skip, verbose, timeout, memory)
+    if isinstance(p, LinearProblem):
+        p = buildExactProblem(p)[0]
+    return readExactSolution(p, p.solve(), variables, opt, skip, verbose)
+
+EXACT_CONTEXT = None
+
+def getExactContext():
+    # Returns the multiprocessing context in which the limited qsoptex problems are solved:
+    # forkserver where it is available, spawn otherwise. Unlike a plain fork, neither copies
+    # the calling process, whose other threads (such as the GUI's) may be holding locks.
+    global EXACT_CONTEXT
+    if EXACT_CONTEXT is None:
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            EXACT_CONTEXT = multiprocessing.get_context('forkserver')
+            EXACT_CONTEXT.set_forkserver_preload(['LPSolvers'])
+        else:
+            EXACT_CONTEXT = multiprocessing.get_context('spawn')
+    return EXACT_CONTEXT
+
+def solveExactInWorker(p, variables, opt, skip, verbose, memory):
+    # Solves a problem with QSopt_ex in a child process started by solveExactInChild;
+    # returns the result with the time spent reading the solution
+    if memory and resource is not None:
+        limitMemory(memory)()
+    if isinstance(p, LinearProblem):
+        p = buildExactProblem(p)[0]
+    result = readExactSolution(p, p.solve(), variables, opt, skip, verbose)
+    return (result, takeParseTime())
+
+def runExactWorker(connection, args):
+    # The target of the processes started by runExactProcess
+    connection.send(solveExactInWorker(*args))
+    connection.close()
+    return
+
+def runExactSubprocessWorker():
+    # The entry point of the subprocesses started by runExactSubprocess
+    args = pickle.load(sys.stdin.buffer)
+    pickle.dump(solveExactInWorker(*args), sys.stdout.buffer)
+    return
+
+def findStopReason(start, timeout):
+    # Returns 'cancelled' if the cancellation token of the current thread is cancelled,
+    # TIMEOUT if the timeout (in seconds since start) is exceeded, and None otherwise
+    token = getCancelToken()
+    if token is not None and token.isCancelled():
+        return 'cancelled'
+    if timeout is not None and time.time() - start >= timeout:
+        return TIMEOUT
+    return None
+
+def runExactProcess(args, timeout):
+    # Runs solveExactInWorker in a process of the context returned by getExactContext;
+    # returns the reason it was stopped, if any, and what it sent back (None if nothing)
+    context = getExactContext()
+    (receiver, sender) = context.Pipe(duplex = False)
+    process = context.Process(target = runExactWorker, args = (sender, args))
+    process.start()
+    sender.close()
+    start = time.time()
+    status, received = None, None
+    try:
+        while status is None:
+            if receiver.poll(0.1):
+                try:
+                    received = receiver.recv()
+                except EOFError: # the child died without a result
+                    pass
+                break
+            status = findStopReason(start, timeout)
+        if status is not None:
+            process.kill()
+    finally:
+        receiver.close()
+        process.join()
+    return (status, received)
+
+def runExactSubprocess(args, timeout):
+    # Runs solveExactInWorker in a new Python interpreter, exchanging the arguments and the
+    # result through its standard input and output; returns the same as runExactProcess
+    environment = dict(os.environ)
+    path = [os.path.dirname(os.path.abspath(__file__))] + [x for x in sys.path if x]
+    environment['PYTHONPATH'] = os.pathsep.join(path)
+    command = [sys.executable, '-c', 'from LPSolvers import runExactSubprocessWorker; runExactSubprocessWorker()']
+    process = subprocess.Popen(command, stdin = subprocess.PIPE, stdout = subprocess.PIPE, env = environment)
+    data = pickle.dumps(args)
+    start = time.time()
+    status, received = None, None
+    while status is None:
+        try:
+            (output, _) = process.communicate(data, timeout = 0.1)
+            if process.returncode == 0 and output:
+                received = pickle.loads(output)
+            break
+        except subprocess.TimeoutExpired:
+            data = None # the input is only sent once
+            status = findStopReason(start, timeout)
+    if status is not None:
+        process.kill()
+        process.communicate()
+    return (status, received)
+
+def solveExactInChild(p, variables, opt, skip, verbose, timeout, memory):
+    # Solves a problem with QSopt_ex in a child process, which sends back the result. The
+    # workers of a SolverPool may not start processes with multiprocessing, so they start
+    # a separate Python interpreter instead (see runExactSubprocess).
+    args = (p, variables, opt, skip, verbose, memory)
+    if multiprocessing.current_process().daemon:
+        (status, received) = runExactSubprocess(args, timeout)
+    else:
+        (status, received) = runExactProcess(args, timeout)
+    if status == 'cancelled':
+        raise Cancelled()
+    if status is None and received is None:
+        if not memory:
+            return
+        status = OUT_OF_MEMORY
+    if status is not None:
+        return (status, {}) if opt else status
+    (result, parse) = received
+    setParseTime(parse)
+    return result
+
+def readExactSolution(p, status, variables, opt = False, skip = (), verbose = False):
+    # Converts the status and the solution of a solved qsoptex problem into a result
+    skip = tuple(skip)
+    dico = {}
+    if status == qsoptex.SolutionStatus.OPTIMAL:
+        value = Fraction(p.get_objective_value())
+    elif status == qsoptex.SolutionStatus.UNBOUNDED:
+        if verbose:
+            print('Note: problem is unbounded!')
+        value = [float('Inf')]
+    elif status == qsoptex.SolutionStatus.INFEASIBLE:
+        if verbose:
+            print('Note: problem is infeasible!')
+        value = []
+    else:
+        if verbose:
+            print('Problem: A solution was not found!')
+        return
+    if opt:
+        start = time.time()
+        if type(value) == type(zero): # the optimal value is finite
+            for var in variables:
+                if skip and var.startswith(skip):
+                    continue
+                curValue = Fraction(p.get_value(var))
+                if curValue:
+                    dico[var] = curValue
+        setParseTime(time.time() - start)
+        return (value, dico)
+    else:
+        return value
+
+class HybridBackend:
+    # Solves problems with a floating-point LP solver (HiGHS via scipy) and certifies the
+    # answer in exact arithmetic: the primal solution is rationalized and checked against
+    # every constraint and bound, and if there is an objective, the rationalized duals must
+    # be dual feasible with a dual objective exactly equal to the primal one. Whenever the
+    # floating-point solver does not report an optimum or the certificate fails, the problem
+    # is handed to the exact back-end instead, so the results remain exact.
+    def __init__(self, exact = None, maxDenominator = 10**6, tolerance = 1e-9):
+        self.exact = exact
+        self.maxDenominator = maxDenominator
+        self.tolerance = tolerance
+        self.certified = 0
+        self.fallbacks = 0
+    def getExact(self):
+        if self.exact is None:
+            self.exact = QSoptexBackend() if qsoptex is not None else EsolverBackend()
+        return self.exact
+    def rationalize(self, value):
+        if abs(value) < self.tolerance:
+            return zero
+        return Fraction(value).limit_denominator(self.maxDenominator)
+    def solve(self, problem, opt = False, skip = ()):
+        result = None
+        if linprog is not None:
+            result = self.certify(problem)
+        if result is None:
+            self.fallbacks += 1
+            return self.getExact().solve(problem, opt, skip)
+        self.certified += 1
+        (value, dico) = result
+        skip = tuple(skip)
+        if skip:
+            dico = dict([(var, dico[var]) for var in dico if not var.startswith(skip)])
+        if opt:
+            return (value, dico)
+        else:
+            return value
+    def certify(self, problem):
+        # Returns (value, dictionary of nonzero variables) if the floating-point optimum
+        # can be certified exactly, None otherwise
+        variables = problem.getVariables()
+        index = dict([(var, j) for j, var in enumerate(variables)])
+        n = len(variables)
+        sign = (-1 if problem.sense == MAXIMIZE else 1) # linprog always minimizes
+        cost = [zero]*n
+        for (var, coeff) in problem.objective:
+            cost[index[var]] += sign * toExact(coeff)
+        rows, rhs, senses = [], [], []
+        for (terms, sense, value) in problem.constraints:
+            rows.append([(index[var], toExact(coeff)) for (var, coeff) in terms])
+            rhs.append(toExact(value))
+            senses.append(sense)
+        bounds = [tuple([toExact(x) for x in problem.getBounds(var)]) for var in variables]
+        # the problem in the form min c.x s.t. A_eq x = b_eq, A_ub x <= b_ub, l <= x <= u
+        eqRows = [i for i in range(len(rows)) if senses[i] == EQUAL]
+        ubRows = [i for i in range(len(rows)) if senses[i] != EQUAL]
+        ubSigns = [(-1 if senses[i] == GREATER else 1) for i in ubRows]
+        def toSparse(selected, signs):
+            I, J, V = [], [], []
+            for k, i in enumerate(selected):
+                for (j, coeff) in rows[i]:
+                    I.append(k)
+                    J.append(j)
+                    V.append(float(signs[k] * coeff))
+            return coo_matrix((V, (I, J)), shape = (len(selected), n)).tocsr()
+        args = {}
+        if eqRows:
+            args['A_eq'] = toSparse(eqRows, [1]*len(eqRows))
+            args['b_eq'] = [float(rhs[i]) for i in eqRows]
+        if ubRows:
+            args['A_ub'] = toSparse(ubRows, ubSigns)
+            args['b_ub'] = [float(ubSigns[k] * rhs[i]) for k, i in enumerate(ubRows)]
+        floatBounds = [tuple([(None if x is None else float(x)) for x in bound]) for bound in bounds]
+        try:
+            res = linprog([float(x) for x in cost], bounds = floatBounds, method = 'highs', **args)
+        except Exception:
+            return None
+        if res.status != 0:
+            return None
+        x = [self.rationalize(value) for value in res.x]
+        # primal feasibility, checked exactly
+        activity = [sum([coeff * x[j] for (j, coeff) in row], zero) for row in rows]
+        for i in range(len(rows)):
+            if senses[i] == EQUAL and activity[i] != rhs[i]:
+                return None
+            if senses[i] == LESS and activity[i] > rhs[i]:
+                return None
+            if senses[i] == GREATER and activity[i] < rhs[i]:
+                return None
+        for j in range(n):
+            (lower, upper) = bounds[j]
+            if (lower is not None and x[j] < lower) or (upper is not None and x[j] > upper):
+                return None
+        primal = sum([cost[j] * x[j] for j in range(n)], zero)
+        if any(cost):
+            # dual feasibility and strong duality, checked exactly
+            y = [zero]*len(rows)
+            for k, i in enumerate(eqRows):
+                y[i] = self.rationalize(res.eqlin.marginals[k])
+            for k, i in enumerate(ubRows):
+                y[i] = ubSigns[k] * self.rationalize(res.ineqlin.marginals[k])
+                if ubSigns[k] * y[i] > 0: # the multipliers of the <= rows must be nonpositive
+                    return None
+            reduced = list(cost)
+            for i in range(len(rows)):
+                if y[i]:
+                    for (j, coeff) in rows[i]:
+                        reduced[j] -= coeff * y[i]
+            dual = sum([rhs[i] * y[i] for i in range(len(rows))], zero)
+            for j in range(n):
+                (lower, upper) = bounds[j]
+                if reduced[j] > 0:
+                    if lower is None:
+                        return None
+                    dual += reduced[j] * lower
+                elif reduced[j] < 0:
+                    if upper is None:
+                        return None
+                    dual += reduced[j] * upper
+            if dual != primal:
+                return None
+        dico = dict([(variables[j], x[j]) for j in range(n) if x[j]])
+        return (sign * primal, dico)
+
+SOLVER = None
+
+def setSolver(solver):
+    # Selects the back-end used by solveProblem; either a back-end object or one of
+    # the strings 'esolver', 'qsoptex' and 'hybrid'. None restores the default choice.
+    global SOLVER
+    if solver == 'esolver':
+        solver = EsolverBackend()
+    elif solver == 'qsoptex':
+        solver = QSoptexBackend()
+    elif solver == 'hybrid':
+        solver = HybridBackend()
+    SOLVER = solver
+    return
+
+def getSolver():
+    # Returns the current back-end; by default qsoptex if it is installed, esolver otherwise.
+    global SOLVER
+    if SOLVER is None:
+        SOLVER = QSoptexBackend() if qsoptex is not None else EsolverBackend()
+    return SOLVER
+
+class LPCache:
+    # A cache of solutions indexed by the content of the problems (sense, objective, constraints
+    # and the bounds of the variables used), so identical problems are only solved once even if
+    # their names differ. The most recently used maxSize results are kept in memory; if a
+    # filename is given, all the results are also stored in a shelve file and survive restarts.
+    def __init__(self, maxSize = 1024, Filename = None):
+        self.maxSize = maxSize
+        self.memory = OrderedDict()
+        self.Filename = Filename
+        self.disk = shelve.open(Filename) if Filename else None
+        self.hits, self.diskHits, self.misses = 0, 0, 0
+    def key(self, problem, opt = False, skip = ()):
+        # A hash of a canonical description of the problem; the order of terms and of constraints
+        # is irrelevant, except that a frozen block of constraints is represented by its text.
+        objective = sorted([(var, toExact(coeff)) for (var, coeff) in problem.objective])
+        start, frozen = 0, ''
+        if problem.frozen is not None:
+            start = problem.frozen[0]
+            frozen = hashlib.sha1(problem.frozen[1].encode()).hexdigest()
+        constraints = sorted([(sorted([(var, toExact(coeff)) for (var, coeff) in terms]), sense, toExact(rhs)) for (terms, sense, rhs) in problem.constraints[start:]])
+        bounds = sorted([(var, problem.getBounds(var)) for var in problem.getVariables() if var in problem.bounds])
+        bounds = [(var, (toExact(lower), toExact(upper))) for (var, (lower, upper)) in bounds if (lower, upper) != (0, None)]
+        description = repr((problem.sense, bool(opt), tuple(skip), objective, frozen, constraints, bounds))
+        return hashlib.sha1(description.encode()).hexdigest()
+    def get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(self.memory[key])
+        if self.disk is not None and key in self.disk:
+            self.diskHits += 1
+            result = self.disk[key]
+            self.remember(key, result)
+            return copy.deepcopy(result)
+        self.misses += 1
+        return None
+    def put(self, key, result):
+        if result is None or isLimited(result) or (type(result) == type(()) and isLimited(result[0])):
+            return # nothing is learned from a failed or interrupted solve
+        self.remember(key, copy.deepcopy(result))
+        if self.disk is not None:
+            self.disk[key] = result
+        return
+    def remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxSize:
+            self.memory.popitem(last = False)
+        return
+    def getStats(self):
+        return {'hits': self.hits, 'diskHits': self.diskHits, 'misses': self.misses, 'size': len(self.memory)}
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        return
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+        return
+
+CACHE = None
+
+def setCache(maxSize = 1024, Filename = None):
+    # Replaces the result cache used by solveProblem; maxSize = 0 disables caching entirely,
+    # which is the default. If a filename is specified, the results are also kept on disk in
+    # a shelve file. To cache the problems of a single computation, use useCache instead.
+    global CACHE
+    if CACHE is not None:
+        CACHE.close()
+    if maxSize > 0:
+        CACHE = LPCache(maxSize, Filename)
+    else:
+        CACHE = None
+    return
+
+def useCache(cache = None):
+    # Installs an LPCache as the result cache, for a computation that solves many identical
+    # problems (by default, a new one, unless a cache is already in use); returns the cache in
+    # use before, which restoreCache puts back once the computation is over.
+    global CACHE
+    previous = CACHE
+    if cache is not None:
+        CACHE = cache
+    elif CACHE is None:
+        CACHE = LPCache()
+    return previous
+
+def restoreCache(previous):
+    global CACHE
+    CACHE = previous
+    return
+
+def getCacheStats():
+    # Returns the numbers of hits and misses of the result cache
+    if CACHE is None:
+        return {}
+    return CACHE.getStats()
+
+HYBRID = None
+
+def getHybridSolver():
+    # Returns a hybrid back-end using the current back-end as its exact fallback
+    global HYBRID
+    solver = getSolver()
+    if isinstance(solver, HybridBackend):
+        return solver
+    if HYBRID is None or HYBRID.exact is not solver:
+        HYBRID = HybridBackend(solver)
+    return HYBRID
+
+def solveProblem(problem, opt = False, hybrid = False, skip = ()):
+    # Solves a given LinearProblem with the current back-end; the result has the same
+    # format as the one returned by parseOutput for the corresponding value of opt.
+    # If hybrid is True, a floating-point solution is tried and certified exactly first.
+    # Variables starting with one of the prefixes in skip are left out of the solution.
+    # If a result cache is in use (see setCache and useCache), problems identical to ones
+    # solved before are answered from it.
+    # Every call is recorded in STATS under the name of the function that made it.
+    checkCancelled()
+    build = time.time() - problem.created
+    if CACHE is not None:
+        key = CACHE.key(problem, opt, skip)
+        result = CACHE.get(key)
+        if result is not None:
+            STATS.record(findCallSite(), problem.getSize(), build, 0.0, 0.0, getStatus(result, opt), True)
+            return result
+    solver = getHybridSolver() if hybrid else getSolver()
+    (result, solve, parse) = timeSolve(solver, problem, opt, skip)
+    STATS.record(findCallSite(), problem.getSize(), build, solve, parse, getStatus(result, opt))
+    if CACHE is not None:
+        CACHE.put(key, result)
+    return result
+
+def findScratchDirectory():
+    # Returns a directory for temporary LP files, preferably on a memory-backed filesystem
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+SCRATCH = {}
+FILE_COUNTER = itertools.count()
+
+def getScratchDirectory():
+    # Returns the scratch directory of the current process, creating it if necessary.
+    # It is keyed by process id so that forked children never share their parent's files,
+    # and it is removed when the process exits (including multiprocessing workers); the
+    # directory of a forked child lies inside its parent's one, so it never outlives it.
+    pid = os.getpid()
+    if pid not in SCRATCH:
+        parents = list(SCRATCH.values())
+        base = parents[-1] if parents else findScratchDirectory()
+        SCRATCH[pid] = tempfile.mkdtemp(prefix = 'mongoose_' + str(pid) + '_', dir = base)
+        multiprocessing.util.Finalize(None, shutil.rmtree, args = (SCRATCH[pid], True), exitpriority = 0)
+    return SCRATCH[pid]
+
+def removeFile(Filename):
+    # Deletes a file if it exists
+    try:
+        os.remove(Filename)
+    except OSError:
+        pass
+    return
+
+POOL_SOLVER = None
+POOL_TEMPLATE = None
+
+def initPoolWorker(path, scratch, template = None):
+    # Prepares the back-end of a pool worker; esolver workers get their own scratch directory
+    global POOL_SOLVER, POOL_TEMPLATE
+    POOL_TEMPLATE = template
+    solver = getSolver()
+    if isinstance(solver, EsolverBackend):
+        directory = tempfile.mkdtemp(prefix = 'worker' + str(os.getpid()) + '_', dir = scratch)
+        solver = EsolverBackend(path if path is not None else solver.path, solver.suppressOutput, directory, solver.timeout, solver.memory)
+    POOL_SOLVER = solver
+    return
+
+def solveInPoolWorker(args):
+    # Returns the result along with the size and timings of the problem, for LPStats;
+    # the building time of a problem sent to the pool is measured by the parent process.
+    (problem, opt) = args
+    (result, solve, parse) = timeSolve(POOL_SOLVER, problem, opt)
+    return (result, (problem.getSize(), None, solve, parse))
+
+def solveQueryInPoolWorker(args):
+    (query, opt) = args
+    start = time.time()
+    problem = POOL_TEMPLATE.build(**query)
+    build = time.time() - start
+    (result, solve, parse) = timeSolve(POOL_SOLVER, problem, opt)
+    return (result, (problem.getSize(), build, solve, parse))
+
+def getBuildTimes(problems):
+    now = time.time()
+    return [now - problem.created for problem in problems]
+
+def recordPoolResults(solved, opt = False, builds = None):
+    # Records the calls solved by pool workers under the current call site and returns their results
+    site = findCallSite()
+    results = []
+    for i, (result, (size, build, solve, parse)) in enumerate(solved):
+        if build is None:
+            build = builds[i]
+        STATS.record(site, size, build, solve, parse, getStatus(result, opt))
+        results.append(result)
+    return results
+
+class SolverPool:
+    # A pool of long-lived worker processes to which linear problems can be submitted.
+    # Each worker keeps its own back-end; esolver workers exchange files with esolver in
+    # a private directory on tmpfs, so that concurrent problems never share a file name.
+    # The number of workers defaults to the number of available cores. If a template (any
+    # object with a build method returning a LinearProblem) is given, it is sent to each
+    # worker once, and queries - dictionaries of arguments to build - can then be solved.
+    def __init__(self, workers = None, path = None, scratch = None, template = None):
+        if workers is None or workers <= 0:
+            workers = multiprocessing.cpu_count()
+        if scratch is None:
+            scratch = findScratchDirectory()
+        self.workers = workers
+        self.template = template
+        self.scratch = tempfile.mkdtemp(prefix = 'mongoose_', dir = scratch)
+        self.pool = multiprocessing.Pool(workers, initPoolWorker, (path, self.scratch, template))
+    def wait(self, pending):
+        # Waits for an asynchronous result, terminating the workers if the computation is cancelled
+        while not pending.ready():
+            pending.wait(0.1)
+            try:
+                checkCancelled()
+            except Cancelled:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+                shutil.rmtree(self.scratch, ignore_errors = True)
+                raise
+        return pending.get()
+    def solve(self, problem, opt = False):
+        builds = getBuildTimes([problem])
+        return recordPoolResults([self.wait(self.pool.apply_async(solveInPoolWorker, ((problem, opt),)))], opt, builds)[0]
+    def map(self, problems, opt = False):
+        # Solves a list of problems and returns the list of their results in the same order
+        # If a result cache is in use, only the problems not found in it are sent to the workers.
+        builds = getBuildTimes(problems)
+        if CACHE is None:
+            return recordPoolResults(self.wait(self.pool.map_async(solveInPoolWorker, [(problem, opt) for problem in problems], chunksize = 1)), opt, builds)
+        keys = [CACHE.key(problem, opt) for problem in problems]
+        results = [CACHE.get(key) for key in keys]
+        missing = [i for i in range(len(problems)) if results[i] is None]
+        site = findCallSite()
+        for i in range(len(problems)):
+            if results[i] is not None:
+                STATS.record(site, problems[i].getSize(), builds[i], 0.0, 0.0, getStatus(results[i], opt), True)
+        solved = recordPoolResults(self.wait(self.pool.map_async(solveInPoolWorker, [(problems[i], opt) for i in missing], chunksize = 1)), opt, [builds[i] for i in missing])
+        for i, result in zip(missing, solved):
+            CACHE.put(keys[i], result)
+            results[i] = result
+        return results
+    def mapQueries(self, queries, opt = False):
+        # Solves the problems built by the template from a list of queries, in the same order.
+        # When the result cache is on, each problem is also built here to compute its key, and
+        # only the queries whose problems are not found in the cache are sent to the workers.
+        if CACHE is None:
+            return recordPoolResults(self.wait(self.pool.map_async(solveQueryInPoolWorker, [(query, opt) for query in queries], chunksize = 1)), opt)
+        keys, results = [], []
+        site = findCallSite()
+        for query in queries:
+            start = time.time()
+            problem = self.template.build(**query)
+            keys.append(CACHE.key(problem, opt))
+            results.append(CACHE.get(keys[-1]))
+            if results[-1] is not None:
+                STATS.record(site, problem.getSize(), time.time() - start, 0.0, 0.0, getStatus(results[-1], opt), True)
+        missing = [i for i in range(len(queries)) if results[i] is None]
+        solved = recordPoolResults(self.wait(self.pool.map_async(solveQueryInPoolWorker, [(queries[i], opt) for i in missing], chunksize = 1)), opt)
+        for i, result in zip(missing, solved):
+            CACHE.put(keys[i], result)
+            results[i] = result
+        return results
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            shutil.rmtree(self.scratch, ignore_errors = True)
+        return
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+def solveProblems(problems, opt = False, pool = None):
+    # Solves a list of problems, in the given pool if there is one, and returns their results
+    if pool is None:
+        return [solveProblem(problem, opt) for problem in problems]
+    return pool.map(problems, opt)
+
+def limitMemory(memory):
+    # Returns a function limiting the address space of a child process to the given size
+    def setLimit():
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    return setLimit
+
+def processFile(Filename, opt = False, destroyIn = True, destroyOut = True, suppressOutput = True, path = None, skip = (), timeout = None, memory = None):
+    # This function processes the linear programming problem described in the specified file.
+    # It submits it to the exact rational solver, processes the output and returns the solution
+    # If a timeout (in seconds) or a memory limit (in bytes) is given and the solver exceeds it,
+    # the value returned is TIMEOUT or OUT_OF_MEMORY, respectively. The solver is also killed if
+    # the cancellation token of the current thread is cancelled, and Cancelled is then raised.
+    if path is None:
+        path = ESOLVER_PATH
+    outFile = Filename.replace('.lp', '.sol')
+    output = subprocess.DEVNULL if suppressOutput else None
+    command = [path, "-O", outFile, Filename]
+    if memory and os.name == 'posix':
+        # the limit is set by a shell rather than a preexec_fn, which is unsafe with threads
+        command = ['/bin/sh', '-c', 'ulimit -v ' + str(max(memory // 1024, 1)) + ' && exec "$0" "$@"'] + command
+    process = subprocess.Popen(command, stdout = output, stderr = output)
+    token = getCancelToken()
+    start = time.time()
+    status = None
+    while True:
+        try:
+            process.wait(timeout = (0.1 if token is not None else timeout))
+            break
+        except subprocess.TimeoutExpired:
+            if token is not None and token.isCancelled():
+                status = 'cancelled'
+            elif timeout is not None and time.time() - start >= timeout:
+                status = TIMEOUT
+            else:
+                continue
+            process.kill()
+            process.wait()
+            break
+    if status is None and memory and process.returncode != 0 and not os.path.exists(outFile):
+        status = OUT_OF_MEMORY
+    if destroyIn:
+        removeFile(Filename)
+    if status is not None:
+        removeFile(outFile)
+        if status == 'cancelled':
+            raise Cancelled()
+        return (status, {}) if opt else status
+    start = time.time()
+    result = parseOutput(outFile, opt, skip = skip)
+    setParseTime(time.time() - start)
+    if destroyOut:
+        removeFile(outFile)
+    return result
+
+NUMBER = re.compile(r'(-?[0-9]+)(?:/([0-9]+))?$')
+
+def parseNumber(string):
+    # Converts a number from a solution file into a Fraction; integers and num/den ratios,
+    # which is how QSOpt_ex writes its values, are recognized directly, anything else goes
+    # through the general (and much slower) convertToFraction.
+    match = NUMBER.match(string)
+    if match:
+        (num, den) = match.groups()
+        if den is None:
+            return Fraction(int(num))
+        return Fraction(int(num), int(den))
+    return convertToFraction(string)
+
+def parseOutput(Filename, opt = False, verbose = False, skip = ()):
+    # This function parses a solution file in the QSOpt_ex format
+    # and returns a list containing the value of the objective function ([] if
+    # the problem is infeasible, [float('Inf')] if it is unbounded, else [num, den]).
+    # If opt = TRUE, also returns a dictionary with values of the nonzero variables.
+    # The file is read line by line; variables whose names start with one of the prefixes
+    # in skip are not converted and are left out of the dictionary.
+    skip = tuple(skip)
+    dico = {}
+    with open(Filename, 'r') as f:
+        status = f.readline().strip()
+        if status == 'status = OPTIMAL':
+            f.readline()
+            valueLine = f.readline().strip()
+            index = valueLine.index('=')
+            value = parseNumber(valueLine[index+2:])
+        elif status == 'status = UNBOUNDED':
+            if verbose:
+                print('Note: problem is unbounded!')
+            value = [float('Inf')]
+        elif status == 'status = INFEASIBLE':
+            if verbose:
+                print('Note: problem is infeasible!')
+            value = []
+        else:
+            if verbose:
+                print('Problem: A solution was not found!')
+            return
+        if not opt:
+            return value
+        if type(value) == type(zero):
+            # the optimal value is finite
+            f.readline()
+            for line in f:
+                index = line.find('=')
+                if index < 0:
+                    break
+                varName = line[:index-1].strip()
+                if skip and varName.startswith(skip):
+                    continue
+                dico[varName] = parseNumber(line[index+2:].strip())
+    return (value, dico)
@@ -97,13 +97,29 @@ class WorkerThread(QtCore.QThread):
         self.additional_name = additional_name
         self.execute_action = execute_action
         self.compartment_name = compartment_name
+        self.token = CancelToken()
 
     # thread waits when deletes
     def __del__(self):
         self.wait()
 
-    # action thread runs
+    # stops the running action at the next check (a running solver process is killed)
+    def cancel(self):
+        self.token.cancel()
+
+    # thread runs the action, which can be cancelled from another thread
     def run(self):
+        setCancelToken(self.token)
+        try:
+            self.runAction()
+        except Cancelled:
+            print("The action was cancelled")
+            self.execute_action.setEnabled(True)
+        finally:
+            setCancelToken(None)
+
+    # action thread runs
+    def runAction(self):
         if(self.index_name == self.reduceNetwork):
             self.execute_action.setEnabled(False)
             print(getattr(self.model_name, self.function_name)())
@@ -184,10 +200,17 @@ class Ui_MainWindow(object):
 
         # intializes executeAction button
         self.executeAction = QtGui.QPushButton(self.centralwidget)
-        self.executeAction.setGeometry(QtCore.QRect(20, 330, 200, 32))
+        self.executeAction.setGeometry(QtCore.QRect(20, 330, 145, 32))
         self.executeAction.setObjectName(_fromUtf8("executeAction"))
         self.executeAction.setEnabled(False)
 
+        # intializes cancelAction button, which stops the action running in the worker thread
+        self.cancelAction = QtGui.QPushButton(self.centralwidget)
+        self.cancelAction.setGeometry(QtCore.QRect(162, 330, 59, 32))
+        self.cancelAction.setObjectName(_fromUtf8("cancelAction"))
+        self.cancelAction.clicked.connect(self.cancel_action)
+        self.cancelAction.setEnabled(False)
+
         # intializes saveContent button
         self.saveContent = QtGui.QPushButton(self.centralwidget)
         self.saveContent.setGeometry(QtCore.QRect(20, 360, 200, 32))
@@ -350,6 +373,8 @@ class Ui_MainWindow(object):
     def retranslateUi(self, MainWindow):
         MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow", None))
         self.executeAction.setText(_translate("MainWindow", "Execute Action", None))
+        self.cancelAction.setText(_translate("MainWindow", "Cancel", None))
+        self.cancelAction.setToolTip(_translate("MainWindow", "<html><head/><body><p>Stops the running action. A running esolver is killed at once; otherwise the action stops before its next linear program.</p></body></html>", None))
         self.saveContent.setText(_translate("MainWindow", "Save Contents", None))
         self.saveChangedModelContent.setText(_translate("MainWindow", "Save Changed Contents", None))
         self.selectFile.setText(_translate("MainWindow", "Upload File", None))
@@ -439,6 +464,18 @@ class Ui_MainWindow(object):
         global model
         model = s[desiredModel]
 
+    # starts the worker thread; its action can be cancelled until it finishes
+    def start_thread(self):
+        self.myThread.finished.connect(partial(self.cancelAction.setEnabled, False))
+        self.cancelAction.setEnabled(True)
+        self.myThread.start()
+
+    # cancels the action running in the worker thread, if any
+    def cancel_action(self):
+        if getattr(self, 'myThread', None) is not None and self.myThread.isRunning():
+            print("Cancelling the action...")
+            self.myThread.cancel()
+
     # saves contents of console to desired text file
     def save_content (self):
         choice = QtGui.QMessageBox.question(QtGui.QMainWindow(), 'Save Contents', 'Are you sure you want to save the contents?', QtGui.QMessageBox.No | QtGui.QMessageBox.Yes)
@@ -852,7 +889,7 @@ class Ui_MainWindow(object):
                         list = [[Fraction(el) for el in addReactionPairs.split(',')]]
 
                     self.myThread = WorkerThread(model,function1, ADD_RXN,self.executeAction, addReactionName, list)
-                    self.myThread.start()
+                    self.start_thread()
 
                 # addMetabolite requires two parameters:
                 # parameter 1: reaction name
@@ -863,7 +900,7 @@ class Ui_MainWindow(object):
                     addMetaboliteName = str(self.rxnParam1.text())
                     addMetaboliteCompartment = str(self.rxnParam2.text())
                     self.myThread = WorkerThread(model,function1, ADD_METAB,self.executeAction, addMetaboliteName, [] ,addMetaboliteCompartment)
-                    self.myThread.start()
+                    self.start_thread()
 
                 # deleteMetabolites/deleteReaction requires two parameters:
                 # parameter 1: reaction name
@@ -884,10 +921,10 @@ class Ui_MainWindow(object):
                         list = [Fraction(el) for el in param1.split(',')]
                     if(index1 == DELETE_METAB):
                         self.myThread = WorkerThread(model,function1, DELETE_METAB,self.executeAction, "", list)
-                        self.myThread.start()
+                        self.start_thread()
                     else:
                         self.myThread = WorkerThread(model,function1, DELETE_RXN,self.executeAction, "", list)
-                        self.myThread.start()
+                        self.start_thread()
                 else:
 
                     function1 = str(self.chooseFunction1.currentText())
@@ -896,10 +933,10 @@ class Ui_MainWindow(object):
                         #XStream.stdout().messageWritten.connect( self.changedResultOutput.append ) #redirects print statements from terminal to output widget
                         print("Reducing network")
                         self.myThread = WorkerThread(model,function1, REDUCE_NETWORK, self.executeAction) #multi threading
-                        self.myThread.start()
+                        self.start_thread()
                     elif(index1 == FIND_ESS_RXN):
                         self.myThread = WorkerThread(model,function1, FIND_ESS_RXN, self.executeAction) #multi threading
-                        self.myThread.start()
+                        self.start_thread()
                     elif(index1 == FIND_SYNTH_LETH_PAIRS):
                         numProc = self.chooseParallel.text()
                         if numProc:
@@ -911,12 +948,12 @@ class Ui_MainWindow(object):
                         elif(numProc == 0):
                             print("Finding synthetic lethal pairs")
                             self.myThread = WorkerThread(model,function1, FIND_SYNTH_LETH_PAIRS,self.executeAction) #multi threading
-                            self.myThread.start()
+                            self.start_thread()
                         else:
                             numProc = 0
                             print("Finding synthetic lethal pairs")
                             self.myThread = WorkerThread(model,function1, FIND_SYNTH_LETH_PAIRS,self.executeAction) #multi threading
-                            self.myThread.start()
+                            self.start_thread()
                     else:
                         print(getattr(model, function1)())
 
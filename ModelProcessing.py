@@ -2,23 +2,22 @@
 # Created by: Leonid Chindelevitch
 # Last modified: January 30, 2017
 
-import os, copy, itertools, random, subprocess, shelve
+import os, copy, itertools, random, subprocess, shelve, collections, hashlib
 
 from functools import reduce
 from decimal import Decimal
 from math import gcd
 from fractions import Fraction
 from Utilities import *
+from LPSolvers import *
+from ExactElimination import *
+from SparseMatrix import *
+from Rationals import *
 import multiprocessing
 
 zero, one = Fraction(0), Fraction(1)
 
-#Docker ESOLVER_PATH:
-ESOLVER_PATH = "/qsopt-ex/build/esolver/.libs/esolver"
-#ESOLVER_PATH = "/Users/christopherle/Documents/Leonid/qsopt-ex/build/esolver/.libs/esolver"
-#ESOLVER_PATH = "/Users/Admin/Downloads/DownloadedSoftware/qsopt-ex/build/esolver/.libs/esolver"
-
-def reduceMatrix(N, Irr, Filename = 'Reduction.txt'):
+def reduceMatrix(N, Irr, Filename = 'Reduction.txt', statsFile = None, workers = 0, memo = None, checkpoint = None, cache = None):
     # This function computes the reduced form of a given stoichiometric matrix
     # assuming that the specified list of reactions is irreversible.
     # The reduction proceeds in several steps, each of which is verified using
@@ -30,7 +29,42 @@ def reduceMatrix(N, Irr, Filename = 'Reduction.txt'):
     # 4) Find and process the semi-blocked reactions.
     # 5) Find and group reaction subsets.
     # 6) Find and delete redundant constraints.
-
+    # If statsFile is specified, the linear programs solved during the reduction are
+    # written into it at the end, as JSON or CSV depending on its extension (see LPStats).
+    # The matrix is processed as a StoichMatrix; the reduced matrix is returned as a list
+    # of lists unless N itself was given as a StoichMatrix.
+    # The linear programs of steps 2 and 4 are solved for each connected component of the
+    # matrix separately; if workers > 1, this specifies the number of processes to use, among
+    # which the components are distributed (or, in step 4, the problems of a single one).
+    # If memo is a ReductionMemo, the results of steps 2-4 for each component are stored in
+    # it, and those already in it are reused; passing the memo of the previous reduction of
+    # a network makes the reduction of an edited version of it incremental, since only the
+    # components changed by the edit are processed again (the other steps involve no LPs).
+    # If checkpoint is the name of a file, the state of the reduction is saved into it after
+    # every step (and after every batch of candidates in step 4, see findUnidirectional), and
+    # a reduction of the same matrix that was interrupted resumes from the last one saved;
+    # the checkpoint is emptied once the reduction is complete, so a later call starts afresh.
+    # If cache is a ReductionCache, the reduction is looked up in it first, and stored in it
+    # otherwise; the description of a reduction read from the cache mentions it at the end.
+
+    firstCall = getLPStats().getCount()
+    compact = isCompact(N)
+    if cache is not None:
+        cacheKey = getMatrixHash(N, Irr, 'reduceMatrix', (compact,))
+        result = cache.get(cacheKey)
+        if result is not None:
+            (current, Irrev), reductionRecord = result[:2], result[2:]
+            describeReduction(reductionRecord, Filename, EBA = False)
+            noteCachedReduction(Filename)
+            extraFilename = Filename[:-4] + 'Full' + Filename[-4:]
+            writeResults(current, Irrev, reductionRecord, extraFilename)
+            return result
+    if memo is not None:
+        memo.start()
+    if not compact:
+        N = StoichMatrix(N)
+    if checkpoint:
+        checkpoint = Checkpoint(checkpoint, getMatrixHash(N, Irr, 'reduceMatrix'))
     # rows[i], cols[i] contains the iteration at which the i-th row, column was deleted
     m, n = getSize(N)
     rows, cols = [0]*m, [0]*n
@@ -38,59 +72,119 @@ def reduceMatrix(N, Irr, Filename = 'Reduction.txt'):
     currows, curcols = list(range(m)), list(range(n))
     # currirrev is True for the current irreversible reactions, False otherwise
     curirrev = [bool(x in Irr) for x in range(n)]
-    Iter = 1
-    print((str(Iter) + ') Finding and deleting topology-blocked reactions.'))
-    (deadRows, deadCols, current) = processDeadEnds(N, False)
-    updateRecord(rows, currows, deadRows, Iter)
-    updateRecord(cols, curcols, deadCols, Iter)
-    currows  = filterOut(currows,  deadRows)
-    curcols  = filterOut(curcols,  deadCols)
-    curirrev = filterOut(curirrev, deadCols)
-    Iter = 2
-    print((str(Iter) + ') Finding and deleting irreversibility-blocked reactions.'))
-    (TBlocked, current) = processTBlocked(current, curirrev)
-    thermoBlocked = mapList(TBlocked, curcols)
-    updateRecord(cols, curcols, TBlocked, Iter)
-    curcols  = filterOut(curcols,  TBlocked)
-    curirrev = filterOut(curirrev, TBlocked)
-    Iter = 3
-    print((str(Iter) + ') Finding and deleting stoichiometry-blocked reactions'))
-    (SBlocked, current, curB) = processSBlocked(current)
-    stoichioBlocked = mapList(SBlocked, curcols)
-    updateRecord(cols, curcols, SBlocked, Iter)
-    curcols  = filterOut(curcols,  SBlocked)
-    curirrev = filterOut(curirrev, SBlocked)
-    Iter = 4
-    print((str(Iter) + ') Finding and processing the semi-blocked reactions'))
-    (onlyPos, onlyNeg, current) = processUnidirectional(current, curirrev, option = 'null')
-    onlyPositive = mapList(onlyPos, curcols)
-    onlyNegative = mapList(onlyNeg, curcols)
-    updateRecord(cols, curcols, onlyPos + onlyNeg, Iter)
-    for i in onlyPos + onlyNeg:
-        curirrev[i] = True
-    # adjust the nullspace by flipping the reactions that can carry only negative fluxes
-    for i in onlyNeg:
-        curB[i] = [-curB[i][k] for k in range(len(curB[i]))]
-    Iter = 5
-    print((str(Iter) + ') Finding and grouping reaction subsets.'))
-    (Enzymes, lumpedReacts, subsetReacts, current) = processSubsets(current, curB)
-    Enzymes = [list(zip(mapList(subset[0], curcols), subset[1])) for subset in Enzymes]
-    updateRecord(cols, curcols, subsetReacts, Iter)
-    curcols  = filterOut(curcols,  lumpedReacts)
-    curirrev = filterOut(curirrev, lumpedReacts)
-    Iter = 6
-    print((str(Iter) + ') Finding and deleting redundant constraints'))
-    (redRows, current) = processRedundant(current)
-    updateRecord(rows, currows, redRows, Iter)
-    currows = filterOut(currows, redRows)
+    current, curB, onlyPositive, onlyNegative, Enzymes = N, None, [], [], []
+    done = 0
+    if checkpoint:
+        (done, state) = checkpoint.get('stage', (0, None))
+        if done:
+            print(('Resuming the reduction after step ' + str(done)))
+            (rows, cols, currows, curcols, curirrev, current, curB, onlyPositive, onlyNegative, Enzymes) = state
+    def saveStage(Iter):
+        if checkpoint:
+            checkpoint.put('stage', (Iter, (rows, cols, currows, curcols, curirrev, current, curB, onlyPositive, onlyNegative, Enzymes)))
+    if done < 1:
+        Iter = 1
+        print((str(Iter) + ') Finding and deleting topology-blocked reactions.'))
+        (deadRows, deadCols, current) = processDeadEnds(current, False)
+        updateRecord(rows, currows, deadRows, Iter)
+        updateRecord(cols, curcols, deadCols, Iter)
+        currows  = filterOut(currows,  deadRows)
+        curcols  = filterOut(curcols,  deadCols)
+        curirrev = filterOut(curirrev, deadCols)
+        saveStage(Iter)
+    if done < 2:
+        Iter = 2
+        print((str(Iter) + ') Finding and deleting irreversibility-blocked reactions.'))
+        (TBlocked, current) = processTBlocked(current, curirrev, workers, memo)
+        updateRecord(cols, curcols, TBlocked, Iter)
+        curcols  = filterOut(curcols,  TBlocked)
+        curirrev = filterOut(curirrev, TBlocked)
+        saveStage(Iter)
+    if done < 3:
+        Iter = 3
+        print((str(Iter) + ') Finding and deleting stoichiometry-blocked reactions'))
+        (SBlocked, current, curB) = processSBlocked(current, memo)
+        updateRecord(cols, curcols, SBlocked, Iter)
+        curcols  = filterOut(curcols,  SBlocked)
+        curirrev = filterOut(curirrev, SBlocked)
+        saveStage(Iter)
+    if done < 4:
+        Iter = 4
+        print((str(Iter) + ') Finding and processing the semi-blocked reactions'))
+        (onlyPos, onlyNeg, current) = processUnidirectional(current, curirrev, option = 'null', workers = workers, memo = memo, progress = checkpoint or None)
+        onlyPositive = mapList(onlyPos, curcols)
+        onlyNegative = mapList(onlyNeg, curcols)
+        updateRecord(cols, curcols, onlyPos + onlyNeg, Iter)
+        for i in onlyPos + onlyNeg:
+            curirrev[i] = True
+        # adjust the nullspace by flipping the reactions that can carry only negative fluxes
+        for i in onlyNeg:
+            curB[i] = [-curB[i][k] for k in range(len(curB[i]))]
+        saveStage(Iter)
+    if done < 5:
+        Iter = 5
+        print((str(Iter) + ') Finding and grouping reaction subsets.'))
+        (Enzymes, lumpedReacts, subsetReacts, current) = processSubsets(current, curB)
+        Enzymes = [list(zip(mapList(subset[0], curcols), subset[1])) for subset in Enzymes]
+        updateRecord(cols, curcols, subsetReacts, Iter)
+        curcols  = filterOut(curcols,  lumpedReacts)
+        curirrev = filterOut(curirrev, lumpedReacts)
+        saveStage(Iter)
+    if done < 6:
+        Iter = 6
+        print((str(Iter) + ') Finding and deleting redundant constraints'))
+        (redRows, current) = processRedundant(current)
+        updateRecord(rows, currows, redRows, Iter)
+        currows = filterOut(currows, redRows)
+        saveStage(Iter)
+    if checkpoint:
+        checkpoint.clear()
+        checkpoint.close()
+    if memo is not None:
+        print(('Reused the results of ' + str(memo.hits) + ' out of ' + str(memo.hits + memo.misses) + ' component computations'))
+    if not compact:
+        current = current.toDense()
     reductionRecord = (rows, cols, onlyPositive, onlyNegative, Enzymes)
     describeReduction(reductionRecord, Filename, EBA = False)
     Irrev = findTrueIndices(curirrev)
     extraFilename = Filename[:-4] + 'Full' + Filename[-4:]
     writeResults(current, Irrev, reductionRecord, extraFilename)
+    if statsFile:
+        dumpLPStats(statsFile, firstCall)
+    if cache is not None:
+        cache.put(cacheKey, (current, Irrev) + reductionRecord)
     return (current, Irrev) + reductionRecord
 
-def energyBalanceReduce(Matrix, Irrev, External, Filename = "EnergyReduction.txt", signs = False):
+SIGN_LIMIT = 20
+
+def setSignLimit(limit):
+    # Sets the largest number of internal reversible reactions for which energyBalanceReduce and
+    # fullIterativeReduce extract all possible sign combinations (None for no limit). Although
+    # checkAllSigns prunes the infeasible partial combinations, the number of feasible ones can
+    # still grow exponentially with the number of reactions, so the default is the former fixed
+    # limit; a larger one should only be set once its cost has been measured on the model.
+    global SIGN_LIMIT
+    if limit is not None and limit < 0:
+        print(('Error: invalid sign limit ' + str(limit)))
+        return
+    SIGN_LIMIT = limit
+    return
+
+def withinSignLimit(r):
+    return SIGN_LIMIT is None or r <= SIGN_LIMIT
+
+def energyBalanceReduce(Matrix, Irrev, External, Filename = "EnergyReduction.txt", signs = False, workers = 0, cache = None):
+    # If cache is a ReductionCache, the reduction is looked up in it first (see reduceMatrix).
+    extraFilename = Filename[:-4] + 'Full' + Filename[-4:]
+    if cache is not None:
+        cacheKey = getMatrixHash(Matrix, Irrev, 'energyBalanceReduce', (tuple(sorted(External)), signs))
+        result = cache.get(cacheKey)
+        if result is not None:
+            reductionRecord = result[4:]
+            describeReduction(reductionRecord, Filename, EBA = True)
+            noteCachedReduction(Filename)
+            writeResults(result[0], result[1], tuple([result[2]] + [result[3]]) + reductionRecord, extraFilename)
+            return result
     m, n = getSize(Matrix)
     curirrev   = [bool(x in Irrev) for x in range(n)]
     # create a list of external reactions
@@ -144,8 +238,8 @@ def energyBalanceReduce(Matrix, Irrev, External, Filename = "EnergyReduction.txt
         curIrrev = findTrueIndices (curirrev)
         curRev   = findFalseIndices(curirrev)
         r = len(curRev)
-        if (r > 0 and r <= 20): # NOTE: Do NOT use if r > 20, as it might take too long!
-            allSigns = checkAllSigns(current, curRev)
+        if (r > 0 and withinSignLimit(r)): # NOTE: see setSignLimit
+            allSigns = checkAllSigns(current, curRev, workers)
         else:
             print('No or too many internal reversible reactions!')
     # Step 6) put back the original exchange reactions
@@ -167,41 +261,49 @@ def energyBalanceReduce(Matrix, Irrev, External, Filename = "EnergyReduction.txt
     describeReduction(reductionRecord, Filename, EBA = True)
     Irrev = findTrueIndices(curirrev)
     newExternal = [i for i,x in enumerate(allInds) if x in External]
-    extraFilename = Filename[:-4] + 'Full' + Filename[-4:]
     writeResults(current, Irrev, tuple([newExternal] + [allSigns]) + reductionRecord, extraFilename)
+    if cache is not None:
+        cache.put(cacheKey, (current, Irrev, newExternal, allSigns) + reductionRecord)
     return (current, Irrev, newExternal, allSigns) + reductionRecord
 
-def fullIterativeReduce(Matrix, Irrev, External, Filename = "IterativeReduction.txt"):
+def fullIterativeReduce(Matrix, Irrev, External, Filename = "IterativeReduction.txt", workers = 0, cache = None):
     # Iteratively reduces a system by applying flux-balance and energy-balance constraints
-    Iter = 1
-    (mF,nF) = getSize(Matrix)
-    while(True):
-        print(('Performing iteration ' + str(Iter)))
-        curFilename = Filename[:-4] + 'Energy' + str(Iter) + Filename[-4:]
-        result = energyBalanceReduce(Matrix, Irrev, External, curFilename, False)
-        Matrix, Irrev, External, Record = result[0], result[1], result[2], result[4:]
-        (mE,nE) = getSize(Matrix)
-        print(("The current size of the system is " + str(mE) + " by " + str(nE)))
-        if mE == mF and nE == nF and not (Record[2] + Record[3]):
-            break
-        curFilename = Filename[:-4] + 'Flux' + str(Iter) + Filename[-4:]
-        result = reduceMatrix(Matrix, Irrev, curFilename)
-        Matrix, Irrev, Record = result[0], result[1], result[2:]
-        External = findExternal(External, Record)
+    # If cache is a ReductionCache, each reduction is looked up in it first (see reduceMatrix).
+    # The linear programs are cached while it runs (see useCache), as the successive iterations
+    # solve many identical ones.
+    previous = useCache()
+    try:
+        Iter = 1
         (mF,nF) = getSize(Matrix)
-        print(("The current size of the system is " + str(mF) + " by " + str(nF)))
-        if mF == mE and nF == nE and not (Record[2] + Record[3]):
-            break
-        Iter += 1
-    if len(Matrix) > 0:
-        allRev = [x for x in range(len(Matrix[0])) if x not in Irrev + External]
-        if len(allRev) < 20:
-            print("Extracting the signs")
-            Iter += 1
+        while(True):
+            print(('Performing iteration ' + str(Iter)))
             curFilename = Filename[:-4] + 'Energy' + str(Iter) + Filename[-4:]
-            result = energyBalanceReduce(Matrix, Irrev, External, curFilename, True)
-            Matrix, Irrev, External = result[0], result[1], result[2]
-    return (Matrix, Irrev, External)
+            result = energyBalanceReduce(Matrix, Irrev, External, curFilename, False, cache = cache)
+            Matrix, Irrev, External, Record = result[0], result[1], result[2], result[4:]
+            (mE,nE) = getSize(Matrix)
+            print(("The current size of the system is " + str(mE) + " by " + str(nE)))
+            if mE == mF and nE == nF and not (Record[2] + Record[3]):
+                break
+            curFilename = Filename[:-4] + 'Flux' + str(Iter) + Filename[-4:]
+            result = reduceMatrix(Matrix, Irrev, curFilename, cache = cache)
+            Matrix, Irrev, Record = result[0], result[1], result[2:]
+            External = findExternal(External, Record)
+            (mF,nF) = getSize(Matrix)
+            print(("The current size of the system is " + str(mF) + " by " + str(nF)))
+            if mF == mE and nF == nE and not (Record[2] + Record[3]):
+                break
+            Iter += 1
+        if len(Matrix) > 0:
+            allRev = [x for x in range(len(Matrix[0])) if x not in Irrev + External]
+            if withinSignLimit(len(allRev)):
+                print("Extracting the signs")
+                Iter += 1
+                curFilename = Filename[:-4] + 'Energy' + str(Iter) + Filename[-4:]
+                result = energyBalanceReduce(Matrix, Irrev, External, curFilename, True, workers, cache)
+                Matrix, Irrev, External = result[0], result[1], result[2]
+        return (Matrix, Irrev, External)
+    finally:
+        restoreCache(previous)
 
 def findExternal(initExternal, reductionRecord):
     External = []
@@ -262,8 +364,8 @@ def matrixToGraph(Matrix):
     # This function creates a graph structure for the bipartite graph represented by Matrix.
     # The graph structure is a dictionary of incidence lists; 'R' for rows, 'C' for columns.
     D = {}
-    for ind0, row in enumerate(Matrix):
-        for ind1, elt in enumerate(row):
+    for ind0, row in enumerate(findSparseRows(Matrix)):
+        for (ind1, elt) in row:
             if elt:
                 str0 = 'R' + str(ind0)
                 str1 = 'C' + str(ind1)
@@ -318,23 +420,303 @@ def fullReduce(D, dmin, specialStart, details):
         numNodes = len(D)
     return (D, Causes)
 
+def pruneDeadEnds(Matrix, dmin, details):
+    # This function iteratively deletes the rows of a matrix with at most dmin nonzero entries,
+    # together with the columns in which they have a nonzero entry, until none are left; it is
+    # the equivalent of fullReduce(matrixToGraph(Matrix), dmin, 'R', details), but it uses a
+    # worklist of rows, integer-indexed adjacency lists and degree counters, so that it runs
+    # in time linear in the number of nonzero entries. Returns the deleted rows and columns;
+    # if details = True, additionally returns the causes of deletion for each of the nodes,
+    # with the same 'R'/'C' keys as fullReduce (a row can have more than one possible cause,
+    # and the one recorded may differ from that of fullReduce as the order of deletion does).
+    m, n = getSize(Matrix)
+    rowLists = [[j for (j, x) in row if x] for row in findSparseRows(Matrix)]
+    colLists = [[] for j in range(n)]
+    for i, row in enumerate(rowLists):
+        for j in row:
+            colLists[j].append(i)
+    degrees = [len(row) for row in rowLists]
+    # the rows and columns without nonzero entries are not part of the graph, hence dead
+    deadRows, deadCols = [False]*m, [not col for col in colLists]
+    queued = [degree <= dmin for degree in degrees]
+    queue = collections.deque([i for i in range(m) if queued[i]])
+    Causes = {} if details else None
+    while queue:
+        x = queue.popleft()
+        for y in rowLists[x]:
+            if deadCols[y]:
+                continue
+            deadCols[y] = True
+            for z in colLists[y]:
+                if deadRows[z]:
+                    continue
+                degrees[z] -= 1
+                if degrees[z] <= dmin:
+                    if details and ('R' + str(z)) not in Causes:
+                        Causes['R' + str(z)] = 'C' + str(y)
+                    if not queued[z]:
+                        queued[z] = True
+                        queue.append(z)
+            if details and ('C' + str(y)) not in Causes:
+                Causes['C' + str(y)] = 'R' + str(x)
+        deadRows[x] = True
+    badRows = [i for i in range(m) if deadRows[i]]
+    badCols = [j for j in range(n) if deadCols[j]]
+    return (badRows, badCols, Causes)
+
 def processDeadEnds(Matrix, details):
     # This function finds and returns the dead ends (rows and columns) of a given
     # stoichiometric matrix, as well as a reduced version of the stoichiometric
     # matrix; if the details flag is True, also returns the cause of each "death"
     m, n = getSize(Matrix)
-    D = matrixToGraph(Matrix)
-    (reducedD, Causes) = fullReduce(D, 1, 'R', details)
-    goodRows = sorted([int(x[1:]) for x in reducedD if x.startswith('R')])
-    goodCols = sorted([int(x[1:]) for x in reducedD if x.startswith('C')])
-    badRows = [x for x in range(m) if x not in goodRows]
-    badCols = [x for x in range(n) if x not in goodCols]
-    reducedMatrix = [[Matrix[x][y] for y in goodCols] for x in goodRows]
+    (badRows, badCols, Causes) = pruneDeadEnds(Matrix, 1, details)
+    goodRows = filterOut(list(range(m)), set(badRows))
+    goodCols = filterOut(list(range(n)), set(badCols))
+    reducedMatrix = selectSubmatrix(Matrix, goodRows, goodCols)
     if details:
         return (badRows, badCols, reducedMatrix, Causes)
     else:
         return (badRows, badCols, reducedMatrix)
 
+def findComponents(N):
+    # This function finds the connected components of the bipartite graph whose nodes are the
+    # rows (metabolites) and the columns (reactions) of a given matrix, using union-find.
+    # Returns a list of pairs (rows, columns) of sorted indices, in the order of their first
+    # column; the rows without nonzero entries are left out, and the columns without nonzero
+    # entries, which are independent of everything else, are added to the first component.
+    m, n = getSize(N)
+    parent = list(range(m + n)) # the rows come first, followed by the columns
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    nonzero = [False]*n
+    for i, row in enumerate(findSparseRows(N)):
+        for (j, x) in row:
+            if x:
+                nonzero[j] = True
+                a, b = find(i), find(m + j)
+                if a != b:
+                    parent[a] = b
+    components, index = [], {}
+    for j in range(n):
+        if nonzero[j]:
+            root = find(m + j)
+            if root not in index:
+                index[root] = len(components)
+                components.append(([], []))
+            components[index[root]][1].append(j)
+    for i in range(m):
+        root = find(i)
+        if root in index:
+            components[index[root]][0].append(i)
+    empty = [j for j in range(n) if not nonzero[j]]
+    if empty:
+        if components:
+            components[0] = (components[0][0], sorted(components[0][1] + empty))
+        else:
+            components = [([], empty)]
+    return components
+
+def solveComponent(args):
+    # Runs a function in a worker process of mapComponents; the linear programs it solves are
+    # returned along with its result, so that they can be added to the parent's LPStats.
+    (function, fargs, extra) = args
+    start = getLPStats().getCount()
+    result = function(*fargs, **extra)
+    return (result, getLPStats().getCalls(None, start))
+
+def mapComponents(function, argsList, workers = 0, extra = {}):
+    # This function applies a function to each tuple of arguments in a list (typically one
+    # per component), with the keyword arguments in extra, and returns the list of results;
+    # if workers > 1, the tuples are processed in parallel by as many worker processes, which
+    # must not start processes of their own.
+    if workers <= 1 or len(argsList) <= 1:
+        return [function(*args, **extra) for args in argsList]
+    pool = multiprocessing.Pool(min(workers, len(argsList)))
+    try:
+        pending = pool.map_async(solveComponent, [(function, args, extra) for args in argsList], chunksize = 1)
+        while not pending.ready():
+            pending.wait(0.1)
+            checkCancelled()
+        solved = pending.get()
+    finally:
+        pool.terminate()
+        pool.join()
+    results = []
+    for (result, calls) in solved:
+        getLPStats().extend(calls)
+        results.append(result)
+    return results
+
+class ReductionMemo:
+    # Stores the results computed by findByComponents and NullspaceByComponents for each
+    # connected component, keyed by the function, its arguments and the entries of the
+    # component, so that a later reduction of an edited network (see reduceMatrix) only
+    # recomputes them for the components that the edit has changed. Only the results used
+    # since the last call to start are kept by the following one.
+    def __init__(self):
+        self.previous, self.current = {}, {}
+        self.hits, self.misses = 0, 0
+    def start(self):
+        self.previous, self.current = self.current, {}
+        self.hits, self.misses = 0, 0
+        return
+    def get(self, key):
+        result = self.current.get(key, self.previous.get(key))
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.current[key] = result
+        return result
+    def put(self, key, result):
+        self.current[key] = result
+        return
+
+def getComponentKey(name, args, N, Irrev):
+    # Returns the key of a component for a ReductionMemo; it only depends on the relative
+    # order of the rows and columns of the component, not on their indices in the network.
+    columns = tuple([tuple([(i, convertToFraction(x)) for (i, x) in col]) for col in findSparseColumns(N)])
+    return (name, tuple(args), getSize(N)[0], columns, tuple(Irrev))
+
+def getMatrixHash(N, Irrev, name = '', args = ()):
+    # Returns a hexadecimal digest identifying a matrix and a list of irreversible reactions
+    return hashlib.md5(repr(getComponentKey(name, args, N, sorted(Irrev))).encode()).hexdigest()
+
+class Checkpoint:
+    # A file (a shelf) in which a long computation saves its partial results, so that it can
+    # be resumed after an interruption. The computation is identified by a key; a checkpoint
+    # file left by a different computation is emptied when opened. Every value put into it
+    # is written to disk immediately.
+    def __init__(self, Filename, key):
+        self.shelf = shelve.open(Filename)
+        if self.shelf.get('key') != key:
+            self.shelf.clear()
+            self.shelf['key'] = key
+            self.shelf.sync()
+    def get(self, name, default = None):
+        return self.shelf.get(name, default)
+    def put(self, name, value):
+        self.shelf[name] = value
+        self.shelf.sync()
+        return
+    def clear(self):
+        self.shelf.clear()
+        self.shelf.sync()
+        return
+    def close(self):
+        self.shelf.close()
+        return
+
+class ReductionCache:
+    # A file (a shelf) in which the results of reduceMatrix and energyBalanceReduce, or of any
+    # other computation on a network, are stored under a hash of their input (see getMatrixHash),
+    # so that networks with identical matrices and irreversible reactions, such as the variants
+    # of a model or the same model parsed twice, are only processed once.
+    def __init__(self, Filename = 'ReductionCache'):
+        self.shelf = shelve.open(Filename)
+        self.hits, self.misses = 0, 0
+    def get(self, key):
+        result = self.shelf.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+    def put(self, key, result):
+        self.shelf[key] = result
+        self.shelf.sync()
+        return
+    def close(self):
+        print(('Found ' + str(self.hits) + ' out of ' + str(self.hits + self.misses) + ' results in the reduction cache'))
+        self.shelf.close()
+        return
+
+def noteCachedReduction(Filename):
+    # Records in the description of a reduction that it was read from a ReductionCache.
+    # NOTE: this line must not contain any numbers, as processAll (see RemoteScript) uses them!
+    print('Read the reduction of an identical network from the reduction cache')
+    f = open(Filename, 'a')
+    f.write('Read the reduction of an identical network from the reduction cache!\n')
+    f.close()
+    return
+
+def findByComponents(function, N, Irrev, args = (), workers = 0, memo = None, extra = {}, local = {}, inner = None, complete = None):
+    # This function applies function(subN, subIrrev, *args), which returns a list of columns
+    # or a tuple of such lists, to each connected component of N separately (see findComponents)
+    # and maps the results back to the columns of N; they are merged into increasing order.
+    # This is valid whenever the answer for a column only depends on its own component, as
+    # for the blocked and the unidirectional reactions, and keeps the linear programs small.
+    # If workers > 1, the components are processed in parallel (see mapComponents); if there
+    # is only one component to process and inner is specified, the workers are instead given
+    # to the function through the keyword argument named inner.
+    # If a ReductionMemo is specified, the results found in it are not recomputed; if complete
+    # is specified, only the results for which complete(result) is True are stored in it (so
+    # that, for instance, a result affected by a solver limit is recomputed the next time).
+    # The keyword arguments in extra are passed to the function, but do not affect its results;
+    # those in local are only passed when the function is called in this process.
+    components = findComponents(N)
+    if inner is not None:
+        local = dict(local)
+        local[inner] = workers
+    if not components or (len(components) == 1 and memo is None):
+        return function(N, Irrev, *args, **dict(extra, **local))
+    IrrevSet = set(Irrev)
+    argsList = []
+    for (rows, cols) in components:
+        subIrrev = [k for k, j in enumerate(cols) if j in IrrevSet]
+        argsList.append((selectSubmatrix(N, rows, cols), subIrrev) + tuple(args))
+    if memo is None:
+        keys, results = None, [None]*len(argsList)
+    else:
+        keys = [getComponentKey(function.__name__, args, subN, subIrrev) for (subN, subIrrev) in [x[:2] for x in argsList]]
+        results = [memo.get(key) for key in keys]
+    missing = [k for k in range(len(argsList)) if results[k] is None]
+    if workers > 1 and len(missing) > 1:
+        solved = mapComponents(function, [argsList[k] for k in missing], workers, extra)
+    else:
+        solved = [function(*argsList[k], **dict(extra, **local)) for k in missing]
+    for k, result in zip(missing, solved):
+        if memo is not None and (complete is None or complete(result)):
+            memo.put(keys[k], result)
+        results[k] = result
+    single = (type(results[0]) != type(()))
+    if single:
+        results = [(result,) for result in results]
+    merged = [sorted(sum([mapList(result[k], cols) for ((rows, cols), result) in zip(components, results)], [])) for k in range(len(results[0]))]
+    if single:
+        return merged[0]
+    return tuple(merged)
+
+def NullspaceByComponents(N, memo = None):
+    # This function returns a basis for the nullspace of N, in the format of NullspaceBasis,
+    # assembled from bases for the nullspaces of its connected components (see findComponents).
+    # If a ReductionMemo is specified, the bases found in it are not recomputed.
+    m, n = getSize(N)
+    bases = []
+    for (rows, cols) in findComponents(N):
+        subN = selectSubmatrix(N, rows, cols)
+        key = getComponentKey('NullspaceBasis', (), subN, [])
+        subB = memo.get(key) if memo is not None else None
+        if subB is None:
+            subB = NullspaceBasis(subN)
+            if not subB: # full column rank
+                subB = [[] for j in cols]
+            if memo is not None:
+                memo.put(key, subB)
+        bases.append((cols, subB))
+    total = sum([len(subB[0]) for (cols, subB) in bases])
+    B = [[] for j in range(n)]
+    offset = 0
+    for (cols, subB) in bases:
+        width = len(subB[0])
+        for (k, j) in enumerate(cols):
+            B[j] = [zero]*offset + list(subB[k]) + [zero]*(total - offset - width)
+        offset += width
+    return B
+
 def findIsozymes(N, Full = False):
     # This function determines all the sets of isozymes in a given stoichiometric matrix.
     # Isozymes are defined as reactions that are identical (not reverses of each other).
@@ -345,12 +727,22 @@ def findIsozymes(N, Full = False):
         for x in ID:
             ISubsets[x] = [y[0] for y in ID[x]]
     else:
-        ID = groupIdentical(transpose(N))
+        m, n = getSize(N)
+        columns = findSparseColumns(N)
+        ID = [group for group in groupProportional(columns, False) if len(group) > 1]
+        # the subsets are listed in the order of their columns, as groupIdentical would list them
+        ID.sort(key = lambda group: toDenseVector(columns[group[0]], m))
         for x in ID:
-            if len(x) > 1:
-                ISubsets[x[0]] = x[1:]
+            ISubsets[x[0]] = x[1:]
     return ISubsets
 
+def toDenseVector(vector, length):
+    # This function converts a sparse vector (a list of (index, value) pairs) into a list
+    dense = [zero]*length
+    for (j, x) in vector:
+        dense[j] = convertToFraction(x)
+    return dense
+
 def processIsozymes(N, irrev, Full = False):
     # This function processes all the sets of isozymes in a given stoichiometric matrix.
     # It returns an isozyme list and a set of duplicated columns, as well as the proper
@@ -362,59 +754,106 @@ def processIsozymes(N, irrev, Full = False):
         Isozymes[ind] = [key] + ISubsets[key]
         irrev[key] = all([irrev[x] for x in Isozymes[ind]])
     newIrrev = filterOut(irrev, badCols)
-    (m, n) = getSize(N)
-    newN = [filterOut(N[x], badCols) for x in range(m)]
+    newN = removeColumns(N, badCols)
     return (Isozymes, badCols, newN, newIrrev)
 
 def processZeroLoops(N):
     # This function finds the indices of zero loops and removes them from a given matrix.
     (m, n) = getSize(N)
-    loopInds = [y for y in range(n) if not any([N[x][y] for x in range(m)])]
+    loopInds = [y for (y, col) in enumerate(findSparseColumns(N)) if not col]
     if len(loopInds) == n:
         loopInds = list(range(1,n))
-    newN = [filterOut(N[x], loopInds) for x in range(m)]
+    newN = removeColumns(N, loopInds)
     return (loopInds, newN)
 
 def findRedundant(N):
     # This function returns a list of non-redundant rows in a given matrix.
     # These non-redundant rows form a basis for the rowspace of the matrix.
     Nt = transpose(N)
+    if getElimination() != 'dense':
+        (rows, active) = findEchelon(Nt, reduced = False)
+        return active
     (A, active) = GaussJordan(Nt, Gauss = True)
     return active
 
 def processRedundant(N):
     # This function returns a list of redundant rows and a matrix without them.
     m, n = getSize(N)
-    zeroRows = [x for x in range(m) if not any(N[x])]
+    zeroRows = [x for (x, row) in enumerate(findSparseRows(N)) if not row]
     goodRows = filterOut(list(range(m)), zeroRows)
     if goodRows:
-        newN = filterOut(N, zeroRows)
+        newN = selectSubmatrix(N, goodRows)
         active = findRedundant(newN)
         inactive = filterOut(list(range(len(newN))), active)
         inactive = mapList(inactive, goodRows)
         redRows = zeroRows + inactive
-        newN = [newN[x] for x in active]
+        newN = selectSubmatrix(newN, active)
     else:
         redRows = list(range(1,m))
         if n > 0:
-            newN = [N[0]]
+            newN = selectSubmatrix(N, [0])
         else:
             newN = N
     return (redRows, newN)
 
-def findTBlocked(N, Irrev, basename = 'TBlocked.lp', restricted = True, option = 'row', negated = False, rev = False):
+SUPPORT_METHOD = 'iterative'
+
+def setSupportMethod(method):
+    # Selects the algorithm used by findTBlocked to find a maximal support: 'iterative' (the
+    # default: repeatedly solve findPosSupport, excluding the entries found so far, until no
+    # new entry is found) or 'single' (a single, larger linear program, see findMaxSupport).
+    # The latter does not apply when the entries may have either sign (rev = True), since
+    # the entries that can be positive are then not necessarily positive simultaneously, and
+    # maximizing the number of entries of a given sign is no longer a linear program.
+    global SUPPORT_METHOD
+    if method not in ['iterative', 'single']:
+        print(('Error: unknown support method ' + str(method)))
+        return
+    SUPPORT_METHOD = method
+    return
+
+def findTBlocked(N, Irrev, basename = 'TBlocked.lp', restricted = True, option = 'row', negated = False, rev = False, method = None, verbose = False):
     # This function finds all the thermodynamically blocked reactions in a metabolic network
     # given by its stoichiometric matrix and a list of irreversible reactions. See paper for
     # a detailed justification of the algorithm. Note: returned reactions are irreversible!
     # For the meaning of the "restricted" parameter, see the function findPosSupport below.
+    # Returns a pair (found, undecided): if a linear program is stopped by a solver limit, the
+    # search stops and undecided contains the reactions that were neither found nor excluded
+    # (it is empty otherwise). Each caller decides which way is safe for them; for instance,
+    # processTBlocked only deletes the reactions in found.
+    # The method is 'iterative' or 'single' (see setSupportMethod; None for the current one);
+    # if verbose is True, the number of linear programs solved is printed.
+    if method is None:
+        method = SUPPORT_METHOD
+    if method == 'single' and not rev:
+        sign = -1 if negated else 1
+        (val, vec) = findMaxSupport(N, Irrev, basename, sign, restricted, option)
+        if isLimited(val):
+            print('Warning: a linear program was stopped by a ' + val.reason + ' limit; ' + str(len(Irrev)) + ' reactions remain undecided')
+            return ([], sorted(Irrev))
+        elif type(val) == type(zero) and val > 0:
+            found = sorted([j for j in Irrev if sign * vec.get('Y' + str(j), 0) > 0])
+        else:
+            found = []
+        if verbose:
+            print('This required 1 linear program')
+        return (found, [])
     Iter = 0
     index = basename.find('.lp')
     weight = [-1 if negated else 1]*len(Irrev)
     found = set()
+    undecided = []
     Min = -1 if rev else 0
+    solved = 0
     while len(found) < len(Irrev):
+        checkCancelled()
         curName = basename[:index] + str(Iter) + basename[index:]
         (val, vec) = findPosSupport(N, Irrev, weight, curName, Min = Min, restricted = restricted, option = option)
+        solved += 1
+        if isLimited(val):
+            undecided = sorted([x for x in Irrev if x not in found])
+            print('Warning: a linear program was stopped by a ' + val.reason + ' limit; ' + str(len(undecided)) + ' reactions remain undecided')
+            break
         if val > 0:
             Iter = Iter + 1
             if rev:
@@ -429,21 +868,29 @@ def findTBlocked(N, Irrev, basename = 'TBlocked.lp', restricted = True, option =
         else:
             break
     found = sorted(list(set(found)))
-    return found
+    if verbose:
+        print(('This required ' + str(solved) + ' linear programs'))
+    return (found, undecided)
 
-def processTBlocked(N, irrev):
+def processTBlocked(N, irrev, workers = 0, memo = None):
     # This function returns a list of thermodynamically blocked reactions and a matrix without them.
+    # The connected components of the matrix are processed separately (in parallel if workers > 1).
+    # The reactions left undecided by a solver limit are kept, i.e. considered to be unblocked.
     Irrev = findTrueIndices(irrev)
-    TBlocked = findTBlocked(N, Irrev)
-    newN = [filterOut(N[x], TBlocked) for x in range(len(N))]
+    (TBlocked, undecided) = findByComponents(findTBlocked, N, Irrev, workers = workers, memo = memo, complete = lambda result: not result[1])
+    if undecided:
+        print(('Warning: ' + str(len(undecided)) + ' reactions could not be checked for blocking and were kept'))
+    newN = removeColumns(N, TBlocked)
     return (TBlocked, newN)
 
 def processEBlocked(N, irrev):
     # This function returns a list of energy blocked reactions and a matrix without them.
+    # The reactions left undecided by a solver limit are kept, i.e. considered to be unblocked.
     Irrev = findTrueIndices(irrev)
-    EUnblocked = findTBlocked(N, Irrev, basename = 'EBlocked.lp', restricted = False)
+    (EUnblocked, undecided) = findTBlocked(N, Irrev, basename = 'EBlocked.lp', restricted = False)
+    EUnblocked = set(EUnblocked + undecided)
     EBlocked = [x for  x in Irrev if x not in EUnblocked]
-    newN = [filterOut(N[x], EBlocked) for x in range(len(N))]
+    newN = removeColumns(N, EBlocked)
     return (EBlocked, newN)
 
 def prepareForCplex(Matrix):
@@ -451,128 +898,199 @@ def prepareForCplex(Matrix):
     Matrix = transpose(Matrix)
     return [[Decimal(x.numerator)/Decimal(x.denominator) for x in y] for y in Matrix], Mults
 
-def findPosSupportNew(N, support, weight = [1], Filename = 'trial.lp', Min = 0, restricted = True, option = 'row'):
-    # This function finds the vector optimizing a given weight in the row/nullspace of N whose
-    # support is restricted to a given set of entries; those entries must be non-negative!
-    # Note: if the weight vector has a single component, it is automatically taken to be 1!
-    # If a nonzero Min value is specified, the components in the support are at least Min.
-    # If restricted = False, same but support is NOT restricted to the given set of entries.
+# The helpers below take the sparse rows of N (see findSparseRows) if they are available,
+# so that a problem is built in time proportional to the number of nonzeros of N.
+
+def addNullspaceConstraints(p, N, var = 'V', rows = None):
+    # This function adds the constraints defining the nullspace of N to a given problem;
+    # the variables corresponding to the columns of N are named with the prefix var.
+    if rows is None:
+        rows = findSparseRows(N)
+    for row in rows:
+        p.addConstraint([(var + str(j), x) for (j, x) in row], EQUAL, 0)
+    return
+
+def addRowspaceConstraints(p, N, rowVar = 'X', colVar = 'Y', free = True, rows = None):
+    # This function adds the constraints defining the rowspace of N to a given problem;
+    # the multipliers of the rows are named with rowVar, the resulting entries with colVar.
+    # If free is True, the multipliers of the nonzero rows are made free variables.
+    if rows is None:
+        rows = findSparseRows(N)
+    for j, col in enumerate(findSparseColumns(N, rows)):
+        p.addConstraint([(rowVar + str(i), x) for (i, x) in col] + [(colVar + str(j), -1)], EQUAL, 0)
+    if free:
+        for i, row in enumerate(rows):
+            if row:
+                p.setBounds(rowVar + str(i), None, None)
+    return
+
+def findActiveColumns(N, rows = None):
+    # This function returns a boolean list indicating which columns of N are nonzero
     m, n = getSize(N)
-    p = qsoptex.ExactProblem()
-    p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
-    if Min:
-        if Min > 0:
-            curLower, curUpper = Min, None
-        else:
-            curLower, curUpper = Min, -Min
-    else:
-        curLower, curUpper = 0, 1
-    if len(weight) == len(support):
-        for ind, item in enumerate(support):
-            p.add_variable(name = 'Y' + str(item), objective = weight[ind], lower = curLower, upper = curUpper)
-    elif len(weight) == 1:
-        for ind, item in enumerate(support):
-            p.add_variable(name = 'Y' + str(item), objective = 1, lower = curLower, upper = curUpper)
-    else:
-        print('Error: the weight vector is not of the right length!')
-    for ind in range(n):
-        if ind not in support:
-            p.add_variable(name = 'Y' + str(ind), objective = 0, lower = 0, upper = (0 if restricted else None))
-    if option == row:
-        for ind in range(m):
-            if [_f for _f in N[ind] if _f]:
-                p.add_variable(name = 'X' + str(ind), objective = 0, lower = None, upper = None)
-        for j in range(n):
-            curDict = {'X'+str(i) : N[i][j] for i in range(m)}
-            curDict.update({'Y'+str(j) : -1})
-            p.add_linear_constraint(qsoptex.ConstraintSense.EQUAL, curDict, rhs = 0)
-    else: # option == 'null'
-        for i in range(m):
-            p.add_linear_constraint(qsoptex.ConstraintSense.EQUAL, {'Y'+str(j) : N[i][j] for j in range(n)}, rhs = 0)
-    return processProblem(p)
+    if rows is None:
+        rows = findSparseRows(N)
+    active = [False]*n
+    for row in rows:
+        for (j, x) in row:
+            active[j] = True
+    return active
 
-def findPosSupport(N, support, weight = [1], Filename = 'trial.lp', Min = 0, restricted = True, Cplex = False, option = 'row'):
+def findPosSupport(N, support, weight = [1], Filename = 'trial.lp', Min = 0, restricted = True, Cplex = False, option = 'row', hybrid = False):
     # This function finds the vector optimizing a given weight in the row/nullspace of N whose
     # support is restricted to a given set of entries; those entries must be non-negative!
     # Note: if the weight vector has a single component, it is automatically taken to be 1!
     # If a nonzero Min value is specified, the components in the support are at least Min.
     # If restricted = False, same but support is NOT restricted to the given set of entries.
+    # If hybrid is True, a floating-point solution is tried first and certified exactly.
     m, n = getSize(N)
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Maximize\n'
-    opt += 'obj: '
+    p = LinearProblem(Filename.replace('.lp', ''), MAXIMIZE)
     if len(weight) == len(support):
-        opt += ' + '.join([str(weight[i]) + ' Y' + str(support[i]) for i in range(len(support)) if weight[i]])
+        p.setObjective([('Y' + str(support[i]), weight[i]) for i in range(len(support))])
     elif len(weight) == 1:   # equal weights, take all of them equal to 1
-        opt += ' + '.join(['Y' + str(i) for i in support])
+        p.setObjective([('Y' + str(i), 1) for i in support])
     else:
         print('Error: the weight vector is not of the right length!')
-    opt += '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
     if option == 'row':
-        const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(i) for i in range(m) if N[i][j]]) + ' + -1 Y' + str(j) + ' = 0\n' for j in range(n)])
+        addRowspaceConstraints(p, N, 'X', 'Y')
     else:
-        const += ''.join([' + '.join([str(N[i][j]) + ' Y' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
-    bounds = 'Bounds\n'
-    if option == 'row':
-        bounds += ''.join(['X' + str(i) + ' free\n' for i in range(m) if [_f for _f in N[i] if _f]])
-    if Min:
-        if Min > 0:
-            bounds += ''.join(['Y' + str(j) + ' >= ' + str(Min) + '\n' for j in support])
+        addNullspaceConstraints(p, N, 'Y')
+    supportSet = set(support)
+    for j in support:
+        if Min:
+            if Min > 0:
+                p.setBounds('Y' + str(j), Min, None)
+            else:
+                p.setBounds('Y' + str(j), Min, -Min)
         else:
-            bounds += ''.join([str(Min) + ' <= Y' + str(j) + ' <= ' + str(-Min) + '\n' for j in support])
-    else:
-        bounds += ''.join(['Y' + str(j) + ' <= 1\n' for j in support])
+            p.setBounds('Y' + str(j), 0, 1)
     if restricted:
-        bounds += ''.join(['Y' + str(j) + ' = 0\n' for j in range(n) if j not in support])
+        for j in range(n):
+            if j not in supportSet:
+                p.setBounds('Y' + str(j), 0, 0)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    return processFile(Filename, True)
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, True, hybrid)
+
+def findMaxSupport(N, support, Filename = 'trial.lp', sign = 1, restricted = True, option = 'row'):
+    # This function finds, with a single linear program, a vector in the row/nullspace of N
+    # in which as many of the given entries as possible are positive (negative if sign = -1,
+    # in which case none can be); all the entries are non-negative, and those outside of the
+    # given ones are zero if restricted is True, as in findPosSupport. Since these vectors
+    # form a cone, the sum of vectors achieving each entry achieves all of them, and is found
+    # by maximizing the sum of variables T, with 0 <= T <= 1 and T <= sign * Y, for each of
+    # the given entries: at the optimum, T = 1 and sign * Y >= 1 on the maximal support.
+    m, n = getSize(N)
+    p = LinearProblem(Filename.replace('.lp', ''), MAXIMIZE)
+    p.setObjective([('T' + str(j), 1) for j in support])
+    if option == 'row':
+        addRowspaceConstraints(p, N, 'X', 'Y')
+    else:
+        addNullspaceConstraints(p, N, 'Y')
+    for j in support:
+        p.addConstraint([('T' + str(j), 1), ('Y' + str(j), -sign)], LESS, 0)
+        p.setBounds('T' + str(j), 0, 1)
+    if restricted:
+        supportSet = set(support)
+        for j in range(n):
+            if j not in supportSet:
+                p.setBounds('Y' + str(j), 0, 0)
+    return solveProblem(p, True)
 
-def findSBlocked(N, NB = False):
+def findSBlocked(N, NB = False, memo = None):
     # This function finds all the stoichiometrically blocked reactions in a metabolic network
     # given by its stoichiometric matrix. NB is True if the nullspace basis is to be returned.
+    # If a ReductionMemo is specified, the basis is computed by NullspaceByComponents.
     SBlocked = []
-    (A,R) = GaussJordan(N)
-    B = NullspaceBasis((A,R), True)
+    if memo is not None:
+        B = NullspaceByComponents(N, memo)
+    else:
+        B = NullspaceBasis(N)
+        if not B: # full column rank, so every reaction is blocked
+            B = [[] for j in range(getSize(N)[1])]
     SBlocked = [j for j in range(len(B)) if not any(B[j])]
     if NB:
         return (SBlocked, B)
     else:
         return SBlocked
 
-def processSBlocked(N):
+def processSBlocked(N, memo = None):
     # This function returns a list of stoichiometrically blocked reactions and a matrix without them.
-    (SBlocked, B) = findSBlocked(N, True)
-    newN = [filterOut(N[x], SBlocked) for x in range(len(N))]
+    (SBlocked, B) = findSBlocked(N, True, memo)
+    newN = removeColumns(N, SBlocked)
     newB = filterOut(B, SBlocked)
     return (SBlocked, newN, newB)
 
-def checkAllSigns(N, Rev):
+def checkAllSigns(N, Rev, workers = 0):
     # This function produces a list of all possible sign combinations for the reversible reactions
     # in the row combinations of N, assuming that the irreversible reactions must be non-negative.
+    # The signs are fixed one reaction at a time (in the order of Rev), and a partial combination
+    # is only extended if it is feasible, so that each infeasible one prunes its whole subtree;
+    # the tree is searched depth-first (see searchSigns). If workers > 1, its top levels are
+    # expanded first, and the subtrees below them are searched in parallel by as many processes.
+    m, n = getSize(N)
     r = len(Rev)
+    print(('There are ' + str(2**r) + ' combinations to check'))
+    Irrev = [i for i in range(n) if i not in Rev]
+    template = FeasibilityTemplate(N, Irrev, 'row')
+    if workers > 1:
+        depth = min(r, (SUBTREES_PER_WORKER * workers - 1).bit_length())
+        (subtrees, counter, undecided) = searchSigns(template, Rev, depth = depth)
+        results = mapComponents(searchSigns, [(template, Rev, signs, vec) for (signs, vec) in subtrees], workers)
+    else:
+        (counter, undecided) = (0, 0)
+        results = [searchSigns(template, Rev)]
     allSigns = []
-    counter = 0
-    maxCounter = 2**r
-    print(('There are ' + str(maxCounter) + ' combinations to process'))
-    for signs in itertools.product('+-', repeat = r):
-        counter += 1
-        if (counter % 100 == 0):
-            print(('Processed ' + str(counter) + ' combinations so far'))
-        result = checkSigns(N, Rev, signs, Filename = 'signs' + str(counter) + '.lp')
-        if result:
-            allSigns.append(flipSigns(signs)) # need to flip them because entropy increases!
-    return allSigns
+    for (combinations, solved, stopped) in results:
+        allSigns += [signs for (signs, vec) in combinations]
+        counter += solved
+        undecided += stopped
+    print(('Solved ' + str(counter) + ' problems to find ' + str(len(allSigns)) + ' combinations'))
+    if undecided:
+        print(('Warning: ' + str(undecided) + ' partial combinations could not be decided and were discarded'))
+    # need to flip them because entropy increases!
+    return [flipSigns(signs) for signs in allSigns]
+
+SUBTREES_PER_WORKER = 4
+
+def searchSigns(template, Rev, signs = '', vec = {}, depth = None):
+    # This function searches the subtree of the feasible partial sign combination signs (see
+    # checkAllSigns) depth-first, so that only the current path is held in memory. It returns
+    # the feasible combinations of length depth (by default, the complete ones) in order, with
+    # the vectors proving them if depth is specified, along with the number of problems solved
+    # and that of the partial combinations that were discarded because of a solver limit.
+    # Since the row combinations form a cone, a feasible vector whose entry for the next reaction
+    # is non-zero shows that the partial combination extended by the sign of that entry is also
+    # feasible, without solving its problem. The template is the FeasibilityTemplate of N.
+    if depth is None:
+        depth = len(Rev)
+    found, solved, undecided = [], 0, 0
+    stack = [(signs, vec)]
+    while stack:
+        checkCancelled()
+        (signs, vec) = stack.pop()
+        if len(signs) == depth:
+            found.append((signs, vec if depth < len(Rev) else None))
+            continue
+        name = 'V' + str(Rev[len(signs)])
+        value = vec.get(name, 0)
+        children = []
+        for x in '+-':
+            if (value > 0 and x == '+') or (value < 0 and x == '-'):
+                children.append((signs + x, vec))
+                continue
+            bounds = {}
+            for ind, y in enumerate(signs + x):
+                bounds[Rev[ind]] = ((1, None) if y == '+' else (None, -1))
+            solved += 1
+            result = template.solve(None, Filename = 'signs' + str(solved) + '.lp', bounds = bounds)
+            if result is None or isLimited(result[0]):
+                undecided += 1
+            elif not isInfeasible(result[0]):
+                children.append((signs + x, result[1]))
+        # the children are pushed in reverse, so that the combinations are found in order
+        stack += children[::-1]
+    return (found, solved, undecided)
 
 def flipSigns(signs):
     # This function flips - to + and + to - in a given tuple (first converted to string)
@@ -588,30 +1106,18 @@ def checkSigns(N, Rev, signs, Filename = 'signs.lp', Cplex = False):
     negatives = mapList(negIndices, Rev)
     posIndices = [i for i, x in enumerate(signs) if x == '+']
     positives = mapList(posIndices, Rev)
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Minimize\n'
+    p = LinearProblem(Filename.replace('.lp', ''), MINIMIZE)
     if Cplex:
-        opt += ('Y' + str(0) + '\n')
-    else:
-        opt += '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(i) for i in range(m) if N[i][j]]) + ' + -1 Y' + str(j) + ' = 0\n' for j in range(n)])
-    bounds = 'Bounds\n'
-    bounds += ''.join(['X' + str(i) + ' free\n' for i in range(m) if [_f for _f in N[i] if _f]])
-    bounds += ''.join([   '1 <= Y' + str(j) + '<= inf\n' for j in positives])
-    bounds += ''.join(['-inf <= Y' + str(j) + '<= -1 \n' for j in negatives])
+        p.setObjective([('Y' + str(0), 1)])
+    addRowspaceConstraints(p, N, 'X', 'Y')
+    for j in positives:
+        p.setBounds('Y' + str(j), 1, None)
+    for j in negatives:
+        p.setBounds('Y' + str(j), None, -1)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    val = processFile(Filename, False)
+        p.writeFile(Filename, Cplex)
+        return
+    val = solveProblem(p, False)
     if (type(val) == type([]) and len(val) == 0): # infeasible
         return False
     else:
@@ -625,27 +1131,18 @@ def vectorInSpan(N, vec, Filename = 'trial.lp', Cplex = False):
     if n != n1:
         print('Problem: the vector is not compatible with the matrix!')
         return False
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Maximize\n'
-    opt += 'obj: '
-    opt += ('Y' + '\n')
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(i) for i in range(m) if N[i][j]]) + (' + ' + str(vec[j]) + ' Y')*int(bool(vec[j])) + '= 0\n' for j in range(n)])
-    # Note that this slightly strange syntax ensures that no zero coefficients appear in the LP file
-    bounds = 'Bounds\n'
-    bounds += ''.join(['-1 <= X' + str(i) + ' <= 1\n' for i in range(m) if [_f for _f in N[i] if _f]])
+    p = LinearProblem(Filename.replace('.lp', ''), MAXIMIZE)
+    p.setObjective([('Y', 1)])
+    rows = findSparseRows(N)
+    for j, col in enumerate(findSparseColumns(N, rows)):
+        p.addConstraint([('X' + str(i), x) for (i, x) in col] + [('Y', vec[j])], EQUAL, 0)
+    for i, row in enumerate(rows):
+        if row:
+            p.setBounds('X' + str(i), -1, 1)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    val = processFile(Filename, False)
+        p.writeFile(Filename, Cplex)
+        return
+    val = solveProblem(p, False)
     if val:
         return True
     else:
@@ -660,38 +1157,35 @@ def computeDistance(N, vec, norm = 'inf', Irrev = [], Filename = 'Distance.lp',
     if n != n1:
         print('Problem: the vector is not compatible with the matrix!')
         return
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Minimize\n'
-    opt += 'obj: '
-    opt += ('Y' + '\n')
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(i) for i in range(m) if N[i][j]]) + ' - V' + str(j) + ' = 0\n' for j in range(n)])
-    const += ''.join(['V' + str(j) + ' - T' + str(j) + ' = ' + str(vec[j]) + '\n' for j in range(n)])
-    const += ''.join(['Y' + str(j) + ' + T' + str(j) + '>= 0\n' for j in range(n)])
-    const += ''.join(['Y' + str(j) + ' - T' + str(j) + '>= 0\n' for j in range(n)])
+    p = LinearProblem(Filename.replace('.lp', ''), MINIMIZE)
+    p.setObjective([('Y', 1)])
+    rows = findSparseRows(N)
+    addRowspaceConstraints(p, N, 'X', 'V', free = False, rows = rows)
+    for j in range(n):
+        p.addConstraint([('V' + str(j), 1), ('T' + str(j), -1)], EQUAL, vec[j])
+    for j in range(n):
+        p.addConstraint([('Y' + str(j), 1), ('T' + str(j), 1)], GREATER, 0)
+    for j in range(n):
+        p.addConstraint([('Y' + str(j), 1), ('T' + str(j), -1)], GREATER, 0)
     if norm == 'one':
-        const += ' + '.join(['Y' + str(j) for j in range(n)]) + '- Y = 0\n'
+        p.addConstraint([('Y' + str(j), 1) for j in range(n)] + [('Y', -1)], EQUAL, 0)
     elif norm == 'inf':
-        const += ''.join(['Y' + str(j) + ' - Y <= 0\n' for j in range(n)])
+        for j in range(n):
+            p.addConstraint([('Y' + str(j), 1), ('Y', -1)], LESS, 0)
     else:
         print(('Error: the option ' + norm + ' is not a valid option for the norm!'))
         return
-    bounds = 'Bounds\n'
-    bounds += ''.join(['X' + str(i) + ' free\n' for i in range(m) if i not in Irrev and [_f for _f in N[i] if _f]])
-    bounds += ''.join(['V' + str(j) + ' free\n' for j in range(n)])
-    bounds += ''.join(['T' + str(j) + ' free\n' for j in range(n)])
+    Irrev = set(Irrev)
+    for i, row in enumerate(rows):
+        if i not in Irrev and row:
+            p.setBounds('X' + str(i), None, None)
+    for j in range(n):
+        p.setBounds('V' + str(j), None, None)
+        p.setBounds('T' + str(j), None, None)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    return processFile(Filename, True)
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, True)
 
 def findDistance(N, special, Irrev, norm = 'inf'):
     # This function determines the smallest change in biomass coefficients (reaction indexed
@@ -709,124 +1203,125 @@ def findDistance(N, special, Irrev, norm = 'inf'):
             redVec[x] = vec[x]
     return val, redVec
 
-####parallelization
-def parallelizedNegFindFeasible(N, Irrev, pos  ,index, option,subList,out_q_neg):
-    count = len(subList) * index
-    outdict = {}
-    for ind, react in enumerate(subList): # changed from subOnlyNeg to subList!
-        (val1, vec1) = findFeasible(N, react, Irrev, pos, ('sub+' + str(index) + 'V' + str(ind) + 'sets.lp'), option=option)
-        if (type(val1) == type([]) and len(val1) == 0):  # infeasible
-            outdict[count+ind] = react #puts infeasible reactions into dictionary
-    out_q_neg.put(outdict) #places dictionary into queue asynchronously
-
-def parallelizedPosFindFeasible(N, Irrev, pos  ,index, option,subList,out_q_pos):
-    outdict = {}
-    count = len(subList) * index
-    for ind, react in enumerate(subList):# changed from subOnlyPos to subList!
-        (val0, vec0) = findFeasible(N, react, Irrev, pos, ('sub-' + str(index) + 'V' + str(ind) + 'sets.lp'), option=option)
-        if (type(val0) == type([]) and len(vec0) == 0):  # infeasible
-            outdict[count+ind] = react #puts infeasible reactions into dictionary
-    out_q_pos.put(outdict) #places dictionary into queue asynchronously
-
-
-##end functions for parallelization
-
-def findUnidirectional(N, Irrev, option = 'null', verbose = False, parallel = 0):
+CHECKPOINT_BATCH = 50
+
+def findInfeasibleCandidates(template, candidates, pos, prefix, pool = None, record = None, save = None, queries = False):
+    # This function returns the candidate reactions for which the feasibility problem of the
+    # template with the entry of the reaction fixed to 1 (-1 if pos is False) is infeasible,
+    # along with the candidates whose problems were stopped by a solver limit. The problems are solved in
+    # a SolverPool if one is specified; if queries is True, the pool was created with the
+    # template, and only the arguments of each problem are sent to it. Record maps the pairs
+    # (pos, reaction) to the outcomes already known; if a save function is specified, the
+    # problems are solved in batches of CHECKPOINT_BATCH, after each of which it is called.
+    if record is None:
+        record = {}
+    limited = []
+    size = CHECKPOINT_BATCH if save else max(len(candidates), 1)
+    for start in range(0, len(candidates), size):
+        checkCancelled()
+        batch = [(ind, react) for ind, react in enumerate(candidates[start:start + size], start) if (pos, react) not in record]
+        if not batch:
+            continue
+        if queries:
+            results = pool.mapQueries([{'special': react, 'pos': pos, 'Filename': prefix + str(ind) + 'sets.lp'} for (ind, react) in batch], True)
+        else:
+            problems = [template.build(react, pos, prefix + str(ind) + 'sets.lp') for (ind, react) in batch]
+            results = solveProblems(problems, True, pool)
+        for ((ind, react), (val, vec)) in zip(batch, results):
+            if isLimited(val):
+                limited.append(react)
+            else:
+                record[(pos, react)] = isInfeasible(val)
+        if save:
+            save()
+    infeasible = [react for react in candidates if record.get((pos, react))]
+    return (infeasible, limited)
+
+def findUnidirectional(N, Irrev, option = 'null', verbose = False, parallel = 0, pool = None, split = True, progress = None):
     # This function finds all unidirectional (effectively irreversible) reactions.
     # NOTE: It assumes that all the reactions in the network can have nonzero flux;
     # otherwise may incorrectly classify blocked reactions as only negative.
     # The option can be 'null' for nullspace (default) or 'row' for rowspace.
-    # If parallel > 0, this specifies the number of cores available for processing.
+    # If parallel > 1, this specifies the number of processes to use: the feasibility problems
+    # are solved by a SolverPool to whose workers the constraints of N are sent only once,
+    # and which hands out the candidates one at a time; the results are the same as serially.
+    # If a SolverPool is specified, the feasibility problems are submitted to it instead.
+    # If split is True, the connected components of N are processed separately, in parallel
+    # if there are several of them, parallel > 1 and no SolverPool is specified.
+    # If a Checkpoint is specified as progress, the results are saved into it as they are
+    # obtained (after every batch of candidates) and those already in it are not recomputed.
+    # Returns (onlyPos, onlyNeg, undecided), where undecided contains the reactions that are
+    # kept bidirectional because a linear program about them was stopped by a solver limit.
+    if split:
+        workers = parallel if pool is None else 0
+        return findByComponents(findUnidirectional, N, Irrev, (option, verbose), workers, extra = {'split': False}, local = {'pool': pool, 'progress': progress}, inner = 'parallel')
     m, n = getSize(N)
     onlyPos, onlyNeg = [], []
     allRev = [i for i in range(n) if not i in Irrev]
-    canBePositive = findTBlocked(N, allRev, basename = 'canBePositive.lp', restricted = False, option = option, rev = True)
-    canBeNegative = findTBlocked(N, allRev, basename = 'canBeNegative.lp', restricted = False, option = option, rev = True, negated = True)
+    if progress is not None:
+        name = 'findUnidirectional' + getMatrixHash(N, Irrev, option)
+        record = progress.get(name, {})
+        save = lambda: progress.put(name, record)
+    else:
+        record, save = {}, None
+    undecided = []
+    if 'canBePositive' in record:
+        canBePositive, canBeNegative = record['canBePositive'], record['canBeNegative']
+    else:
+        (canBePositive, undecidedPos) = findTBlocked(N, allRev, basename = 'canBePositive.lp', restricted = False, option = option, rev = True)
+        (canBeNegative, undecidedNeg) = findTBlocked(N, allRev, basename = 'canBeNegative.lp', restricted = False, option = option, rev = True, negated = True)
+        # the reactions left undecided by a solver limit are assumed to have both signs, and
+        # the signs are only saved if there are none, so that a resumed run checks them again
+        canBePositive, canBeNegative = canBePositive + undecidedPos, canBeNegative + undecidedNeg
+        undecided = undecidedPos + undecidedNeg
+        if not undecided:
+            record['canBePositive'], record['canBeNegative'] = canBePositive, canBeNegative
+            if save:
+                save()
     onlyPosCandidates = [i for i in allRev if i not in canBeNegative]
     onlyNegCandidates = [i for i in allRev if i not in canBePositive]
-    parallel = 0 #testing
-
-    if len(onlyNegCandidates) <= 1:
-        onlyNeg = onlyNegCandidates
-    else:
-        if parallel>0: # this is to be distributed between the threads
-            splitNegPairs = [onlyNegCandidates[i::parallel] for i in range(parallel)]
-            # Each process will get  a queue to put its outdict into
-            out_q_neg = multiprocessing.Queue()
-            procs = []
-            for index, subList in enumerate(splitNegPairs):
-                p = multiprocessing.Process(
-                        target=parallelizedNegFindFeasible,
-                        args=(N, Irrev, True, index, option,subList,out_q_neg))
-                procs.append(p)
-                p.daemon = True
-                p.start()
-
-            # Collect all results into a single result dict. We know how many dicts
-            # with results to expect.
-            resultdict = {}
-            for i in range(parallel):
-                resultdict.update(out_q_neg.get())
-
-            # Wait for all worker processes to finish
-            for p in procs:
-                p.join()
-            onlyNeg = list(resultdict.values())
-
+    template = FeasibilityTemplate(N, Irrev, option)
+    limited = [] # reactions whose check was stopped by a solver limit stay bidirectional
+    ownPool = None
+    if pool is None and parallel > 1 and max(len(onlyNegCandidates), len(onlyPosCandidates)) > 1:
+        ownPool = SolverPool(parallel, template = template)
+    try:
+        if len(onlyNegCandidates) <= 1:
+            onlyNeg = onlyNegCandidates
         else:
-            for ind, react in enumerate(onlyNegCandidates):
-                (val1, vec1) = findFeasible(N, react, Irrev, True,  'sub+' + str(ind) + 'sets.lp', option = option)
-                if (type(val1) == type([]) and len(val1) == 0): # infeasible
-                    onlyNeg.append(react)
-    onlyPosCandidates = [x for x in onlyPosCandidates if x not in onlyNeg]
-    if len(onlyPosCandidates) <= 1:
-        onlyPos = onlyPosCandidates
-    else:
-        if parallel>0: # this is to be distributed between the threads
-            splitPosPairs = [onlyPosCandidates[i::parallel] for i in range(parallel)]
-
-            # Each process will get queue to put its out dict into
-            out_q_pos = multiprocessing.Queue()
-            procs = []
-            for index, subList in enumerate(splitPosPairs):
-                p = multiprocessing.Process(
-                        target=parallelizedPosFindFeasible,
-                        args=(N, Irrev, False, index,option, subList,out_q_pos))
-                procs.append(p)
-                p.daemon = True
-                p.start()
-
-            # Collect all results into a single result dict. We know how many dicts
-            # with results to expect.
-            resultdict = {}
-            for i in range(parallel):
-                resultdict.update(out_q_pos.get())
-
-            # Wait for all worker processes to finish
-            for p in procs:
-                p.join()
-            onlyPos = list(resultdict.values())
-
+            (onlyNeg, limits) = findInfeasibleCandidates(template, onlyNegCandidates, True, 'sub+', pool or ownPool, record, save, ownPool is not None)
+            limited += limits
+        onlyPosCandidates = [x for x in onlyPosCandidates if x not in onlyNeg]
+        if len(onlyPosCandidates) <= 1:
+            onlyPos = onlyPosCandidates
         else:
-            for ind, react in enumerate(onlyPosCandidates):
-                (val0, vec0) = findFeasible(N, react, Irrev, False,  'sub-' + str(ind) + 'sets.lp', option = option)
-                if (type(val0) == type([]) and len(val0) == 0): # infeasible
-                    onlyPos.append(react)
+            (onlyPos, limits) = findInfeasibleCandidates(template, onlyPosCandidates, False, 'sub-', pool or ownPool, record, save, ownPool is not None)
+            limited += limits
+    finally:
+        if ownPool is not None:
+            ownPool.close()
+    if limited:
+        print('Warning: ' + str(len(limited)) + ' linear programs were stopped by a solver limit; the corresponding reactions are kept bidirectional')
     if verbose:
         print('This required ' + str(len(onlyNegCandidates) + len(onlyPosCandidates)) + ' linear programs')
+    decided = set(onlyPos + onlyNeg)
+    undecided = sorted(set([x for x in undecided + limited if x not in decided]))
+    return (onlyPos, onlyNeg, undecided)
 
-    return (onlyPos, onlyNeg)
-
-def processUnidirectional(N, irrev, option = 'null'):
+def processUnidirectional(N, irrev, option = 'null', workers = 0, memo = None, progress = None):
     # This function returns a list of unidirectional reactions and a matrix without them.
     # The option can be 'null' for nullspace (default) or 'row' for rowspace.
+    # The connected components of the matrix are processed separately; if workers > 1, they are
+    # processed in parallel, or the feasibility problems of a single one are (see findUnidirectional).
     m, n = getSize(N)
     Irrev = findTrueIndices(irrev)
-    (onlyPos, onlyNeg) = findUnidirectional(N, Irrev, option = option)
-    newN = [[N[x][y] for y in range(n)] for x in range(m)]
-    for x in range(m):
-        for y in onlyNeg:
-            newN[x][y] = -newN[x][y]
+    # If a Checkpoint is specified as progress, the components processed in this process save
+    # their results into it as they go (see findUnidirectional).
+    # The reactions left undecided by a solver limit are kept bidirectional.
+    (onlyPos, onlyNeg, undecided) = findByComponents(findUnidirectional, N, Irrev, (option, False), workers, memo, {'split': False}, {'progress': progress}, 'parallel', complete = lambda result: not result[2])
+    if undecided:
+        print(('Warning: ' + str(len(undecided)) + ' reactions could not be checked for unidirectionality and were kept bidirectional'))
+    newN = flipColumns(N, onlyNeg)
     return (onlyPos, onlyNeg, newN)
 
 def findSubsets(N, NB = False):
@@ -837,19 +1332,21 @@ def findSubsets(N, NB = False):
         Matrix = N
     else:
         Matrix = NullspaceBasis(N)
+    # The rows are grouped by a canonical integer form that is the same for all their multiples.
     n = len(Matrix)
-    redMatrix = [[] for i in range(n)]
+    rows = findSparseRows(Matrix)
     Mults = [0 for i in range(n)]
     for i in range(n):
-        nzRow = [_f for _f in Matrix[i] if _f]
-        if not nzRow:
+        if not rows[i]:
             print('Error: zero row found!')
             return ESubsets
         else:
-            # save the multiplier, make first non-zero entry 1
-            Mults[i] = convertToFraction(nzRow[0])
-            redMatrix[i] = [x / nzRow[0] for x in Matrix[i]]
-    groups = groupIdentical(redMatrix)
+            # save the multiplier, i.e. the first non-zero entry
+            Mults[i] = convertToFraction(rows[i][0][1])
+    groups = [group for group in groupProportional(rows) if len(group) > 1]
+    # the subsets are listed in the order of their normalized rows, as groupIdentical would list them
+    length = getSize(Matrix)[1]
+    groups.sort(key = lambda group: [x / Mults[group[0]] for x in toDenseVector(rows[group[0]], length)])
     for group in groups:
         if len(group) > 1:
             mults = [Mults[x] for x in group]
@@ -859,22 +1356,18 @@ def findSubsets(N, NB = False):
 def processSubsets(N, curB):
     # This function returns a list of reactions in enzyme subsets and a matrix without them.
     # It requires a basis for the nullspace of the matrix N as well as the matrix N itself!
-    m, n = getSize(N)
     ESubsets = findSubsets(curB, True)
-    newN = [[N[x][y] for y in range(n)] for x in range(m)]
     lumpedReacts = []
     Enzymes = [[]]*len(ESubsets)
     anchors = list(ESubsets.keys())
+    groups = []
     for (ind, key) in enumerate(anchors):
         value = ESubsets[key]
         (reacts, ratios) = list(zip(*value))
         Enzymes[ind] = (tuple([key]) + reacts, tuple([one]) + ratios)
         lumpedReacts += list(reacts)
-        for num, react in enumerate(reacts):
-            ratio = ratios[num]
-            for x in range(m):
-                newN[x][key] += (ratio * newN[x][react])
-    newN = [filterOut(newN[x], lumpedReacts) for x in range(m)]
+        groups.append((key, reacts, ratios))
+    newN = lumpColumns(N, groups)
     subsetReacts = anchors + lumpedReacts
     return (Enzymes, lumpedReacts, subsetReacts, newN)
 
@@ -896,51 +1389,91 @@ def reconfigureNetwork(N, irrev):
     rev = filterOut(rev, badInds)
     return (newN, rev)
 
-def findFeasible(N, special, Irrev = [], pos = True, Filename = 'trial.lp', disable = [], negative = [], option = 'null', Cplex = False):
-    # This function finds a feasible vector in the row/nullspace of N whose set of irreversible
-    # reactions is given. The entry corresponding to special is 1 if pos is True, -1 otherwise.
-    # Additional features: it is now possible to specify a subset of reactions to be disabled
-    # as well as a subset of reactions which are constrained to have only negative flux.
-    # The option can be 'null' for nullspace (default) or 'row' for rowspace.
-    m, n = getSize(N)
-    Rev = [x for x in range(n) if x not in Irrev]
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Maximize\n'
-    if Cplex:
-        opt += ('V' + str(special) + '\n')
-    else:
-        opt += '\n'
-    # note: we are only looking for a feasible vector, hence no objective function required!
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    if option == 'row':
-        const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(i) for i in range(m) if N[i][j]]) + ' + -1 V' + str(j) + ' = 0\n' for j in range(n)])
-    else: # assumes option = 'null'
-        const += ''.join([' + '.join([str(N[i][j]) + ' V' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
-    if pos:
-        const += 'V' + str(special) + ' = 1\n'
+class FeasibilityTemplate:
+    # Holds the part of the problems solved by findFeasible that only depends on N, Irrev
+    # and option, so that a series of problems differing by special, pos, disable and
+    # negative can be created without rebuilding (or rewriting) the constraints of N.
+    def __init__(self, N, Irrev = [], option = 'null'):
+        m, n = getSize(N)
+        p = LinearProblem('trial', MAXIMIZE)
+        rows = findSparseRows(N)
+        if option == 'row':
+            addRowspaceConstraints(p, N, 'X', 'V', rows = rows)
+        else: # assumes option = 'null'
+            addNullspaceConstraints(p, N, 'V', rows = rows)
+        p.freeze()
+        active = findActiveColumns(N, rows)
+        IrrevSet = set(Irrev)
+        self.Rev = [x for x in range(n) if x not in IrrevSet and active[x]]
+        self.base = p
+    # If special is None, no entry is fixed; bounds maps indices to explicit (lower, upper).
+    def build(self, special, pos = True, Filename = 'trial.lp', disable = [], negative = [], Cplex = False, bounds = {}):
+        p = self.base.derive(Filename.replace('.lp', ''))
+        negative = set(negative)
+        if Cplex and special is not None:
+            p.setObjective([('V' + str(special), 1)])
+        # note: we are only looking for a feasible vector, hence no objective function required!
+        if special is not None:
+            if pos:
+                p.addConstraint([('V' + str(special), 1)], EQUAL, 1)
+            else:
+                p.addConstraint([('V' + str(special), 1)], EQUAL, -1)
+        for i in disable:
+            p.addConstraint([('V' + str(i), 1)], EQUAL, 0)
+        for i in negative:
+            p.setBounds('V' + str(i), None, 0)
+        for i in self.Rev:
+            if i not in negative:
+                p.setBounds('V' + str(i), None, None)
+        for i in bounds:
+            p.setBounds('V' + str(i), bounds[i][0], bounds[i][1])
+        return p
+    def solve(self, special, pos = True, Filename = 'trial.lp', disable = [], negative = [], bounds = {}):
+        return solveProblem(self.build(special, pos, Filename, disable, negative, bounds = bounds), True)
+
+def buildFeasible(N, special, Irrev = [], pos = True, Filename = 'trial.lp', disable = [], negative = [], option = 'null', Cplex = False):
+    # This function creates the problem of finding a feasible vector in the row/nullspace of N
+    # whose set of irreversible reactions is given. The entry corresponding to special is 1
+    # if pos is True, -1 otherwise. Additional features: it is now possible to specify a subset
+    # of reactions to be disabled as well as a subset of reactions which are constrained to
+    # have only negative flux. The option can be 'null' for nullspace (default) or 'row' for rowspace.
+    # To create many such problems for the same N, use a FeasibilityTemplate instead.
+    return FeasibilityTemplate(N, Irrev, option).build(special, pos, Filename, disable, negative, Cplex)
+
+def findFeasibleBatch(N, Irrev, queries, option = 'null', workers = 0, pool = None):
+    # This function solves a list of feasibility problems for the same N, Irrev and option.
+    # Each query is a dictionary with the arguments of FeasibilityTemplate.build, e.g.
+    # {'special': 3, 'pos': False, 'disable': [1, 2]}; the missing ones take their defaults.
+    # Returns a list of pairs (feasible, vector) in the order of the queries, where feasible
+    # is True or False (None if the solver failed or was stopped by a limit, see setLimits)
+    # and vector is the feasible vector found.
+    # If workers > 0, the queries are solved in parallel by as many worker processes, each of
+    # which receives the constraints of N once; alternatively, a SolverPool can be specified.
+    template = FeasibilityTemplate(N, Irrev, option)
+    if pool is not None:
+        results = pool.map([template.build(**query) for query in queries], True)
+    elif workers > 0 and len(queries) > 1:
+        with SolverPool(workers, template = template) as batchPool:
+            results = batchPool.mapQueries(queries, True)
     else:
-        const += 'V' + str(special) + ' = -1\n'
-    if disable:
-        const += ''.join(['V' + str(i) + ' = 0\n' for i in disable])
-    bounds = 'Bounds\n'
-    if negative:
-        bounds += ''.join(['-inf <= V' + str(i) + ' <= 0\n' for i in negative])
-    if option == 'row':
-        bounds += ''.join(['X' + str(i) + ' free\n' for i in range(m) if [_f for _f in N[i] if _f]])
-    bounds += ''.join(['V' + str(i) + ' free\n' for i in Rev if i not in negative and [_f for _f in [N[k][i] for k in range(m)] if _f]])
+        results = [solveProblem(template.build(**query), True) for query in queries]
+    answers = []
+    for result in results:
+        if result is None or isLimited(result[0]):
+            answers.append((None, {}))
+        else:
+            (val, vec) = result
+            answers.append((not isInfeasible(val), vec))
+    return answers
+
+def findFeasible(N, special, Irrev = [], pos = True, Filename = 'trial.lp', disable = [], negative = [], option = 'null', Cplex = False, hybrid = False):
+    # Solves the problem created by buildFeasible (see above) and returns the feasible vector
+    # If hybrid is True, a floating-point solution is tried first and certified exactly.
+    p = buildFeasible(N, special, Irrev, pos, Filename, disable, negative, option, Cplex)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    if not Cplex:
-        return processFile(Filename, True)
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, True, hybrid)
 
 def findRatio(N, react1, react2, Irrev, Max = True, ratio = 0, Filename = 'trial.lp', Cplex = False):
     # This function finds the minimum or the maximum ratio of two given entries in the nullspace
@@ -948,127 +1481,24 @@ def findRatio(N, react1, react2, Irrev, Max = True, ratio = 0, Filename = 'trial
     # If a ratio is specified, checks whether the difference react1 - ratio * react2 can equal 1.
     m, n = getSize(N)
     Rev = [x for x in range(n) if x not in Irrev]
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    if Max:
-        opt = 'Maximize\n'
-    else:
-        opt = 'Minimize\n'
+    p = LinearProblem(Filename.replace('.lp', ''), MAXIMIZE if Max else MINIMIZE)
     if ratio != 0:
         num, den = ratio.numerator, ratio.denominator
         if Cplex:
-            if num > 0:
-                opt += str(den) + ' V' + str(react1) + ' - ' + str(num)  + ' V' + str(react2) + '\n'
-            else:
-                opt += str(den) + ' V' + str(react1) + ' + ' + str(-num) + ' V' + str(react2) + '\n'
-        else:
-            opt += '\n'
+            p.setObjective([('V' + str(react1), den), ('V' + str(react2), -num)])
+        p.addConstraint([('V' + str(react1), den), ('V' + str(react2), -num)], EQUAL, 1)
     else:
-        opt += 'obj: '
-        opt += 'V' + str(react2) + '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    if ratio != 0:
-        if num > 0:
-            const += str(den) + ' V' + str(react1) + ' - ' + str(num)  + ' V' + str(react2) + ' = 1\n'
-        else:
-            const += str(den) + ' V' + str(react1) + ' + ' + str(-num) + ' V' + str(react2) + ' = 1\n'
-    else:
-        const += 'V' + str(react1) + ' = 1\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' V' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
-    bounds = 'Bounds\n'
-    bounds += ''.join(['V' + str(i) + ' free\n' for i in Rev if [_f for _f in [N[k][i] for k in range(m)] if _f]])
+        p.setObjective([('V' + str(react2), 1)])
+        p.addConstraint([('V' + str(react1), 1)], EQUAL, 1)
+    addNullspaceConstraints(p, N, 'V')
+    active = findActiveColumns(N)
+    for i in Rev:
+        if active[i]:
+            p.setBounds('V' + str(i), None, None)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    if not Cplex:
-        return processFile(Filename)
-
-def processFile(Filename, opt = False, destroyIn = True, destroyOut = True, suppressOutput = True):
-    # This function processes the linear programming problem described in the specified file.
-    # It submits it to the exact rational solver, processes the output and returns the solution
-    outFile = Filename.replace('.lp', '.sol')
-    if suppressOutput:
-        fnull = open(os.devnull, 'w')
-        subprocess.call([ESOLVER_PATH, "-O", outFile, Filename], stdout = fnull, stderr = fnull)
-        fnull.close()
-    else:
-        subprocess.call([ESOLVER_PATH, "-O", outFile, Filename])
-    if destroyIn:
-        subprocess.call(["rm", Filename])
-    result = parseOutput(outFile, opt)
-    if destroyOut:
-        subprocess.call(["rm", outFile])
-    return result
-
-def processProblem(p, opt = False, verbose = False):
-    status = p.solve()
-    dico = {}
-    if status == qsoptex.SolutionStatus.OPTIMAL:
-        value = p.get_objective_value()
-    elif status == qsoptex.SolutionStatus.UNBOUNDED:
-        if verbose:
-            print('Note: problem is unbounded!')
-        value = [float('Inf')]
-    elif status == qsoptex.SolutionStatus.INFEASIBLE:
-        if verbose:
-            print('Note: problem is infeasible!')
-        value = []
-    else:
-        if verbose:
-            print('Problem: A solution was not found!')
+        p.writeFile(Filename, Cplex)
         return
-    if opt:
-        if type(value) == type(zero): # the optimal value is finite
-            dico = {} ### FROM HERE!
-        return (value, dico)
-    else:
-        return value
-
-def parseOutput(Filename, opt = False, verbose = False):
-    # This function parses a solution file in the QSOpt_ex format
-    # and returns a list containing the value of the objective function ([] if
-    # the problem is infeasible, [float('Inf')] if it is unbounded, else [num, den]).
-    # If opt = TRUE, also returns a dictionary with values of the nonzero variables.
-    f = open(Filename, 'r')
-    g = f.readlines()
-    g = [x.strip() for x in g]
-    dico = {}
-    if g[0] == 'status = OPTIMAL':
-        valueLine = g[2]
-        index = valueLine.index('=')
-        value = convertToFraction(valueLine[index+2:])
-    elif g[0] == 'status = UNBOUNDED':
-        if verbose:
-            print('Note: problem is unbounded!')
-        value = [float('Inf')]
-    elif g[0] == 'status = INFEASIBLE':
-        if verbose:
-            print('Note: problem is infeasible!')
-        value = []
-    else:
-        if verbose:
-            print('Problem: A solution was not found!')
-        return
-    if opt:
-        if type(value) == type(zero):
-            # the optimal value is finite
-            pos = 4
-            while "=" in g[pos]:
-                index = g[pos].index('=')
-                varName = g[pos][:index-1]
-                varValue = g[pos][index+2:]
-                dico[varName] = convertToFraction(varValue)
-                pos += 1
-        return (value, dico)
-    else:
-        return value
+    return solveProblem(p)
 
 def mapBackCutset(cutsets, cols, prevRev, Isozymes):
     # Reverses the steps performed in reducing a stoichiometric matrix
@@ -1180,11 +1610,8 @@ def findEFM(N, special, zeros = [], Filename = 'trial.lp', rec = True, I = []):
         new = True
         Iter = 0
         while (new):
-            (val, vec) = findMin1Norm(N, special, weight, zeros, EFMpos, 1e-5, Filename[:-3] + 'I' + str(Iter) + '.lp', 'null', rec, I)
-            if not rec: # make sure only the relevant variables are kept!
-                for x in list(vec.keys()):
-                    if x[0] == 'T':
-                        del vec[x]
+            # make sure only the relevant variables are kept!
+            (val, vec) = findMin1Norm(N, special, weight, zeros, EFMpos, 1e-5, Filename[:-3] + 'I' + str(Iter) + '.lp', 'null', rec, I, skip = ('T',))
             peeledVec = peelOff(vec, myEFMs)
             if peeledVec:
                 positions = [False]*n
@@ -1209,15 +1636,16 @@ def peelOff(Vector, otherVectors):
     # assumed to be nonnegative and to have rational entries [num, den].
     # NOTE: In general, the order in which this is done matters; however,
     # if the vector is an FM and the other vectors are EFMs, it does not!
+    # The arithmetic uses gmpy2 if it is installed (see Rationals).
     L = len(otherVectors)
     givenVector = {}
     for x in Vector:
-        givenVector[x] = Vector[x]
+        givenVector[x] = toRational(Vector[x])
     for i in list(reversed(list(range(L)))):
         # try to subtract a multiple of the i-th vector from given one
         otherVector = {}
         for x in otherVectors[i]:
-            otherVector[x] = otherVectors[i][x]
+            otherVector[x] = toRational(otherVectors[i][x])
         if not ([x for x in otherVector if x not in givenVector]):
             # the support of otherVector is a subset of that of Vector
             ratios = [givenVector[x] / otherVector[x] for x in otherVector]
@@ -1226,7 +1654,7 @@ def peelOff(Vector, otherVectors):
                 givenVector[x] -= (myMin * otherVector[x])
                 if givenVector[x] == zero:
                     del givenVector[x]
-    return givenVector
+    return {x: fromRational(givenVector[x]) for x in givenVector}
 
 def findUniqueEFMs(EFMs):
     # This function finds a subset of unique EFMs from a given set of EFMs
@@ -1241,7 +1669,7 @@ def findUniqueEFMs(EFMs):
     else:
         return EFMs
 
-def findMin1Norm(N, special, weight = [1], zeros = [], exclude = [], eps = 1e-5, Filename = 'trial.lp', option = 'null', rec = True, I = [], Cplex = False):
+def buildMin1Norm(N, special, weight = [1], zeros = [], exclude = [], eps = 1e-5, Filename = 'trial.lp', option = 'null', rec = True, I = [], Cplex = False):
     # This function finds the vector of smallest overall weight in the nullspace of N whose
     # reactions are assumed to be all irreversible unless rec is specified to be False.
     # In that case, the reactions considered to be irreversible should be specified in I.
@@ -1251,66 +1679,73 @@ def findMin1Norm(N, special, weight = [1], zeros = [], exclude = [], eps = 1e-5,
     # Note: if the weight vector has a single component, it is automatically taken to be 1!
     # Available option values currently are 'null' for nullspace and 'col' for columnspace.
     m, n = getSize(N)
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Minimize\n'
-    opt += 'obj: '
+    p = LinearProblem(Filename.replace('.lp', ''), MINIMIZE)
     if rec:
         var = 'V'
     else:
         var = 'T'
     if option == 'null':
         if len(weight) == n:
-            opt += ' + '.join([str(weight[i]) + ' ' + var + str(i) for i in range(n) if weight[i]])
+            p.setObjective([(var + str(i), weight[i]) for i in range(n)])
         else:   # equal weights, take all of them equal to 1
-            opt += ' + '.join([var + str(i) for i in range(n)])
+            p.setObjective([(var + str(i), 1) for i in range(n)])
     elif option == 'col':
         if len(weight) == m:
-            opt += ' + '.join([str(weight[i]) + ' T' + str(i) for i in range(m) if weight[i]])
+            p.setObjective([('T' + str(i), weight[i]) for i in range(m)])
         else:   # equal weights, take all of them equal to 1
-            opt += ' + '.join(['T' + str(i) for i in range(m)])
+            p.setObjective([('T' + str(i), 1) for i in range(m)])
     else:
         print('Error: unrecognized option!')
         return
-    opt += '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
+    rows = findSparseRows(N)
     if option == 'null':
-        const += ''.join([' + '.join([str(N[i][j]) + ' V' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
+        addNullspaceConstraints(p, N, 'V', rows = rows)
         if not rec:
-            const += ''.join(['T' + str(j) + ' + V' + str(j) + '>= 0\n' for j in range(n)])
-            const += ''.join(['T' + str(j) + ' - V' + str(j) + '>= 0\n' for j in range(n)])
+            for j in range(n):
+                p.addConstraint([('T' + str(j), 1), ('V' + str(j), 1)], GREATER, 0)
+            for j in range(n):
+                p.addConstraint([('T' + str(j), 1), ('V' + str(j), -1)], GREATER, 0)
     elif option == 'col':
-        const += ''.join([' + '.join([str(N[i][j]) + ' V' + str(j) for j in range(n) if N[i][j]]) + ' - W' + str(i) + ' = 0\n' for i in range(m)])
-        const += ''.join(['T' + str(j) + ' + W' + str(j) + '>= 0\n' for j in range(m)])
-        const += ''.join(['T' + str(j) + ' - W' + str(j) + '>= 0\n' for j in range(m)])
-    const += 'V' + str(special) + ' = 1\n'
-    if zeros:
-        const += ''.join(['V' + str(x) + ' = 0\n' for x in zeros])
+        for i, row in enumerate(rows):
+            p.addConstraint([('V' + str(j), x) for (j, x) in row] + [('W' + str(i), -1)], EQUAL, 0)
+        for j in range(m):
+            p.addConstraint([('T' + str(j), 1), ('W' + str(j), 1)], GREATER, 0)
+        for j in range(m):
+            p.addConstraint([('T' + str(j), 1), ('W' + str(j), -1)], GREATER, 0)
+    p.addConstraint([('V' + str(special), 1)], EQUAL, 1)
+    for x in zeros:
+        p.addConstraint([('V' + str(x), 1)], EQUAL, 0)
     if exclude:
         k = len(exclude)
         s = len(exclude[0])
         if s == n:
-            const += ''.join([' + '.join([var + str(j) for j in range(n) if not exclude[i][j]]) + ' >' + str(eps) + '\n' for i in range(k)])
+            for i in range(k):
+                p.addConstraint([(var + str(j), 1) for j in range(n) if not exclude[i][j]], GREATER, eps)
         else:
             print("Error: the length of the excluded vectors is incorrect!")
-    if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
     if option == 'col':
-        bounds = 'Bounds\n'
-        bounds += ''.join(['W' + str(j) + ' free\n' for j in range(m) if [_f for _f in N[j] if _f]])
-        f.write(bounds)
+        for j, row in enumerate(rows):
+            if row:
+                p.setBounds('W' + str(j), None, None)
     elif not rec:
-        bounds = 'Bounds\n'
-        bounds += ''.join(['V' + str(j) + ' free\n' for j in range(n) if j not in I and [_f for _f in [N[i][j] for i in range(m)] if _f]])
-        f.write(bounds)
-    f.write('End\n')
-    f.close()
-    return processFile(Filename, True)
+        active = findActiveColumns(N, rows)
+        I = set(I)
+        for j in range(n):
+            if j not in I and active[j]:
+                p.setBounds('V' + str(j), None, None)
+    return p
+
+def findMin1Norm(N, special, weight = [1], zeros = [], exclude = [], eps = 1e-5, Filename = 'trial.lp', option = 'null', rec = True, I = [], Cplex = False, hybrid = False, skip = ()):
+    # Solves the problem created by buildMin1Norm (see above) and returns the optimal vector
+    # If hybrid is True, a floating-point solution is tried first and certified exactly.
+    # Variables starting with one of the prefixes in skip are left out of the vector.
+    p = buildMin1Norm(N, special, weight, zeros, exclude, eps, Filename, option, rec, I, Cplex)
+    if p is None:
+        return
+    if Cplex:
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, True, hybrid, skip)
 
 def LCM(a,b):
     # This function computes the least common multiple of two integers
@@ -1329,7 +1764,7 @@ def integralize(Vector, mult = False, decim = False):
         keys = list(range(len(Vector)))
         values = Vector
         intVector = [[] for i in keys]
-    lcm = reduce(LCM, [convertToFraction(z).denominator for z in values])
+    lcm = findLCM([convertToFraction(z).denominator for z in values])
     if decim:
         while lcm % 2 == 0:
             lcm /= 2
@@ -1394,39 +1829,44 @@ def findMCS(N, special, Filename = 'trial.lp'):
     MCSs = [[y for y in range(len(x)) if x[y]] for x in MCSpos]
     return MCSs
 
-def testCutSet(Cutset, N, Target, Filename = 'trial.lp', rec = True, I = [], Cplex = False):
+def buildCutSet(Cutset, N, Target, Filename = 'trial.lp', rec = True, I = [], Cplex = False):
     # This function determines whether a given subset of reactions represents a cutset
     # for a given target reaction in a network which is assumed to be irreversible,
     # unless rec is specified to be False. In that case, the reactions considered to be
     # irreversible should be specified in I.
     m, n = getSize(N)
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Minimize\n'
+    p = LinearProblem(Filename.replace('.lp', ''), MINIMIZE)
     if Cplex:
-        opt += 'V' + str(Target) + '\n'
-    else:
-        opt += '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    const += 'V' + str(Target) + ' = 1\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' V' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
+        p.setObjective([('V' + str(Target), 1)])
+    p.addConstraint([('V' + str(Target), 1)], EQUAL, 1)
+    rows = findSparseRows(N)
+    addNullspaceConstraints(p, N, 'V', rows = rows)
     for react in Cutset:
-        const += 'V' + str(react) + ' = 0\n'
-    if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
+        p.addConstraint([('V' + str(react), 1)], EQUAL, 0)
     if not rec:
-        bounds = 'Bounds\n'
-        bounds += ''.join(['V' + str(j) + ' free\n' for j in range(n) if j not in I and [_f for _f in [N[i][j] for i in range(m)] if _f]])
-        f.write(bounds)
-    f.write('End\n')
-    f.close()
-    val = processFile(Filename)
-    return (type(val) == type([]) and len(val) == 0) # TRUE IFF THE PROBLEM IS INFEASIBLE
+        active = findActiveColumns(N, rows)
+        I = set(I)
+        for j in range(n):
+            if j not in I and active[j]:
+                p.setBounds('V' + str(j), None, None)
+    return p
+
+def testCutSet(Cutset, N, Target, Filename = 'trial.lp', rec = True, I = [], Cplex = False):
+    # Solves the problem created by buildCutSet (see above); True iff Cutset is a cutset
+    # Returns None if the solver was stopped by a limit, in which case nothing is known.
+    p = buildCutSet(Cutset, N, Target, Filename, rec, I, Cplex)
+    if Cplex:
+        p.writeFile(Filename, Cplex)
+        return
+    val = solveProblem(p)
+    if isLimited(val):
+        print('Warning: the cutset test was stopped by a ' + val.reason + ' limit')
+        return None
+    return isInfeasible(val) # TRUE IFF THE PROBLEM IS INFEASIBLE
+
+def isInfeasible(val):
+    # Determines whether the value returned by the solver indicates an infeasible problem
+    return (type(val) == type([]) and len(val) == 0)
 
 def testSet(Set, Function, Args):
     # General function for testing a monotone property and identifying a local minimum for it.
@@ -1489,45 +1929,61 @@ def findSmallCutsets(Network, Target, skip = [], Kmax = 3):
                 PairsT = sum(PairsT, [])
                 Subsets[2] += sum([[sorted([cur,x,y]) for x in pair for y in pair if x != y] for pair in PairsT],[])
     return Subsets
-####parallelization
-def parallelizedTestCutSet(Network, Target,  rec, I,subList,index,out_q_lethal,out_q_iter):
-    Filename = 'lethal.lp'
-    count = len(subList) * index
-    outdict_lethal = {}
-    outdict_iter = {}
-    subIter = 0
-    for ind, pair in enumerate(subList):
-        if testCutSet(pair, Network, Target, (Filename[:-3] + str(index) + 'V' + str(ind) + Filename[-3:]), rec, I):
-            outdict_lethal[count+ind] = pair #place pair into dictionary
-        subIter += 1
-
-    #place items into dictionary then into queue
-    outdict_iter[index] = subIter
-    out_q_lethal.put(outdict_lethal)
-    out_q_iter.put(outdict_iter)
-###end parallelization
-
-def findEssentialLethal(Network, Target, Filename = 'lethal.lp', rec = True, I = [], verbose = False, parallel = 0):
+
+def findEssentialLethal(Network, Target, Filename = 'lethal.lp', rec = True, I = [], verbose = False, parallel = 0, pool = None, statsFile = None, split = True):
     # This function identifies all essential and synthetic lethal pairs in a given
     # network for a specified target reaction.
     # It returns a tuple, containing a list of singletons and a list of pairs.
     # The network is assumed to be irreversible unless rec is specified to be False.
     # In that case, the reactions considered to be irreversible should be specified in I.
     # If parallel > 0, it specifies the number of cores - the checks are split into as many parts.
+    # If a SolverPool is specified, the linear programs are submitted to it instead.
+    # The synthetic lethal pairs are checked in one batch of feasibility problems.
+    # If statsFile is specified, the linear programs solved are written into it (see LPStats).
+    # If split is True, only the connected component of the network containing the target is
+    # considered, since no reaction outside of it can be essential or part of a lethal pair.
+    firstCall = getLPStats().getCount()
     m, n = getSize(Network)
     Essential, Lethal = [], []
     if n == 1:
         return (Essential, Lethal)
+    if split:
+        components = findComponents(Network)
+        if len(components) > 1:
+            (rows, cols) = [component for component in components if Target in component[1]][0]
+            IrrevSet = set(I)
+            subI = [k for k, j in enumerate(cols) if j in IrrevSet]
+            (subEssential, subLethal) = findEssentialLethal(selectSubmatrix(Network, rows, cols), cols.index(Target), Filename, rec, subI, verbose, parallel, pool, None, False)
+            Essential = mapList(subEssential, cols)
+            Lethal = [mapList(pair, cols) for pair in subLethal]
+            if statsFile:
+                dumpLPStats(statsFile, firstCall)
+            return (Essential, Lethal)
     (val, vec) = findMin1Norm(Network, Target, [1]*n, [], [], 1e-5, Filename, 'null', rec, I)
     firstEntries = [int(y[1:]) for y in list(vec.keys()) if y.startswith('V')]
     L = len(firstEntries)
     # start by checking for essentiality; if a reaction is not essential, add the feasible vector to the collection!
     Collection = [firstEntries]
     Iter = 0
+    if pool is not None:
+        entries = [entry for entry in firstEntries if entry != Target]
+        problems = [buildMin1Norm(Network, Target, [1]*n, [entry], [], 1e-5, Filename[:-3] + 'I' + str(Iter) + '.lp', 'null', rec, I) for Iter, entry in enumerate(entries)]
+        for entry, (valN, vecN) in zip(entries, pool.map(problems, True)):
+            if isLimited(valN):
+                print('Warning: the essentiality of reaction ' + str(entry) + ' could not be determined')
+            elif valN: # feasible
+                Collection.append([int(y[1:]) for y in list(vecN.keys()) if y.startswith('V')])
+            else:
+                Essential.append(entry)
+        Iter = len(firstEntries) - 1
+        firstEntries = []
     for Iter, entry in enumerate(firstEntries):
+        checkCancelled()
         if entry != Target:
             (valN, vecN) = findMin1Norm(Network, Target, [1]*n, [entry], [], 1e-5, Filename[:-3] + 'I' + str(Iter) + '.lp', 'null', rec, I)
-            if valN: # feasible
+            if isLimited(valN):
+                print('Warning: the essentiality of reaction ' + str(entry) + ' could not be determined')
+            elif valN: # feasible
                 Collection.append([int(y[1:]) for y in list(vecN.keys()) if y.startswith('V')])
             else:
                 Essential.append(entry)
@@ -1539,51 +1995,20 @@ def findEssentialLethal(Network, Target, Filename = 'lethal.lp', rec = True, I =
     CandidatePairs = [[x,y] for x in allCandidates for y in allCandidates if x < y]
     if verbose:
         print(('There are ' + str(len(CandidatePairs)) + ' pairs to be processed'))
-    #parallel = 6 # testing
-    if parallel > 0:
-        #chunkify
-        CandidatePairs = [pair for pair in CandidatePairs if all([(pair[0] in z or pair[1] in z) for z in Collection])]
-        splitPairs = [CandidatePairs[i::parallel] for i in range(parallel)]
-
-
-        out_q_lethal = multiprocessing.Queue() #each worker process puts a result dictionary into it
-        out_q_iter = multiprocessing.Queue() #each worker process puts a result dictionary into it
-        procs = []
-        for index, subList in enumerate(splitPairs):
-            #creates process, target function and parameters
-            p = multiprocessing.Process(
-                    target=parallelizedTestCutSet,
-                    args=(Network, Target, rec, I,subList,index,out_q_lethal,out_q_iter ))
-            procs.append(p)
-            p.daemon = True # runs as a background process
-            p.start()
-
-        # Collect all results into a single result dict
-        resultdict_lethal = {}
-        for i in range(parallel):
-            resultdict_lethal.update(out_q_lethal.get())
-
-        resultdict_iter = {}
-        for i in range(parallel):
-            resultdict_iter.update(out_q_iter.get())
-
-        # Wait for all worker processes to finish
-        for p in procs:
-            p.join()
-        Lethal = list(resultdict_lethal.values())
-        Iter += sum(resultdict_iter.values())
-
-    else:
-        for ind, pair in enumerate(CandidatePairs):
-            if verbose and (ind + 1) % 1000 == 0:
-                print(('Processed ' + str(ind + 1) + ' pairs so far'))
-            if all([(pair[0] in z or pair[1] in z) for z in Collection]):
-                if testCutSet(pair, Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I):
-                    Lethal.append(pair)
-                Iter += 1
+    CandidatePairs = [pair for pair in CandidatePairs if all([(pair[0] in z or pair[1] in z) for z in Collection])]
+    # a pair is lethal iff the target cannot be active with both reactions disabled
+    Irrev = (I if not rec else list(range(n)))
+    queries = [{'special': Target, 'Filename': Filename[:-3] + str(ind) + Filename[-3:], 'disable': pair} for ind, pair in enumerate(CandidatePairs)]
+    results = findFeasibleBatch(Network, Irrev, queries, workers = parallel, pool = pool)
+    Lethal = [pair for (pair, (feasible, vec)) in zip(CandidatePairs, results) if feasible == False]
+    unknown = len([feasible for (feasible, vec) in results if feasible is None])
+    if unknown:
+        print('Warning: ' + str(unknown) + ' pairs could not be tested because of a solver failure or limit')
+    Iter += len(CandidatePairs)
     if verbose:
         print(("This required a total of " + str(Iter) + " linear programs"))
-
+    if statsFile:
+        dumpLPStats(statsFile, firstCall)
     return (Essential, Lethal)
 
 def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', rec = True, I = [], startInd = 0, startSubsets = []):
@@ -1594,6 +2019,8 @@ def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', r
     # In that case, the reactions considered to be irreversible should be specified in I.
     # If the processing had already been partly done, change startInd to reflect that!
     # In that case, the optional argument startSubsets should contain the initial set.
+    # The subsets whose test is stopped by a solver limit are reported at the end (and are
+    # not extended, since it is not known whether their extensions would be minimal).
     m,n = getSize(Network)
     Subsets = [[] for i in range(Kmax)]
     # Use initialization if necessary!
@@ -1601,6 +2028,12 @@ def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', r
         for i in range(len(startSubsets)):
             Subsets[i] = startSubsets[i]
     Iter = 0
+    unknown = []
+    def isCutSet(cutset, Iter):
+        result = testCutSet(cutset, Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+        if result is None:
+            unknown.append(sorted(cutset))
+        return result
     if Kmax >= 4:
         print('This function is not implemented for Kmax >= 4 as it is likely to take too long!')
         return Subsets
@@ -1626,21 +2059,23 @@ def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', r
     if Kmax >= 1:
         print('Processing subsets of size 1')
         for index, subset in enumerate(relevant):
+            checkCancelled()
             print(('Processing element number ' + str(index)))
             if M[subset,subset] == L:
                 if Iter >= startInd:
-                    result = testCutSet([subset], Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+                    result = isCutSet([subset], Iter)
                     if result:
                         Subsets[0].append([subset])
-                    else:
+                    elif result is not None:
                         # see if any extension of size 1 or 2 would work, if necessary
                         if Kmax >= 2:
                             simpleExtensions = []
                             print(('Checking ' + str(H) + ' possible extensions of size 1'))
                             for ind, item in enumerate(additional):
+                                checkCancelled()
                                 if (ind % 25 == 0):
                                     print(('Checked ' + str(ind) + ' options so far'))
-                                result = testCutSet([subset]+[item], Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+                                result = isCutSet([subset]+[item], Iter)
                                 if result:
                                     Subsets[1].append(sorted([subset] + [item]))
                                     simpleExtensions.append(item)
@@ -1650,9 +2085,10 @@ def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', r
                             candidatePairs = [[x,y] for x in candidates for y in candidates if x < y]
                             print(('Checking ' + str(len(candidatePairs)) + ' possible extensions of size 2'))
                             for ind, pair in enumerate(candidatePairs):
+                                checkCancelled()
                                 if (ind % 25 == 0):
                                     print(('Checked ' + str(ind) + ' options so far'))
-                                result = testCutSet([subset] + pair, Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+                                result = isCutSet([subset] + pair, Iter)
                                 if result:
                                     Subsets[2].append(sorted([subset] + pair))
                                 Iter += 1
@@ -1663,21 +2099,23 @@ def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', r
         candidatePairs = [[x,y] for x in candidates for y in candidates if x < y]
         print(('There are ' + str(len(candidatePairs)) + ' subsets to process'))
         for index, subset in enumerate(candidatePairs):
+            checkCancelled()
             print(('Processing pair number ' + str(index)))
             p, q = subset[0], subset[1]
             if M[p,p] + M[q,q] - M[p,q] == L:
                 if Iter >= startInd:
-                    result = testCutSet(subset, Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+                    result = isCutSet(subset, Iter)
                     if result:
                         Subsets[1].append(subset)
-                    else:
+                    elif result is not None:
                         # see if any extension of size 1 would work
                         if Kmax >= 3:
                             print(('Checking ' + str(H) + ' possible extensions of size 1'))
                             for ind, item in enumerate(additional):
+                                checkCancelled()
                                 if (ind % 25 == 0):
                                     print(('Checked ' + str(ind) + ' options so far'))
-                                result = testCutSet(subset + [item], Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+                                result = isCutSet(subset + [item], Iter)
                                 if result:
                                     Subsets[2].append(sorted(subset + [item]))
                                 Iter += 1
@@ -1687,17 +2125,20 @@ def testSubsets(Network, Target, fluxes = [], Kmax = 3, Filename = 'trial.lp', r
         candidates = [x for x in relevant if [x] not in Subsets[0]]
         candidateTriples = [[x,y,z] for x in candidates for y in candidates for z in candidates if x < y and y < z]
         for index, subset in enumerate(candidateTriples):
+            checkCancelled()
             print(('Processing triplet number ' + str(index)))
             p, q, r = subset[0], subset[1], subset[2]
             if [p,q] in Subsets[1] or [p,r] in Subsets[1] or [q,r] in Subsets[1]:
                 continue
             if M[p,p] + M[q,q] + M[r,r] - M[p,q] - M[p,r] - M[q,r] +  min([M[p,q], M[p,r], M[q,r]]) >= L:
                 if Iter >= startInd:
-                    result = testCutSet(subset, Network, Target, Filename[:-3] + str(Iter) + Filename[-3:], rec, I)
+                    result = isCutSet(subset, Iter)
                     if result:
                         Subsets[2].append(subset)
                 Iter += 1
     print(("This required a total of " + str(Iter) + " linear programs"))
+    if unknown:
+        print('Warning: whether ' + str(unknown) + ' are cutsets could not be determined because of a solver limit')
     return Subsets
 
 def generateSubsets(n, k):
@@ -1724,55 +2165,49 @@ def findMinAdded(N, special, weight = [1], exclude = [], eps = 1e-5, Filename =
     # The entry corresponding to special is 1. Extra lower bounds may be supplied as extra.
     # Note: if the weight vector has a single component, it is automatically taken to be 1!
     m, n = getSize(N)
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Minimize\n'
-    opt += 'obj: '
+    p = LinearProblem(Filename.replace('.lp', ''), MINIMIZE)
     if len(weight) == n:
-        opt += ' + '.join([str(weight[i]) + ' T' + str(i) for i in range(n) if weight[i]])
+        p.setObjective([('T' + str(i), weight[i]) for i in range(n)])
     else:   # equal weights, take all of them equal to 1
-        opt += ' + '.join(['T' + str(i) for i in range(n)])
-    opt += '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
+        p.setObjective([('T' + str(i), 1) for i in range(n)])
+    rows = findSparseRows(N)
     if option == 'row':
-        const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(i) for i in range(m) if N[i][j]]) + ' + -1 Y' + str(j) + ' = 0\n' for j in range(n)])
-        const += ''.join(['Y' + str(j) + ' + T' + str(j) + '>= 0\n' for j in range(n)])
-        const += 'Y' + str(special) + ' = 1\n'
+        addRowspaceConstraints(p, N, 'X', 'Y', rows = rows)
+        for j in range(n):
+            p.addConstraint([('Y' + str(j), 1), ('T' + str(j), 1)], GREATER, 0)
+        p.addConstraint([('Y' + str(special), 1)], EQUAL, 1)
     elif option == 'null':
-        const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
-        const += ''.join(['X' + str(j) + ' + T' + str(j) + '>= 0\n' for j in range(n)])
-        const += 'X' + str(special) + ' = 1\n'
+        addNullspaceConstraints(p, N, 'X', rows = rows)
+        for j in range(n):
+            p.addConstraint([('X' + str(j), 1), ('T' + str(j), 1)], GREATER, 0)
+        p.addConstraint([('X' + str(special), 1)], EQUAL, 1)
     if exclude:
         k = len(exclude)
         s = len(exclude[0])
         if s == n:
-            const += ''.join([' + '.join(['T' + str(j) for j in range(n) if not exclude[i][j]]) + ' >' + str(eps) + '\n' for i in range(k)])
+            for i in range(k):
+                p.addConstraint([('T' + str(j), 1) for j in range(n) if not exclude[i][j]], GREATER, eps)
         else:
             print("Error: the length of the excluded vectors is incorrect!")
-    bounds = 'Bounds\n'
     if option == 'row':
-        bounds += ''.join(['X' + str(i) + ' free\n' for i in range(m) if [_f for _f in N[i] if _f]])
-        bounds += ''.join(['Y' + str(j) + ' free\n' for j in range(n) if j not in extra])
+        for j in range(n):
+            if j not in extra:
+                p.setBounds('Y' + str(j), None, None)
         ## AL; changed order of bounds to make QSopt_ex not complain
-        # bounds += ''.join(['Y'+str(j)+'<='+str(round(extra[j],5)) + '\n' for j in extra])
         print(''.join([str(round(extra[j],5))+'<=' + 'Y' + str(j)+'<= 0'+ '\n' for j in extra]))
-        bounds += ''.join([str(round(extra[j],5))+'<=' + 'Y' + str(j)+'<= 0\n' for j in extra])
         print([round(extra[j],5) for j in extra])
-        #note that this puts the automatic upper bound that Yj<=0 as per QSopt_ex defaults
-        #const += ''.join(['Y' + str(j) + ' >= ' + str(round(extra[j],5)) + '\n' for j in extra])
+        # note that this puts the automatic upper bound that Yj<=0 as per QSopt_ex defaults
+        for j in extra:
+            p.setBounds('Y' + str(j), round(extra[j],5), 0)
     elif option == 'null':
-        bounds += ''.join(['X' + str(j) + ' free\n' for j in range(n) if [_f for _f in [N[i][j] for i in range(m)] if _f]])
+        active = findActiveColumns(N, rows)
+        for j in range(n):
+            if active[j]:
+                p.setBounds('X' + str(j), None, None)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    return processFile(Filename, True,destroyIn=False,destroyOut=False)
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, True)
 
 def checkUnblocked(RemoveConst, N, Irr, growth, Filename = 'Unblock.lp'):
     # This function checks whether removing a given subset of constraints
@@ -1946,6 +2381,7 @@ def findMinimalMedia(N, growth, Exchange, rec = False, I = [], opt = True):
     Iter = 0
     for i in Exchange:
         weight[i] = 1
+    template = FeasibilityTemplate(N, (list(range(n)) if rec else I))
     while (new):
         (val, vec) = findMin1Norm(N, growth, weight, [], MediaPos, 1e-5, 'Media' + str(Iter) + '.lp', 'null', rec, I)
         vec = peelOff(vec, MediaVec)
@@ -1958,7 +2394,7 @@ def findMinimalMedia(N, growth, Exchange, rec = False, I = [], opt = True):
                     relevant[x] = True
             if opt:
                 y = findTrueIndices(relevant)
-                minMedium = extractMinimal(y, checkMedium, [N, growth, Exchange, rec, I])
+                minMedium = extractMinimal(y, checkMedium, [N, growth, Exchange, rec, I, template])
                 relevant = [(True if z in minMedium else False) for z in range(n)]
             if relevant not in MediaPos:
                 MediaPos.append(relevant)
@@ -1970,72 +2406,39 @@ def findMinimalMedia(N, growth, Exchange, rec = False, I = [], opt = True):
     Media = [[y for y in range(len(x)) if x[y]] for x in MediaPos]
     return Media
 
-def checkMedium(Set, N, growth, Exchange, rec = False, I = []):
+def checkMedium(Set, N, growth, Exchange, rec = False, I = [], template = None):
     # returns True iff the given set of exchange reactions allows growth
+    # a FeasibilityTemplate for N (with the same irreversible reactions) may be supplied
     m, n = getSize(N)
     if rec:
         I = list(range(n))
     block = [x for x in Exchange if x not in Set]
-    (val, vec) = findFeasible(N, growth, Irrev = I, pos = True, Filename = 'trial.lp', disable = block, negative = [])
-    return not (type(val) == type([]) and len(val) == 0)
+    if template is None:
+        template = FeasibilityTemplate(N, I)
+    (val, vec) = template.solve(growth, pos = True, Filename = 'trial.lp', disable = block, negative = [])
+    return not isInfeasible(val)
 
 def GaussJordan(N, pivoting = True, Gauss = False, verbose = False):
     # This function returns the (pivoted) Row-Reduced Echelon Form of N.
-    # It was adapted from http://adorio-research.org/wordpress/?p=192.
-    # pivoting = True for partial row pivoting, False if no pivoting.
     # Gauss = True if a Row Echelon Form of N is needed, False otherwise.
     # Returns (A, R); A: transformed input matrix; R: indices of pivots.
-    nrow, ncol = getSize(N)
-    A = [[convertToFraction(N[i][j]) for j in range(ncol)] for i in range(nrow)]
-    R = []
-    # Triangularization
-    currow = 0
-    # This holds the index of the row we are currently searching
-    if verbose:
-        print(('There are ' + str(ncol) + ' columns to be processed'))
-    for pivot in range(ncol):
-        if verbose and pivot % 10 == 0:
-            print(('Processing column ' + str(pivot)))
-        if pivoting:
-            absVals = [abs(A[x][pivot]) for x in range(currow, nrow)]
-            bestPivot = max(absVals)
-            best = currow + absVals.index(bestPivot)
-            # exchange pivot row with best row.
-            if currow != best:
-                A[best], A[currow] = A[currow], A[best]
-        m = A[currow][pivot]
-        if m == zero:
-            # In solving a system, this would mean the algorithm broke down;
-            # however, in our case, this simply means we found a zero column!
-            continue
-        else:
-            R.append(pivot)
-            for row in range(0, nrow):
-                # NOTE: For Gaussian elimination, only eliminate the rows below the current one!
-                if ((Gauss and row > currow) or (not Gauss and row != currow)) and (A[row][pivot] != zero):
-                    kmul = A[row][pivot] / m
-                    # Apply rectangular rule (Reduction)
-                    for col in range(pivot + 1, ncol):
-                        A[row][col] -= (kmul * A[currow][col])
-                    A[row][pivot] = zero
-            currow += 1
-            if currow == nrow:
-                # we are all the way down!
-                break
-    if not Gauss:
-        # NOTE: For Gaussian elimination, we also don't need to normalize the rows at the end!
-        nonPivots = [x for x in range(ncol) if x not in R]
-        for row in range(len(R)):
-            pivot = R[row]
-            m = A[row][pivot]
-            A[row][pivot] = one
-            for col in nonPivots:
-                if A[row][col]:
-                    A[row][col] /= m
-    return (A, R)
+    # The elimination is sparse unless setElimination('dense') was called (see ExactElimination);
+    # pivoting only applies to the dense one, as the sparse ones choose their pivots to limit fill-in.
+    # A row echelon form is not unique, so the dense one is always returned when Gauss = True.
+    if getElimination() == 'dense' or Gauss:
+        return denseGaussJordan(N, pivoting, Gauss, verbose)
+    if not pivoting:
+        print('Warning: pivoting = False only applies to the dense elimination and is ignored')
+    m, n = getSize(N)
+    (rows, R) = findEchelon(N, True, verbose)
+    return (toDenseRows(normalizeRows(rows, R), m, n), R)
 
 def NullspaceBasis(N, GJ = False):
     # This function computes the nullspace basis using a Gauss-Jordan elimination
+    # If GJ is True, N is the result (A, R) of GaussJordan instead of the matrix itself.
+    if not GJ and getElimination() != 'dense':
+        (rows, R) = findEchelon(N)
+        return sparseNullspaceBasis(rows, R, getSize(N)[1])
     if not GJ:
         (A, R) = GaussJordan(N)
     else:
@@ -2063,6 +2466,8 @@ def NullspaceBasis(N, GJ = False):
 
 def transpose(Matrix):
     # This function creates the transpose of an input matrix
+    if isCompact(Matrix):
+        return Matrix.transpose()
     m, n = getSize(Matrix)
     return [[Matrix[i][j] for i in range(m)] for j in range(n)]
 
@@ -2186,7 +2591,7 @@ def SubspaceIntersection(ListOfBases, NullB = False):
     else:
         return transpose(NullspaceBasis(Basis))
 
-def findEssential(Network, growth, Exchange, allowed, Filename = 'trial.lp', rec = True, I = [], forbidden = [], GeneDeletes = [], J = []):
+def findEssential(Network, growth, Exchange, allowed, Filename = 'trial.lp', rec = True, I = [], forbidden = [], GeneDeletes = [], J = [], pool = None, workers = 0):
     # This procedure finds all the reactions essential for growth in a medium defined
     # by the set of exchange reactions and the subset of allowed exchange reactions.
     # The computations are performed using files derived from the specified Filename.
@@ -2196,6 +2601,8 @@ def findEssential(Network, growth, Exchange, allowed, Filename = 'trial.lp', rec
     # The last argument can be dictionary of reactions disabled by each gene deletion,
     # and in that case the procedure finds all the genes essential for growth instead.
     # Latest addition: there is now an option J for reactions with negative-only flux.
+    # The checks are performed in one batch; workers > 0 gives the number of processes to use,
+    # alternatively a SolverPool may be specified.
     m = len(Network)
     n = len(Network[0])
     Forbidden = [x for x in (Exchange + forbidden) if x not in allowed]
@@ -2205,6 +2612,9 @@ def findEssential(Network, growth, Exchange, allowed, Filename = 'trial.lp', rec
         Irrev = list(range(n))
     Essential = []
     (val0, vec0) = findFeasible(Network, growth, Irrev, True, Filename, Forbidden, J)
+    if isLimited(val0):
+        print("Error: the growth test was stopped by a " + val0.reason + " limit!")
+        return
     if type(val0) == type([]) and val0 == []:
         print("Error: the organism cannot grow under the given condition!")
         return
@@ -2212,17 +2622,16 @@ def findEssential(Network, growth, Exchange, allowed, Filename = 'trial.lp', rec
         active = [int(x[1:]) for x in vec0 if x.startswith('V')]
         active.remove(growth)
     if GeneDeletes:
-        i = 0
-        for gene in GeneDeletes:
-            (val, vec) = findFeasible(Network, growth, Irrev, True, Filename[:-3] + str(i) + '.lp', Forbidden + GeneDeletes[gene], J)
-            i = i + 1
-            if type(val) == type([]) and val == []:
-                Essential.append(gene)
+        keys = list(GeneDeletes)
+        queries = [{'special': growth, 'Filename': Filename[:-3] + str(i) + '.lp', 'disable': Forbidden + GeneDeletes[gene], 'negative': J} for i, gene in enumerate(keys)]
     else:
-        for i in active:
-            (val, vec) = findFeasible(Network, growth, Irrev, True, Filename[:-3] + str(i) + '.lp', Forbidden + [i], J)
-            if type(val) == type([]) and val == []:
-                Essential.append(i)
+        keys = active
+        queries = [{'special': growth, 'Filename': Filename[:-3] + str(i) + '.lp', 'disable': Forbidden + [i], 'negative': J} for i in keys]
+    results = findFeasibleBatch(Network, Irrev, queries, workers = workers, pool = pool)
+    Essential = [key for (key, (feasible, vec)) in zip(keys, results) if feasible == False]
+    unknown = [key for (key, (feasible, vec)) in zip(keys, results) if feasible is None]
+    if unknown:
+        print('Warning: the essentiality of ' + str(unknown) + ' could not be determined because of a solver failure or limit')
     return Essential
 
 def classifyExchange(FullNetwork, externalMetabs, Irrev, extra = False):
@@ -2279,36 +2688,30 @@ def findFreeLunch(N, Irrev, weight = [1], freeMetabs = [], Filename = 'trial.lp'
     # The free metabolites are ones that can be considered given (i.e. they can be consumed).
     # NOTE: To get meaningful results, the input matrix should contain external metabolites!
     m, n = getSize(N)
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Maximize\n'
-    opt += 'obj: '
+    p = LinearProblem(Filename.replace('.lp', ''), MAXIMIZE)
     if len(weight) == m:
-        opt += ' + '.join([str(weight[i]) + ' Y' + str(i) for i in range(m) if weight[i]])
+        p.setObjective([('Y' + str(i), weight[i]) for i in range(m)])
     elif len(weight) == 1:   # equal weights, take all of them equal to 1
-        opt += ' + '.join(['Y' + str(i) for i in range(m)])
+        p.setObjective([('Y' + str(i), 1) for i in range(m)])
     else:
         print('Error: the weight vector is not of the right length!')
-    opt += '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' X' + str(j) for j in range(n) if N[i][j]]) + ' + -1 Y' + str(i) + ' = 0\n' for i in range(m)])
-    bounds = 'Bounds\n'
-    bounds += ''.join(['X' + str(j) + ' free\n' for j in range(n) if j not in Irrev])
-    bounds += ''.join(['-1 <= Y' + str(i) + ' <= 1\n' for i in freeMetabs])
-    bounds += ''.join(['Y' + str(i) + ' <= 1\n' for i in range(m) if i not in freeMetabs])
+    for i, row in enumerate(findSparseRows(N)):
+        p.addConstraint([('X' + str(j), x) for (j, x) in row] + [('Y' + str(i), -1)], EQUAL, 0)
+    Irrev, freeMetabs = set(Irrev), set(freeMetabs)
+    for j in range(n):
+        if j not in Irrev:
+            p.setBounds('X' + str(j), None, None)
+    for i in range(m):
+        if i in freeMetabs:
+            p.setBounds('Y' + str(i), -1, 1)
+        else:
+            p.setBounds('Y' + str(i), 0, 1)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    return processFile(Filename, True)
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, True)
 
-def FBA(N, growth, Exchange, allowed, limits = [1], Filename = 'trial.lp', rec = True, I = [], forbidden = [], Negative = [], Cplex = False):
+def FBA(N, growth, Exchange, allowed, limits = [1], Filename = 'trial.lp', rec = True, I = [], forbidden = [], Negative = [], Cplex = False, hybrid = False):
     # This procedure finds the maximal growth rate of an organism in a medium defined
     # by the set of exchange reactions and the subset of allowed exchange reactions.
     # The bounds on the flux of each allowed reaction are given by the vector limits.
@@ -2317,38 +2720,37 @@ def FBA(N, growth, Exchange, allowed, limits = [1], Filename = 'trial.lp', rec =
     # In that case, the reactions considered irreversible should be specified in I.
     # If any additional reactions are forbidden, they should be specified at the end.
     # Latest addition: there is now a Negative for reactions with negative-only flux.
+    # If hybrid is True, a floating-point solution is tried first and certified exactly.
     m, n = getSize(N)
     Forbidden = [x for x in (Exchange + forbidden) if x not in allowed]
     if not rec:
         Irrev = I
     else:
         Irrev = list(range(n))
+    Irrev = set(Irrev)
     Rev = [x for x in range(n) if x not in Irrev]
-    intro = 'Problem\n'
-    intro += (Filename.replace('.lp', '') + '\n')
-    opt = 'Maximize' + '\n' +  'V' + str(growth) + '\n'
-    const = 'Subject' + ' To' * int(Cplex) + '\n'
-    const += ''.join([' + '.join([str(N[i][j]) + ' V' + str(j) for j in range(n) if N[i][j]]) + ' = 0\n' for i in range(m)])
-    if Forbidden:
-        const += ''.join(['V' + str(i) + ' = 0\n' for i in Forbidden])
+    p = LinearProblem(Filename.replace('.lp', ''), MAXIMIZE)
+    p.setObjective([('V' + str(growth), 1)])
+    rows = findSparseRows(N)
+    addNullspaceConstraints(p, N, 'V', rows = rows)
+    for i in Forbidden:
+        p.addConstraint([('V' + str(i), 1)], EQUAL, 0)
     if len(limits) == 1:
-        const += ''.join(['V' + str(i) + ' <= 1\n' for i in allowed])
+        for i in allowed:
+            p.addConstraint([('V' + str(i), 1)], LESS, 1)
     elif len(limits) == len(allowed):
-        const += ''.join(['V' + str(allowed[i]) + ' <= ' + str(allowed[i]) + '\n' for i in range(len(allowed))])
+        for i in range(len(allowed)):
+            p.addConstraint([('V' + str(allowed[i]), 1)], LESS, allowed[i])
     else:
         print('Error: incompatible dimension of limits!')
-    bounds = 'Bounds\n'
-    if Negative:
-        bounds += ''.join(['-inf <= V' + str(i) + ' <= 0\n' for i in Negative])
-    bounds += ''.join(['V' + str(i) + ' free\n' for i in Rev if i not in Negative and [_f for _f in [N[k][i] for k in range(m)] if _f]])
+    for i in Negative:
+        p.setBounds('V' + str(i), None, 0)
+    active = findActiveColumns(N, rows)
+    Negative = set(Negative)
+    for i in Rev:
+        if i not in Negative and active[i]:
+            p.setBounds('V' + str(i), None, None)
     if Cplex:
-        const = const.replace('+ -', '-')
-    f = open(Filename, 'w')
-    if not Cplex:
-        f.write(intro)
-    f.write(opt)
-    f.write(const)
-    f.write(bounds)
-    f.write('End\n')
-    f.close()
-    return processFile(Filename)
+        p.writeFile(Filename, Cplex)
+        return
+    return solveProblem(p, False, hybrid)
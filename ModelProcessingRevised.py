@@ -2,7 +2,7 @@
 # Created by: Leonid Chindelevitch
 # Last modified: January 30, 2017
 
-import os, copy, itertools, random, subprocess, shelve
+import os, copy, itertools, random, subprocess, shelve, time
 
 from functools import reduce
 from decimal import Decimal
@@ -11,9 +11,9 @@ from fractions import Fraction
 from Utilities import *
 import multiprocessing
 import qsoptex
+from LPSolvers import getLPStats, findCallSite, SITE_WRAPPERS, solveExactProblem, takeParseTime, getStatus
 
 zero, one = Fraction(0), Fraction(1)
-used = [0] * 11
 
 
 #Docker ESOLVER_PATH:
@@ -459,7 +459,6 @@ def prepareForCplex(Matrix):
 
 
 def findPosSupport(N, support, weight = [1], Filename = 'trial.lp', Min = 0, restricted = True, option = 'row'):
-    used[0] = 1
     # This function finds the vector optimizing a given weight in the row/nullspace of N whose
     # support is restricted to a given set of entries; those entries must be non-negative!
     # Note: if the weight vector has a single component, it is automatically taken to be 1!
@@ -467,7 +466,7 @@ def findPosSupport(N, support, weight = [1], Filename = 'trial.lp', Min = 0, res
     # If restricted = False, same but support is NOT restricted to the given set of entries.
     # print("NEW fps!")
     m, n = getSize(N)
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
     variables = set([])
     for i in range(n):  variables.add('Y' + str(i))
@@ -550,7 +549,6 @@ def flipSigns(signs):
     return signsF
 
 def checkSigns(N, Rev, signs, Filename = 'signs.lp', Cplex = False):
-    used[1] = 1
     # Thus function checks whether a particular sign pattern on the reversible reactions gives
     # a feasible vector in the rowspace of the input matrix; signs is a string of '+' and '-'.
     m, n = getSize(N)
@@ -558,7 +556,7 @@ def checkSigns(N, Rev, signs, Filename = 'signs.lp', Cplex = False):
     negatives = mapList(negIndices, Rev)
     posIndices = [i for i, x in enumerate(signs) if x == '+']
     positives = mapList(posIndices, Rev)
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MINIMIZE)
     variables = set([])
     for j in range(n):
@@ -590,7 +588,6 @@ def checkSigns(N, Rev, signs, Filename = 'signs.lp', Cplex = False):
 
 
 def vectorInSpan(N, vec, Filename = 'trial.lp', Cplex = False):
-    used[2] = 1
     # This function determines whether a given vector vec is in the row span of a matrix.
     # This is achieved by solving a linear program using QSOpt_ex and checking its value.
     m, n = getSize(N)
@@ -598,7 +595,7 @@ def vectorInSpan(N, vec, Filename = 'trial.lp', Cplex = False):
     if n != n1:
         print('Problem: the vector is not compatible with the matrix!')
         return False
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
 
     p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
     p.add_variable('Y', objective=1, lower=0, upper=None)
@@ -625,7 +622,6 @@ def vectorInSpan(N, vec, Filename = 'trial.lp', Cplex = False):
         return False
 
 def computeDistance(N, vec, norm = 'inf', Irrev = [], Filename = 'Distance.lp', Cplex = False):
-    used[3] = 1
     # This function computes the distance from a given vector vec to the row span of a matrix.
     # The possible options for norm are 'one', 'two' and 'inf'; 'two' is currently unavailable.
     # The optional list Irrev specifies the set of row coefficients required to be nonnegative.
@@ -634,7 +630,7 @@ def computeDistance(N, vec, norm = 'inf', Irrev = [], Filename = 'Distance.lp',
     if n != n1:
         print('Problem: the vector is not compatible with the matrix!')
         return
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MINIMIZE)
     variables = set(['Y'])
     p.add_variable('Y', objective=1, lower=0, upper=None)
@@ -897,7 +893,6 @@ def reconfigureNetwork(N, irrev):
 
 
 def findFeasible(N, special, Irrev = [], pos = True, Filename = 'trial.lp', disable = [], negative = [], option = 'null', Cplex = False):
-    used[4]=1
     # This function finds a feasible vector in the row/nullspace of N whose set of irreversible
     # reactions is given. The entry corresponding to special is 1 if pos is True, -1 otherwise.
     # Additional features: it is now possible to specify a subset of reactions to be disabled
@@ -905,7 +900,7 @@ def findFeasible(N, special, Irrev = [], pos = True, Filename = 'trial.lp', disa
     # The option can be 'null' for nullspace (default) or 'row' for rowspace.
     m, n = getSize(N)
     Rev = [x for x in range(n) if x not in Irrev]
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
     variables = set([])
     # note: we are only looking for a feasible vector, hence no objective function required!
@@ -953,13 +948,12 @@ def findFeasible(N, special, Irrev = [], pos = True, Filename = 'trial.lp', disa
 
 
 def findRatio(N, react1, react2, Irrev, Max = True, ratio = 0, Filename = 'trial.lp', Cplex = False):
-    used[5] = 1
     # This function finds the minimum or the maximum ratio of two given entries in the nullspace
     # of N whose set of irreversible reactions is given. Maximize if Max is True, minimize if not.
     # If a ratio is specified, checks whether the difference react1 - ratio * react2 can equal 1.
     m, n = getSize(N)
     Rev = [x for x in range(n) if x not in Irrev]
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     variables = set([])
     if Max:
         p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
@@ -1229,7 +1223,6 @@ def findUniqueEFMs(EFMs):
         return EFMs
 
 def findMin1Norm(N, special, weight = [1], zeros = [], exclude = [], eps = 1e-5, Filename = 'trial.lp', option = 'null', rec = True, I = [], Cplex = False):
-    used[6] = 1
     # This function finds the vector of smallest overall weight in the nullspace of N whose
     # reactions are assumed to be all irreversible unless rec is specified to be False.
     # In that case, the reactions considered to be irreversible should be specified in I.
@@ -1239,7 +1232,7 @@ def findMin1Norm(N, special, weight = [1], zeros = [], exclude = [], eps = 1e-5,
     # Note: if the weight vector has a single component, it is automatically taken to be 1!
     # Available option values currently are 'null' for nullspace and 'col' for columnspace.
     m, n = getSize(N)
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MINIMIZE)
     variables = set(['T', 'V'])
 
@@ -1410,13 +1403,12 @@ def findMCS(N, special, Filename = 'trial.lp'):
     return MCSs
 
 def testCutSet(Cutset, N, Target, Filename = 'trial.lp', rec = True, I = [], Cplex = False):
-    used[7] = 1
     # This function determines whether a given subset of reactions represents a cutset
     # for a given target reaction in a network which is assumed to be irreversible,
     # unless rec is specified to be False. In that case, the reactions considered to be
     # irreversible should be specified in I.
     m, n = getSize(N)
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MINIMIZE)
     variables = set([])
     p.add_linear_constraint(qsoptex.ConstraintSense.EQUAL, {'V'+str(Target):1}, rhs=1)
@@ -1726,13 +1718,12 @@ def generateSubsets(n, k):
             break
 
 def findMinAdded(N, special, weight = [1], exclude = [], eps = 1e-5, Filename = 'trial.lp', extra = {}, option = 'row', Cplex = False):
-    used[8] = 1
     # This function finds the nonnegative vector of smallest weight to be added to a vector
     # in the rowspace of N (nullspace if option is 'null') to make the resulting vector >=0.
     # The entry corresponding to special is 1. Extra lower bounds may be supplied as extra.
     # Note: if the weight vector has a single component, it is automatically taken to be 1!
     m, n = getSize(N)
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MINIMIZE)
     variables = set([])
 
@@ -1806,7 +1797,7 @@ def findMinAdded(N, special, weight = [1], exclude = [], eps = 1e-5, Filename =
                 p.add_variable('X' + str(j), objective=0, lower=0, upper=None)
             p.add_variable('Y' + str(j), objective=0, lower=0, upper=None)
 
-    return processProblem(p,variables, True,destroyIn=False,destroyOut=False)
+    return processProblem(p, variables, True)
 
 def checkUnblocked(RemoveConst, N, Irr, growth, Filename = 'Unblock.lp'):
     # This function checks whether removing a given subset of constraints
@@ -2308,13 +2299,12 @@ def classifyExchange(FullNetwork, externalMetabs, Irrev, extra = False):
     return (InputIrr, InputRev, OutputIrr, OutputRev, MixedIrr, MixedRev)
 
 def findFreeLunch(N, Irrev, weight = [1], freeMetabs = [], Filename = 'trial.lp', Cplex = False):
-    used[9] = 1
     # This function finds the vector optimizing a given weight in the column space of N with
     # nonnegative entries and whose flux vector satisfies the irreversibility conditions.
     # The free metabolites are ones that can be considered given (i.e. they can be consumed).
     # NOTE: To get meaningful results, the input matrix should contain external metabolites!
     m, n = getSize(N)
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
     variables = set([])
     if len(weight)!=m and len(weight)!=1:
@@ -2339,10 +2329,9 @@ def findFreeLunch(N, Irrev, weight = [1], freeMetabs = [], Filename = 'trial.lp'
             curDict.update({'X'+str(j):N[i][j]})
         p.add_linear_constraint(qsoptex.ConstraintSense.EQUAL, curDict, rhs=0)
 
-    return processProblem(p, True, variables)
+    return processProblem(p, variables, True)
 
 def FBA(N, growth, Exchange, allowed, limits = [1], Filename = 'trial.lp', rec = True, I = [], forbidden = [], Negative = [], Cplex = False):
-    used[10] = 1
     # This procedure finds the maximal growth rate of an organism in a medium defined
     # by the set of exchange reactions and the subset of allowed exchange reactions.
     # The bounds on the flux of each allowed reaction are given by the vector limits.
@@ -2358,7 +2347,7 @@ def FBA(N, growth, Exchange, allowed, limits = [1], Filename = 'trial.lp', rec =
     else:
         Irrev = list(range(n))
     Rev = [x for x in range(n) if x not in Irrev]
-    p = qsoptex.ExactProblem()
+    p = TrackedProblem()
     p.set_objective_sense(qsoptex.ObjectiveSense.MAXIMIZE)
 
     variables = set(['V'+str(growth)])
@@ -2398,67 +2387,50 @@ def FBA(N, growth, Exchange, allowed, limits = [1], Filename = 'trial.lp', rec =
     return processProblem(p, variables)
 
 
+class TrackedProblem:
+    # A qsoptex.ExactProblem that remembers when it was created and counts its constraints
+    # and variables, so that processProblem can record the size and the build time of each
+    # problem in the LP statistics; all the other methods are those of the ExactProblem.
+    # The calls building it are also recorded, so that it can be pickled: it is then built
+    # again when it is unpickled, as it is in the child process solving it under a limit.
+    def __init__(self):
+        self.problem = qsoptex.ExactProblem()
+        self.created = time.time()
+        self.rows, self.cols = 0, 0
+        self.calls = []
+    def call(self, name, args, kwargs):
+        self.calls.append((name, args, kwargs))
+        return getattr(self.problem, name)(*args, **kwargs)
+    def add_linear_constraint(self, *args, **kwargs):
+        self.rows += 1
+        return self.call('add_linear_constraint', args, kwargs)
+    def add_variable(self, *args, **kwargs):
+        self.cols += 1
+        return self.call('add_variable', args, kwargs)
+    def set_objective_sense(self, *args, **kwargs):
+        return self.call('set_objective_sense', args, kwargs)
+    def __getstate__(self):
+        return {'created': self.created, 'rows': self.rows, 'cols': self.cols, 'calls': self.calls}
+    def __setstate__(self, state):
+        self.__init__()
+        for (name, args, kwargs) in state['calls']:
+            self.call(name, args, kwargs)
+        (self.created, self.rows, self.cols) = (state['created'], state['rows'], state['cols'])
+    def __getattr__(self, name):
+        if name == 'problem':
+            raise AttributeError(name)
+        return getattr(self.problem, name)
+
+SITE_WRAPPERS.add('processProblem')
+
 def processProblem(p, vector, opt = False, verbose = False):
-    print('Here solving one...')
-    status = p.solve()
-    print('Here solved one...')
-    verbose = True
-    if status == qsoptex.SolutionStatus.OPTIMAL:
-        print('status:', '')
-        print(status, '')
-        print(', optimal:', '')
-        print(qsoptex.SolutionStatus.OPTIMAL, '')
-        value = p.get_objective_value()
-    elif status == qsoptex.SolutionStatus.UNBOUNDED:
-        if verbose:
-            print('Note: problem is unbounded!')
-        value = [float('Inf')]
-        return value, {}
-    elif status == qsoptex.SolutionStatus.INFEASIBLE:
-        value = []
-        if verbose:
-            print('Note: problem is infeasible!')
-        return value, {}
-    else:
-        if verbose:
-            print('Problem: A solution was not found!')
-        return [], {}
-    if opt:
-        # if type(value) == type(zero): # the optimal value is finite
-        dico = {}
-        copy_vector = vector.copy()
-        for var in vector:
-            if p.get_value(var) == Fraction(0):
-                copy_vector.remove(var)
-
-        vector = copy_vector
-
-        for var in vector:
-            dico.update({var: p.get_value(var)})
-        print('The answer is: ')
-        print(value)
-        # s = open('solution.txt', 'w')
-        # s.write(str(value)+'\n')
-        # s.write(str(dico)[1:-1])
-        # s.close()
-        return value, dico
-    else:
-        print('The answer is: ')
-        print(value)
-        dico = {}
-        copy_vector = vector.copy()
-        for var in vector:
-            if p.get_value(var) == Fraction(0):
-                copy_vector.remove(var)
-
-        vector = copy_vector
-
-        for var in vector:
-            dico.update({var: p.get_value(var)})
-            # print(p)
-        # print((value, dico))
-        # exit()
-        return value, dico
-
-def get_used():
-    return used
\ No newline at end of file
+    # Solves a TrackedProblem in the same way as the qsoptex back-end of solveProblem (see
+    # solveExactProblem in LPSolvers), so the result has the same format: the value alone
+    # unless opt is True, in which case the nonzero values of the variables in vector are
+    # returned with it. Every solve is recorded in the LP statistics (see LPStats) under the
+    # name of the calling function, with the size and the build time of p.
+    start = time.time()
+    result = solveExactProblem(p, vector, opt, verbose = verbose)
+    parse = takeParseTime()
+    getLPStats().record(findCallSite(), (p.rows, p.cols), start - p.created, time.time() - start - parse, parse, getStatus(result, opt))
+    return result
@@ -0,0 +1,68 @@
+# This file selects the implementation of exact rational arithmetic used in the hot loops of
+# Mongoose: gmpy2 (mpq and mpz, based on GMP) when it is installed, and Python's Fraction and
+# int otherwise. python-flint, when installed, is used for whole-matrix elimination instead
+# (see flintEchelon in ExactElimination). Whatever the implementation, the values handed back
+# to the rest of Mongoose are Fractions and ints, so the results are identical in all cases.
+
+from functools import reduce
+from math import gcd
+from fractions import Fraction
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+try:
+    import flint
+except ImportError:
+    flint = None
+
+NUMBERS = 'gmpy2' if gmpy2 is not None else 'fraction'
+
+def setRationals(name):
+    # Selects the implementation used for rational arithmetic: 'gmpy2' or 'fraction'
+    global NUMBERS
+    if name not in ['gmpy2', 'fraction']:
+        print(('Error: unknown rational arithmetic ' + str(name)))
+        return
+    if name == 'gmpy2' and gmpy2 is None:
+        print('Warning: gmpy2 is not installed; using Fraction instead')
+        name = 'fraction'
+    NUMBERS = name
+    return
+
+def getRationals():
+    return NUMBERS
+
+def hasFlint():
+    return flint is not None
+
+def toRational(x):
+    # Converts a Fraction (or an int) into the current rational type
+    if NUMBERS == 'gmpy2':
+        return gmpy2.mpq(x.numerator, x.denominator)
+    return x
+
+def fromRational(x):
+    # Converts a value of the current rational type back into a Fraction
+    if NUMBERS == 'gmpy2':
+        return Fraction(int(x.numerator), int(x.denominator))
+    return x
+
+def toInteger(x):
+    # Converts an int into the current integer type
+    if NUMBERS == 'gmpy2':
+        return gmpy2.mpz(x)
+    return x
+
+def fromInteger(x):
+    if NUMBERS == 'gmpy2':
+        return int(x)
+    return x
+
+def findLCM(values):
+    # Returns the least common multiple of a list of integers (1 if the list is empty)
+    if NUMBERS == 'gmpy2':
+        return int(reduce(gmpy2.lcm, values, gmpy2.mpz(1)))
+    return reduce(lambda a, b: (a // gcd(a, b)) * b, values, 1)
@@ -34,9 +34,13 @@ def findMedia(model, biomassIndex):
     Exch = sum([Exch[x] for x in range(6) if x != 2], []) # omit irreversible export reactions
     return findMinimalMedia(N, biomassIndex, Exch, rec = False, I = Irr)
 
-def processAll(inputShelf = 'ProcessedNetworks', outputShelf = 'ExtraAnalyses', firstTime = False):
+def processAll(inputShelf = 'ProcessedNetworks', outputShelf = 'ExtraAnalyses', firstTime = False, cacheFile = 'ReductionCache'):
+    # Models with identical internal matrices are only reduced once (see ReductionCache)
+    # and the linear programs are cached while the models are processed (see useCache).
     v = shelve.open(inputShelf)
     u = shelve.open(outputShelf)
+    cache = ReductionCache(cacheFile)
+    previous = useCache()
     if not firstTime:
         for key in sorted(v.keys()):
             if key.endswith('Reduced') and not key.startswith('All'):
@@ -48,7 +52,7 @@ def processAll(inputShelf = 'ProcessedNetworks', outputShelf = 'ExtraAnalyses',
                     print(('Processing the ' + redKey + ' model'))
                     ListNew.append(key)
                     cur = v[key]
-                    cur.reduceNetwork(redKey + 'Reduction.txt')
+                    cur.reduceNetwork(redKey + 'Reduction.txt', cache = cache)
                     v[redKey + 'Reduced'] = cur
 ##                f = open(filenameL, 'r')
 ##                g = [x.strip().split('\t') for x in f.readlines()]
@@ -120,6 +124,8 @@ def processAll(inputShelf = 'ProcessedNetworks', outputShelf = 'ExtraAnalyses',
         u['AllReduced'] = D
     v.close()
     u.close()
+    cache.close()
+    restoreCache(previous)
     return
 
 def findCutsets(inputShelf = 'ProcessedNetworks', outputShelf = 'NewCutsets'):
@@ -203,8 +209,10 @@ def processFinal(inputShelf = 'ProcessedNetworks'):
     u['AllReduced'] = D
     u.close()
 
-def processEnergy(inputShelf = 'ProcessedNetworks', outputShelf = 'FinalReductions'):
+def processEnergy(inputShelf = 'ProcessedNetworks', outputShelf = 'FinalReductions', cacheFile = 'ReductionCache'):
     u = shelve.open(inputShelf)
+    cache = ReductionCache(cacheFile)
+    previous = useCache()
     # v = shelve.open(outputShelf)
     D = u['AllReduced']
     todo = ['CT1', 'MB1', 'PP2', 'RF1', 'SO1', 'SP1', 'VV1']
@@ -218,14 +226,19 @@ def processEnergy(inputShelf = 'ProcessedNetworks', outputShelf = 'FinalReductio
         Irrev = [i for i,r in enumerate(cur.reactionSubsets) if not r.reversible]
         External = cur.findExchangeReactionsReduced()
         # v[key] = fullIterativeReduce(cur.reducedMatrix, Irrev, External, key + 'Reduction.txt')
-        fullIterativeReduce(cur.reducedMatrix, Irrev, External, key + 'Reduction.txt')
+        fullIterativeReduce(cur.reducedMatrix, Irrev, External, key + 'Reduction.txt', cache = cache)
         # energyBalanceReduce(cur.reducedMatrix, Irrev, External, key + 'NewEnergyReduction.txt')
     u.close()
+    cache.close()
+    restoreCache(previous)
     # v.close()
 
-def processDistances(inputShelf = 'ProcessedNetworks', outputShelf = 'DistancesLinear'):
+def processDistances(inputShelf = 'ProcessedNetworks', outputShelf = 'DistancesLinear', cacheFile = 'ReductionCache'):
+    # The distances are stored in the reduction cache as well, under a hash of the input
     u = shelve.open(inputShelf)
     v = shelve.open(outputShelf)
+    cache = ReductionCache(cacheFile)
+    previous = useCache()
     D = u['AllReduced']
     todo = sorted([x for x in list(D.keys()) if x > 'PP1'])
     for key in todo:
@@ -234,9 +247,16 @@ def processDistances(inputShelf = 'ProcessedNetworks', outputShelf = 'DistancesL
         curBio = cur.findBiomassReaction()
         if curBio != -1:
             curIrrev = [] # [i for i,r in enumerate(cur.reactions) if not r.reversible]
-            v[key] = findDistance(cur.Matrix, curBio, curIrrev)
+            cacheKey = getMatrixHash(cur.Matrix, curIrrev, 'findDistance', (curBio,))
+            distance = cache.get(cacheKey)
+            if distance is None:
+                distance = findDistance(cur.Matrix, curBio, curIrrev)
+                cache.put(cacheKey, distance)
+            v[key] = distance
     u.close()
     v.close()
+    cache.close()
+    restoreCache(previous)
 
 def checkCompleted(inputShelf = 'ProcessedNetworks'):
     u = shelve.open(inputShelf)
@@ -0,0 +1,188 @@
+# This file contains a compact sparse representation of stoichiometric matrices for Mongoose,
+# together with functions that delete, flip and lump columns of either this representation or
+# a list of lists, so that the reduction can work on both without making dense copies.
+
+from math import gcd
+from fractions import Fraction
+from Utilities import *
+
+zero = Fraction(0)
+
+class StoichMatrix:
+    # A sparse stoichiometric matrix. The entries of column j are stored as integers that are
+    # to be divided by the denominator dens[j] of the column (negative for a flipped column),
+    # both row by row (CSR: rowStart, rowIndex, rowValues) and column by column (CSC: colStart,
+    # colIndex, colValues). The object is never modified once built, so matrices derived from
+    # it share its arrays whenever possible. It can be indexed like a list of rows (each row
+    # is then created as a list of Fractions), but findSparseRows, findSparseColumns and
+    # getSize in Utilities as well as the functions below use the sparse views directly.
+    def __init__(self, Matrix = None):
+        if Matrix is None:
+            self.build(0, [], [])
+        elif isinstance(Matrix, StoichMatrix):
+            self.__dict__.update(Matrix.__dict__)
+        else:
+            m, n = getSize(Matrix)
+            self.buildFromColumns(m, [[(i, convertToFraction(x)) for (i, x) in col] for col in findSparseColumns(Matrix)])
+    def buildFromColumns(self, m, columns):
+        # Builds the matrix from its columns, lists of (row, Fraction) pairs sorted by row
+        intColumns, dens = [], []
+        for col in columns:
+            den = 1
+            for (i, x) in col:
+                den = den * x.denominator // gcd(den, x.denominator)
+            intColumns.append([(i, x.numerator * (den // x.denominator)) for (i, x) in col if x])
+            dens.append(den)
+        self.build(m, intColumns, dens)
+        return
+    def build(self, m, intColumns, dens):
+        # Builds the matrix from its columns, lists of (row, integer) pairs sorted by row, and
+        # the denominators of the columns; the CSR view is obtained by a counting sort.
+        self.m, self.n = m, len(intColumns)
+        self.dens = dens
+        self.colStart, self.colIndex, self.colValues = [0], [], []
+        counts = [0]*(m + 1)
+        for col in intColumns:
+            for (i, x) in col:
+                self.colIndex.append(i)
+                self.colValues.append(x)
+                counts[i + 1] += 1
+            self.colStart.append(len(self.colIndex))
+        for i in range(m):
+            counts[i + 1] += counts[i]
+        self.rowStart = list(counts)
+        self.rowIndex = [0]*len(self.colIndex)
+        self.rowValues = [0]*len(self.colIndex)
+        for j in range(self.n):
+            for k in range(self.colStart[j], self.colStart[j + 1]):
+                i = self.colIndex[k]
+                self.rowIndex[counts[i]] = j
+                self.rowValues[counts[i]] = self.colValues[k]
+                counts[i] += 1
+        return
+    def getSize(self):
+        return (self.m, self.n)
+    def getNonzeros(self):
+        return len(self.colIndex)
+    def __len__(self):
+        return self.m
+    def __getitem__(self, i):
+        row = [zero]*self.n
+        for k in range(self.rowStart[i], self.rowStart[i + 1]):
+            j = self.rowIndex[k]
+            row[j] = Fraction(self.rowValues[k], self.dens[j])
+        return row
+    def __iter__(self):
+        for i in range(self.m):
+            yield self[i]
+    def getIntColumns(self):
+        # Returns the columns as lists of (row, integer) pairs, without their denominators
+        return [list(zip(self.colIndex[self.colStart[j]:self.colStart[j + 1]], self.colValues[self.colStart[j]:self.colStart[j + 1]])) for j in range(self.n)]
+    def sparseRows(self):
+        # Returns the rows as lists of (column, Fraction) pairs, as findSparseRows does
+        return [[(self.rowIndex[k], Fraction(self.rowValues[k], self.dens[self.rowIndex[k]])) for k in range(self.rowStart[i], self.rowStart[i + 1])] for i in range(self.m)]
+    def sparseColumns(self):
+        # Returns the columns as lists of (row, Fraction) pairs, as findSparseColumns does
+        return [[(self.colIndex[k], Fraction(self.colValues[k], self.dens[j])) for k in range(self.colStart[j], self.colStart[j + 1])] for j in range(self.n)]
+    def toDense(self):
+        return [self[i] for i in range(self.m)]
+    def transpose(self):
+        Matrix = StoichMatrix()
+        Matrix.buildFromColumns(self.n, self.sparseRows())
+        return Matrix
+    def submatrix(self, rows, cols):
+        # Returns the submatrix with the specified rows and columns (in the specified order)
+        position = {i: ind for ind, i in enumerate(rows)}
+        intColumns = []
+        for j in cols:
+            col = [(position[self.colIndex[k]], self.colValues[k]) for k in range(self.colStart[j], self.colStart[j + 1]) if self.colIndex[k] in position]
+            intColumns.append(sorted(col))
+        Matrix = StoichMatrix()
+        Matrix.build(len(rows), intColumns, [self.dens[j] for j in cols])
+        return Matrix
+    def filterColumns(self, removed):
+        removed = set(removed)
+        return self.submatrix(list(range(self.m)), [j for j in range(self.n) if j not in removed])
+    def filterRows(self, removed):
+        removed = set(removed)
+        return self.submatrix([i for i in range(self.m) if i not in removed], list(range(self.n)))
+    def flipColumns(self, cols):
+        # Returns the matrix with the specified columns negated; only the denominators change
+        Matrix = StoichMatrix(self)
+        Matrix.dens = list(self.dens)
+        for j in cols:
+            Matrix.dens[j] = -Matrix.dens[j]
+        return Matrix
+    def lumpColumns(self, groups):
+        # Returns the matrix in which each (key, columns, ratios) group has been replaced by the
+        # single column key + sum(ratio * column), in the position of key; the other columns of
+        # each group are removed. Only the lumped columns are converted into Fractions.
+        columns = self.getIntColumns()
+        dens = list(self.dens)
+        removed = set()
+        for (key, cols, ratios) in groups:
+            total = {}
+            for (j, ratio) in zip([key] + list(cols), [1] + list(ratios)):
+                for (i, x) in columns[j]:
+                    total[i] = total.get(i, zero) + ratio * Fraction(x, self.dens[j])
+            den = 1
+            for x in total.values():
+                den = den * x.denominator // gcd(den, x.denominator)
+            columns[key] = [(i, total[i].numerator * (den // total[i].denominator)) for i in sorted(total) if total[i]]
+            dens[key] = den
+            removed.update(cols)
+        kept = [j for j in range(self.n) if j not in removed]
+        Matrix = StoichMatrix()
+        Matrix.build(self.m, [columns[j] for j in kept], [dens[j] for j in kept])
+        return Matrix
+
+def isCompact(Matrix):
+    return isinstance(Matrix, StoichMatrix)
+
+# The functions below accept either a StoichMatrix or a list of lists and return the same type.
+
+def removeColumns(Matrix, removed):
+    # This function removes the columns of a matrix indexed by a given list.
+    if isCompact(Matrix):
+        return Matrix.filterColumns(removed)
+    return [filterOut(row, removed) for row in Matrix]
+
+def selectSubmatrix(Matrix, rows, cols = None):
+    # This function returns the submatrix of a matrix with the given rows and columns (default: all).
+    if cols is None:
+        cols = list(range(getSize(Matrix)[1]))
+    if isCompact(Matrix):
+        return Matrix.submatrix(rows, cols)
+    return [[Matrix[x][y] for y in cols] for x in rows]
+
+def flipColumns(Matrix, cols):
+    # This function returns a copy of a matrix in which the given columns are negated.
+    if isCompact(Matrix):
+        return Matrix.flipColumns(cols)
+    m, n = getSize(Matrix)
+    newN = [[Matrix[x][y] for y in range(n)] for x in range(m)]
+    for x in range(m):
+        for y in cols:
+            newN[x][y] = -newN[x][y]
+    return newN
+
+def lumpColumns(Matrix, groups):
+    # This function replaces each group (key, columns, ratios) of columns of a matrix by the
+    # single column key + sum(ratio * column) and removes the other columns of the group.
+    if isCompact(Matrix):
+        return Matrix.lumpColumns(groups)
+    m, n = getSize(Matrix)
+    newN = [[Matrix[x][y] for y in range(n)] for x in range(m)]
+    removed = []
+    for (key, cols, ratios) in groups:
+        removed += list(cols)
+        for num, col in enumerate(cols):
+            for x in range(m):
+                newN[x][key] += (ratios[num] * newN[x][col])
+    return [filterOut(newN[x], removed) for x in range(m)]
+
+def toDenseMatrix(Matrix):
+    # This function returns a matrix as a list of lists
+    if isCompact(Matrix):
+        return Matrix.toDense()
+    return Matrix
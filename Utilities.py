@@ -390,6 +390,9 @@ def filterOut(List, removedItems):
 
 def getSize(Matrix):
     # This function returns the size of a matrix (number of rows, number of columns).
+    # It also accepts any matrix object with a getSize method, such as a StoichMatrix.
+    if hasattr(Matrix, 'getSize'):
+        return Matrix.getSize()
     m = len(Matrix)
     if m > 0:
         n = len(Matrix[0])
@@ -397,6 +400,26 @@ def getSize(Matrix):
         n = 0
     return (m, n)
 
+def findSparseRows(Matrix):
+    # This function returns, for each row of a matrix, the list of (column, value) of its nonzero entries.
+    if hasattr(Matrix, 'sparseRows'):
+        return Matrix.sparseRows()
+    return [[(j, x) for j, x in enumerate(row) if x] for row in Matrix]
+
+def findSparseColumns(Matrix, rows = None):
+    # This function returns, for each column of a matrix, the list of (row, value) of its nonzero entries.
+    # If the sparse rows have already been computed (see above), they can be given to avoid a dense pass.
+    if hasattr(Matrix, 'sparseColumns'):
+        return Matrix.sparseColumns()
+    m, n = getSize(Matrix)
+    if rows is None:
+        rows = findSparseRows(Matrix)
+    cols = [[] for j in range(n)]
+    for i, row in enumerate(rows):
+        for (j, x) in row:
+            cols[j].append((i, x))
+    return cols
+
 def myAdd(dictionary, key, value):
     # This function adds a value to the list corresponding to the key in a dictionary.
     if key in dictionary:
@@ -421,6 +444,32 @@ def groupIdentical(List):
     groups = [[F[x][1] for x in range(breaks[i], breaks[i+1])] for i in range(len(breaks)-1)]
     return groups
 
+def canonicalMultiple(vector):
+    # This function returns a canonical form of a sparse vector (a list of (index, value) pairs)
+    # that is the same for all of its nonzero multiples: the integer vector obtained by scaling
+    # it by the common denominator, dividing by the gcd and making the first entry positive.
+    values = [convertToFraction(x) for (j, x) in vector]
+    den = reduce(lambda a, b: (a // gcd(a, b)) * b, [x.denominator for x in values], 1)
+    ints = [x.numerator * (den // x.denominator) for x in values]
+    g = reduce(gcd, ints, 0)
+    if ints and ints[0] < 0:
+        g = -g
+    return tuple([(vector[k][0], ints[k] // g) for k in range(len(ints))])
+
+def groupProportional(vectors, multiples = True):
+    # This function returns a list of lists of indices of sparse vectors (lists of (index, value)
+    # pairs) that are identical, or nonzero multiples of each other if multiples is True. Unlike
+    # groupIdentical, it makes a single pass through a dictionary keyed by a canonical form of
+    # the vectors, and the groups appear in the order of their smallest index.
+    groups = {}
+    for ind, vector in enumerate(vectors):
+        if multiples:
+            key = canonicalMultiple(vector)
+        else:
+            key = tuple([(j, convertToFraction(x)) for (j, x) in vector])
+        myAdd(groups, key, ind)
+    return list(groups.values())
+
 def compareMatrices(Mat1, Mat2, tol = 1e-10):
     # This function returns a list of differences between two matrices exceeding a tolerance.
     m,n = getSize(Mat1)
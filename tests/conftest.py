@@ -0,0 +1,4 @@
+# The modules of Mongoose are not a package; make them importable from the tests.
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,156 @@
+# Tests of the processing of a matrix by connected components (see findComponents) against
+# the processing of the whole matrix, with a small exact linear programming back-end
+
+import random, unittest
+from fractions import Fraction
+from LPSolvers import setSolver, setCache, MAXIMIZE, EQUAL, LESS, GREATER
+from ModelProcessing import findComponents, findByComponents, findTBlocked, findUnidirectional, findEssentialLethal
+from ModelProcessing import NullspaceBasis, NullspaceByComponents, GaussJordan, transpose
+
+zero = Fraction(0)
+
+def simplex(A, b, c):
+    # Maximizes c.x subject to A x = b, x >= 0 (with b >= 0) by the two-phase simplex method with
+    # Bland's rule, in exact arithmetic; returns the optimal x, [] if infeasible, None if unbounded
+    m, n = len(A), len(c)
+    T = [list(A[i]) + [Fraction(int(k == i)) for k in range(m)] + [b[i]] for i in range(m)]
+    basis = [n + i for i in range(m)]
+    def pivot(r, col):
+        T[r] = [x / T[r][col] for x in T[r]]
+        for i in range(m):
+            if i != r and T[i][col]:
+                f = T[i][col]
+                T[i] = [x - f * y for (x, y) in zip(T[i], T[r])]
+        basis[r] = col
+    def run(cost, allowed):
+        while True:
+            enter = [j for j in allowed if j not in basis and cost[j] > sum([cost[basis[i]] * T[i][j] for i in range(m)])]
+            if not enter:
+                return True
+            ratios = [(T[i][-1] / T[i][enter[0]], basis[i], i) for i in range(m) if T[i][enter[0]] > 0]
+            if not ratios:
+                return False
+            pivot(min(ratios)[2], enter[0])
+    run([zero]*n + [Fraction(-1)]*m, list(range(n + m)))
+    if any([T[i][-1] for i in range(m) if basis[i] >= n]):
+        return []
+    for i in range(m):
+        if basis[i] >= n:
+            for j in range(n):
+                if T[i][j]:
+                    pivot(i, j)
+                    break
+    if not run(list(c) + [zero]*m, list(range(n))):
+        return None
+    x = [zero]*n
+    for i in range(m):
+        if basis[i] < n:
+            x[basis[i]] = T[i][-1]
+    return x
+
+class ExactBackend:
+    # A back-end for the small problems of these tests: each variable is replaced by its lower
+    # bound plus a nonnegative one, by its upper bound minus one, or by a difference of two
+    def solve(self, problem, opt = False, skip = ()):
+        columns, parts, rows = 0, {}, []
+        for var in problem.getVariables():
+            (lower, upper) = [(None if x is None else Fraction(x)) for x in problem.getBounds(var)]
+            if lower is not None:
+                parts[var] = (lower, [(columns, 1)])
+                if upper is not None:
+                    rows.append(({columns: Fraction(1)}, LESS, upper - lower))
+                columns += 1
+            elif upper is not None:
+                parts[var] = (upper, [(columns, -1)])
+                columns += 1
+            else:
+                parts[var] = (zero, [(columns, 1), (columns + 1, -1)])
+                columns += 2
+        for (terms, sense, rhs) in problem.constraints:
+            row, value = {}, Fraction(rhs)
+            for (var, coeff) in terms:
+                (offset, cols) = parts[var]
+                value -= Fraction(coeff) * offset
+                for (k, s) in cols:
+                    row[k] = row.get(k, zero) + s * Fraction(coeff)
+            rows.append((row, sense, value))
+        slacks = [k for k in range(len(rows)) if rows[k][1] != EQUAL]
+        A, b = [], []
+        for (i, (row, sense, value)) in enumerate(rows):
+            a = [row.get(k, zero) for k in range(columns)] + [zero]*len(slacks)
+            if sense != EQUAL:
+                a[columns + slacks.index(i)] = Fraction(1 if sense == LESS else -1)
+            if value < 0:
+                (a, value) = ([-x for x in a], -value)
+            A.append(a)
+            b.append(value)
+        sign = 1 if problem.sense == MAXIMIZE else -1
+        c, constant = [zero]*(columns + len(slacks)), zero
+        for (var, coeff) in problem.objective:
+            (offset, cols) = parts[var]
+            constant += Fraction(coeff) * offset
+            for (k, s) in cols:
+                c[k] += sign * s * Fraction(coeff)
+        x = simplex(A, b, c)
+        if x is None:
+            (value, dico) = ([float('Inf')], {})
+        elif x == []:
+            (value, dico) = ([], {})
+        else:
+            value = sign * sum([c[k] * x[k] for k in range(len(c))], zero) + constant
+            dico = {}
+            for (var, (offset, cols)) in parts.items():
+                if not (skip and var.startswith(tuple(skip))):
+                    entry = offset + sum([s * x[k] for (k, s) in cols], zero)
+                    if entry:
+                        dico[var] = entry
+        return (value, dico) if opt else value
+
+def makeComponentMatrix(generator, sizes):
+    # Returns a random matrix made of blocks of the given sizes, with its rows and columns shuffled
+    # so that the components are interleaved, and a random list of irreversible reactions
+    m, n = sum([x[0] for x in sizes]), sum([x[1] for x in sizes])
+    rowOrder, colOrder = list(range(m)), list(range(n))
+    generator.shuffle(rowOrder)
+    generator.shuffle(colOrder)
+    N = [[zero]*n for i in range(m)]
+    (top, left) = (0, 0)
+    for (rows, cols) in sizes:
+        for i in range(top, top + rows):
+            for j in range(left, left + cols):
+                if generator.random() < 0.5:
+                    N[rowOrder[i]][colOrder[j]] = Fraction(generator.choice([1, -1, 2, -2, 1]))
+        (top, left) = (top + rows, left + cols)
+    Irrev = sorted(generator.sample(range(n), n // 2))
+    return (N, Irrev)
+
+class TestComponents(unittest.TestCase):
+    def setUp(self):
+        setSolver(ExactBackend())
+        setCache(0)
+        generator = random.Random(11)
+        self.networks = [makeComponentMatrix(generator, sizes) for sizes in [[(2, 3), (2, 3)], [(3, 5), (2, 4), (1, 2)], [(3, 4), (3, 5), (2, 3)]]]
+    def tearDown(self):
+        setSolver(None)
+        setCache(0)
+    def testSeveralComponents(self):
+        for (N, Irrev) in self.networks:
+            self.assertGreater(len(findComponents(N)), 1)
+    def testTBlocked(self):
+        for (N, Irrev) in self.networks:
+            self.assertEqual(findByComponents(findTBlocked, N, Irrev), findTBlocked(N, Irrev))
+    def testUnidirectional(self):
+        for (N, Irrev) in self.networks:
+            self.assertEqual(findUnidirectional(N, Irrev), findUnidirectional(N, Irrev, split = False))
+    def testNullspace(self):
+        # the bases differ, but they span the same space
+        for (N, Irrev) in self.networks:
+            (B, C) = (NullspaceBasis(N), NullspaceByComponents(N))
+            self.assertEqual(GaussJordan(transpose(C))[0], GaussJordan(transpose(B))[0])
+    def testEssentialLethal(self):
+        for (N, Irrev) in self.networks:
+            for Target in Irrev[:2]:
+                self.assertEqual(findEssentialLethal(N, Target, rec = False, I = Irrev), findEssentialLethal(N, Target, rec = False, I = Irrev, split = False))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# Tests of pruneDeadEnds (see ModelProcessing) against the graph-based fullReduce
+
+import random, unittest
+from fractions import Fraction
+from Utilities import getSize
+from ModelProcessing import pruneDeadEnds, processDeadEnds, fullReduce, matrixToGraph
+
+def makeMatrix(rows):
+    return [[Fraction(x) for x in row] for row in rows]
+
+def makeRandomMatrix(generator, m, n, density):
+    values = [1, -1, 2, -2, Fraction(1, 2)]
+    return [[(generator.choice(values) if generator.random() < density else Fraction(0)) for j in range(n)] for i in range(m)]
+
+def findGraphResults(Matrix, dmin):
+    # Returns the rows and columns deleted by fullReduce, including those without nonzero entries
+    m, n = getSize(Matrix)
+    (D, Causes) = fullReduce(matrixToGraph(Matrix), dmin, 'R', True)
+    badRows = [i for i in range(m) if ('R' + str(i)) not in D]
+    badCols = [j for j in range(n) if ('C' + str(j)) not in D]
+    return (badRows, badCols)
+
+class TestDeadEnds(unittest.TestCase):
+    def setUp(self):
+        generator = random.Random(5)
+        self.matrices = [makeRandomMatrix(generator, m, n, density) for (m, n) in [(4, 6), (8, 10), (12, 9), (15, 20), (20, 30)] for density in [0.1, 0.2, 0.35]]
+        self.matrices += [makeMatrix([[0, 0, 0], [1, -1, 0], [0, 1, -1], [0, 0, 0]])]              # empty rows
+        self.matrices += [makeMatrix([[1, 0, -1, 0], [-1, 0, 1, 0]])]                              # empty columns
+        self.matrices += [makeMatrix([[1, -1, 0, 0], [0, 1, -1, 0], [0, 0, 1, -1], [0, 0, 0, 1]])]   # chain ending in a dead end
+        self.matrices += [makeMatrix([[1, -1, 0], [0, 1, -1], [-1, 0, 1]])]                        # cycle
+        self.matrices += [makeMatrix([[0, 0], [0, 0]]), []]                                       # no nonzero entries
+    def testMatchesFullReduce(self):
+        for Matrix in self.matrices:
+            (badRows, badCols, Causes) = pruneDeadEnds(Matrix, 1, False)
+            self.assertEqual((badRows, badCols), findGraphResults(Matrix, 1))
+            self.assertIsNone(Causes)
+    def testCausesAreIncidentDeletedNodes(self):
+        for Matrix in self.matrices:
+            (badRows, badCols, Causes) = pruneDeadEnds(Matrix, 1, True)
+            for (node, cause) in Causes.items():
+                i, j = (node, cause) if node.startswith('R') else (cause, node)
+                self.assertIn(int(i[1:]), badRows)
+                self.assertIn(int(j[1:]), badCols)
+                self.assertTrue(Matrix[int(i[1:])][int(j[1:])])
+    def testProcessDeadEnds(self):
+        Matrix = self.matrices[-4]
+        (badRows, badCols, reducedMatrix) = processDeadEnds(Matrix, False)
+        self.assertEqual((badRows, badCols), ([0, 1, 2, 3], [0, 1, 2, 3]))
+        self.assertEqual(reducedMatrix, [])
+        Matrix = self.matrices[-3]
+        (badRows, badCols, reducedMatrix) = processDeadEnds(Matrix, False)
+        self.assertEqual((badRows, badCols), ([], []))
+        self.assertEqual(reducedMatrix, Matrix)
+
+if __name__ == '__main__':
+    unittest.main()
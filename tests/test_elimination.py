@@ -0,0 +1,138 @@
+# Tests of the exact elimination back-ends (see ExactElimination) and of StoichMatrix (see
+# SparseMatrix) against the original dense Gauss-Jordan elimination and list-based functions
+
+import io, random, unittest
+from contextlib import redirect_stdout
+from fractions import Fraction
+from Utilities import getSize, findSparseRows
+from ExactElimination import setElimination, denseGaussJordan
+from ModelProcessing import GaussJordan, NullspaceBasis, findRedundant, transpose
+from SparseMatrix import StoichMatrix, selectSubmatrix, removeColumns, flipColumns, lumpColumns, toDenseMatrix
+
+METHODS = ['sparse', 'bareiss', 'modular', 'auto']
+
+def makeMatrix(rows):
+    return [[Fraction(x) for x in row] for row in rows]
+
+def makeRandomMatrix(generator, m, n, density = 0.4):
+    # A sparse random matrix with small integer and fractional entries, as in stoichiometries
+    values = [1, -1, 2, -2, 3, Fraction(1, 2), Fraction(-3, 4)]
+    return [[(generator.choice(values) if generator.random() < density else Fraction(0)) for j in range(n)] for i in range(m)]
+
+def findDenseResults(N):
+    setElimination('dense')
+    results = (GaussJordan(N), NullspaceBasis(N), findRedundant(N), GaussJordan(N, Gauss = True)[1])
+    setElimination('auto')
+    return results
+
+def multiply(N, Basis):
+    # Returns the product of N with the matrix whose rows are the entries of the basis vectors
+    m, n = getSize(N)
+    k = len(Basis[0]) if Basis else 0
+    return [[sum([N[i][j] * Basis[j][l] for j in range(n)], Fraction(0)) for l in range(k)] for i in range(m)]
+
+class TestElimination(unittest.TestCase):
+    def setUp(self):
+        generator = random.Random(17)
+        self.matrices = [makeRandomMatrix(generator, m, n) for (m, n) in [(3, 5), (5, 8), (6, 6), (8, 5), (10, 14)]]
+        self.matrices += [makeMatrix([[0, 0, 0], [1, -1, 0], [0, 0, 0], [0, 1, -1]])]    # zero rows
+        self.matrices += [makeMatrix([[0, 0, 0, 0], [0, 0, 0, 0]])]                      # zero matrix
+        self.matrices += [makeMatrix([[2, 1, 0], [0, 1, -1], [1, 0, 3]])]                # full rank, square
+        self.matrices += [makeMatrix([[1, 0, 2, -1], [0, 3, 0, 1]])]                     # full row rank
+        self.matrices += [makeMatrix([[1, -2, 0, Fraction(1, 3), 5]])]                   # 1 x n
+        self.matrices += [makeMatrix([[1], [2], [-1]])]                                  # m x 1
+        self.matrices += [makeMatrix([[1, 2, 3], [2, 4, 6], [-1, -2, -3]])]              # rank 1
+    def tearDown(self):
+        setElimination('auto')
+    def testMatchesDenseElimination(self):
+        for N in self.matrices:
+            (reduced, Basis, active, R) = findDenseResults(N)
+            for method in METHODS:
+                setElimination(method)
+                self.assertEqual(GaussJordan(N), reduced, (method, N))
+                self.assertEqual(GaussJordan(N, Gauss = True)[1], R, (method, N))
+                self.assertEqual(NullspaceBasis(N), Basis, (method, N))
+                self.assertEqual(findRedundant(N), active, (method, N))
+    def testDenseGaussJordanIsUnchanged(self):
+        setElimination('dense')
+        for N in self.matrices:
+            self.assertEqual(GaussJordan(N), denseGaussJordan(N))
+    def testRowEchelonFormIsDense(self):
+        for N in self.matrices:
+            for method in METHODS:
+                setElimination(method)
+                self.assertEqual(GaussJordan(N, Gauss = True), denseGaussJordan(N, Gauss = True), (method, N))
+    def testPivotingWarning(self):
+        N = self.matrices[0]
+        for method in METHODS + ['dense']:
+            setElimination(method)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                result = GaussJordan(N, pivoting = False)
+            self.assertEqual('Warning' in output.getvalue(), method != 'dense', method)
+            if method != 'dense':
+                self.assertEqual(result, GaussJordan(N), method)
+    def testNullspaceBasis(self):
+        for N in self.matrices:
+            m, n = getSize(N)
+            for method in METHODS:
+                setElimination(method)
+                Basis = NullspaceBasis(N)
+                rank = len(GaussJordan(N)[1])
+                self.assertEqual(len(Basis[0]) if Basis else 0, n - rank)
+                self.assertTrue(all(x == 0 for row in multiply(N, Basis) for x in row))
+    def testModularWorkers(self):
+        N = self.matrices[4]
+        (reduced, Basis, active, R) = findDenseResults(N)
+        setElimination('modular', workers = 2)
+        self.assertEqual(NullspaceBasis(N), Basis)
+        self.assertEqual(GaussJordan(N), reduced)
+    def testStoichMatrix(self):
+        for N in self.matrices:
+            (reduced, Basis, active, R) = findDenseResults(N)
+            Compact = StoichMatrix(N)
+            for method in METHODS:
+                setElimination(method)
+                self.assertEqual(GaussJordan(Compact), reduced, method)
+                self.assertEqual(NullspaceBasis(Compact), Basis, method)
+                self.assertEqual(findRedundant(Compact), active, method)
+
+class TestStoichMatrix(unittest.TestCase):
+    def setUp(self):
+        generator = random.Random(5)
+        self.matrices = [makeRandomMatrix(generator, m, n) for (m, n) in [(4, 6), (7, 5), (1, 4)]]
+        self.matrices += [makeMatrix([[0, 0, 0], [1, Fraction(-1, 2), 0], [0, 2, Fraction(1, 3)]])]
+    def testRoundTrip(self):
+        for N in self.matrices:
+            Compact = StoichMatrix(N)
+            self.assertEqual(getSize(Compact), getSize(N))
+            self.assertEqual(Compact.toDense(), N)
+            self.assertEqual(toDenseMatrix(StoichMatrix(Compact)), N)
+            self.assertEqual(findSparseRows(Compact), findSparseRows(N))
+            self.assertEqual(Compact.getNonzeros(), sum([len(row) for row in findSparseRows(N)]))
+    def testTranspose(self):
+        for N in self.matrices:
+            self.assertEqual(transpose(StoichMatrix(N)).toDense(), transpose(N))
+            self.assertEqual(transpose(transpose(StoichMatrix(N))).toDense(), N)
+    def testSubmatrix(self):
+        for N in self.matrices:
+            m, n = getSize(N)
+            rows, cols = list(range(m - 1, -1, -2)), list(range(0, n, 2))
+            self.assertEqual(selectSubmatrix(StoichMatrix(N), rows, cols).toDense(), selectSubmatrix(N, rows, cols))
+            self.assertEqual(removeColumns(StoichMatrix(N), [1, 2]).toDense(), removeColumns(N, [1, 2]))
+            self.assertEqual(StoichMatrix(N).filterRows([0]).toDense(), N[1:])
+    def testFlipColumns(self):
+        for N in self.matrices:
+            Flipped = flipColumns(StoichMatrix(N), [0, 2])
+            self.assertEqual(Flipped.toDense(), flipColumns(N, [0, 2]))
+            self.assertEqual(flipColumns(Flipped, [0, 2]).toDense(), N)
+            self.assertEqual(transpose(Flipped).toDense(), transpose(flipColumns(N, [0, 2])))
+    def testLumpColumns(self):
+        for N in self.matrices:
+            groups = [(0, [1, getSize(N)[1] - 1], [Fraction(1, 2), -2])]
+            self.assertEqual(lumpColumns(StoichMatrix(N), groups).toDense(), lumpColumns(N, groups))
+            Flipped = flipColumns(StoichMatrix(N), [1])
+            self.assertEqual(lumpColumns(Flipped, groups).toDense(), lumpColumns(flipColumns(N, [1]), groups))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# Tests of the exact certification of floating-point optima by HybridBackend (see LPSolvers)
+
+import unittest
+from fractions import Fraction
+import LPSolvers
+from LPSolvers import HybridBackend, LinearProblem, linprog, MAXIMIZE, MINIMIZE, EQUAL, LESS, GREATER
+
+class RecordingBackend:
+    # An exact back-end that records the problems handed to it and returns a fixed result
+    def __init__(self, result):
+        self.result = result
+        self.problems = []
+    def solve(self, problem, opt = False, skip = ()):
+        self.problems.append(problem)
+        return self.result
+
+def makeProblem():
+    # max x + 2y s.t. x + y <= 3, x - y >= -1, x/3 + z = 1/3; the optimum is 5, at x = 1, y = 2
+    p = LinearProblem('certified', MAXIMIZE)
+    p.setObjective([('x', 1), ('y', 2)])
+    p.addConstraint([('x', 1), ('y', 1)], LESS, 3)
+    p.addConstraint([('x', 1), ('y', -1)], GREATER, -1)
+    p.addConstraint([('x', Fraction(1, 3)), ('z', 1)], EQUAL, Fraction(1, 3))
+    return p
+
+@unittest.skipIf(linprog is None, 'scipy is not installed')
+class TestHybridBackend(unittest.TestCase):
+    def setUp(self):
+        self.original = LPSolvers.linprog
+    def tearDown(self):
+        LPSolvers.linprog = self.original
+    def testCertifiesOptimum(self):
+        exact = RecordingBackend(None)
+        backend = HybridBackend(exact)
+        (value, dico) = backend.solve(makeProblem(), True)
+        self.assertEqual(value, 5)
+        self.assertIsInstance(value, Fraction)
+        self.assertEqual(dico, {'x': 1, 'y': 2})
+        self.assertEqual(backend.solve(makeProblem(), False, ('y',)), 5)
+        self.assertEqual(backend.solve(makeProblem(), True, ('y',))[1], {'x': 1})
+        self.assertEqual((backend.certified, backend.fallbacks), (3, 0))
+        self.assertEqual(exact.problems, [])
+    def testCertifiesFeasibility(self):
+        p = LinearProblem('feasible', MINIMIZE)
+        p.addConstraint([('x', 1), ('y', -1)], EQUAL, 0)
+        p.addConstraint([('x', 1)], GREATER, Fraction(1, 2))
+        (value, dico) = HybridBackend(RecordingBackend(None)).solve(p, True)
+        self.assertEqual(value, 0)
+        self.assertEqual(dico['x'], dico['y'])
+        self.assertGreaterEqual(dico['x'], Fraction(1, 2))
+    def testFallsBackOnInfeasible(self):
+        p = LinearProblem('infeasible', MAXIMIZE)
+        p.setObjective([('x', 1)])
+        p.addConstraint([('x', 1)], LESS, -1)
+        exact = RecordingBackend([])
+        backend = HybridBackend(exact)
+        self.assertEqual(backend.solve(p), [])
+        self.assertEqual(exact.problems, [p])
+        self.assertEqual((backend.certified, backend.fallbacks), (0, 1))
+    def testFallsBackOnUnbounded(self):
+        p = LinearProblem('unbounded', MAXIMIZE)
+        p.setObjective([('x', 1)])
+        p.addConstraint([('x', 1), ('y', -1)], LESS, 1)
+        exact = RecordingBackend([float('Inf')])
+        backend = HybridBackend(exact)
+        self.assertEqual(backend.solve(p), [float('Inf')])
+        self.assertEqual(exact.problems, [p])
+        self.assertEqual(backend.fallbacks, 1)
+    def testRejectsWrongDual(self):
+        def perturbed(*args, **kwargs):
+            res = self.original(*args, **kwargs)
+            res.ineqlin.marginals = res.ineqlin.marginals * 2
+            return res
+        LPSolvers.linprog = perturbed
+        exact = RecordingBackend(Fraction(5))
+        backend = HybridBackend(exact)
+        self.assertEqual(backend.solve(makeProblem()), 5)
+        self.assertEqual(len(exact.problems), 1)
+        self.assertEqual((backend.certified, backend.fallbacks), (0, 1))
+    def testRejectsInexactPrimal(self):
+        # a denominator beyond maxDenominator cannot be recovered from the floating-point solution
+        p = LinearProblem('inexact', MAXIMIZE)
+        p.setObjective([('x', 1)])
+        p.addConstraint([('x', 10**7)], LESS, 1)
+        exact = RecordingBackend(Fraction(1, 10**7))
+        backend = HybridBackend(exact, maxDenominator = 1000)
+        self.assertEqual(backend.solve(p), Fraction(1, 10**7))
+        self.assertEqual(backend.fallbacks, 1)
+
+if __name__ == '__main__':
+    unittest.main()
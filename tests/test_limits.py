@@ -0,0 +1,83 @@
+# Tests of the handling of solver limits by the reduction (see SolverLimit in LPSolvers)
+
+import io, os, shelve, tempfile, unittest
+from contextlib import redirect_stdout
+from fractions import Fraction
+from LPSolvers import TIMEOUT, setSolver, setCache
+from Utilities import getSize
+from ModelProcessing import findTBlocked, processTBlocked, processEBlocked, findUnidirectional, processUnidirectional, setSupportMethod, ReductionMemo
+from ModelProcessing import reduceMatrix, Checkpoint, getMatrixHash
+import ModelProcessing
+
+class TimeoutBackend:
+    # A back-end for which every linear program is stopped by the time limit
+    def __init__(self):
+        self.calls = 0
+    def solve(self, problem, opt = False, skip = ()):
+        self.calls += 1
+        return (TIMEOUT, {}) if opt else TIMEOUT
+
+class TestSolverLimits(unittest.TestCase):
+    def setUp(self):
+        self.backend = TimeoutBackend()
+        setSolver(self.backend)
+        setCache(0)
+        self.N = [[Fraction(x) for x in row] for row in [[1, -1, 0], [0, 1, -1]]]
+    def tearDown(self):
+        setSolver(None)
+        setCache(0)
+        setSupportMethod('iterative')
+    def testFindTBlockedReportsUndecided(self):
+        self.assertEqual(findTBlocked(self.N, [0, 1, 2]), ([], [0, 1, 2]))
+        self.assertEqual(self.backend.calls, 1)
+    def testSingleSupportReportsUndecided(self):
+        setSupportMethod('single')
+        self.assertEqual(findTBlocked(self.N, [0, 1, 2]), ([], [0, 1, 2]))
+        (TBlocked, newN) = processTBlocked(self.N, [True, True, True])
+        self.assertEqual(TBlocked, [])
+    def testProcessTBlockedKeepsUndecided(self):
+        (TBlocked, newN) = processTBlocked(self.N, [True, True, True])
+        self.assertEqual(TBlocked, [])
+        self.assertEqual(getSize(newN), (2, 3))
+    def testProcessEBlockedKeepsUndecided(self):
+        (EBlocked, newN) = processEBlocked(self.N, [True, True, True])
+        self.assertEqual(EBlocked, [])
+    def testLimitedResultsAreNotMemoized(self):
+        memo = ReductionMemo()
+        processTBlocked(self.N, [True, True, True], memo = memo)
+        self.assertEqual(memo.current, {})
+    def testFindUnidirectionalReportsUndecided(self):
+        self.assertEqual(findUnidirectional(self.N, []), ([], [], [0, 1, 2]))
+    def testProcessUnidirectionalKeepsUndecided(self):
+        (onlyPos, onlyNeg, newN) = processUnidirectional(self.N, [False, False, False])
+        self.assertEqual((onlyPos, onlyNeg), ([], []))
+    def testLimitedUnidirectionalResultsAreNotMemoized(self):
+        memo = ReductionMemo()
+        processUnidirectional(self.N, [False, False, False], memo = memo)
+        self.assertEqual(memo.current, {})
+    def testLimitedSignsAreNotCheckpointed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            progress = Checkpoint(os.path.join(directory, 'progress'), 'test')
+            try:
+                findUnidirectional(self.N, [], progress = progress)
+                self.assertIsNone(progress.get('findUnidirectional' + getMatrixHash(self.N, [], 'null')))
+            finally:
+                progress.close()
+    def testCompleteReductionClearsCheckpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            Filename = os.path.join(directory, 'checkpoint')
+            with redirect_stdout(io.StringIO()):
+                reduceMatrix(self.N, [0, 1, 2], os.path.join(directory, 'Reduction.txt'), checkpoint = Filename)
+            with shelve.open(Filename) as shelf:
+                self.assertNotIn('stage', shelf)
+    def testCutSetIsUnknown(self):
+        self.assertIsNone(ModelProcessing.testCutSet([1], self.N, 2))
+    def testSubsetsReportsUnknown(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            Subsets = ModelProcessing.testSubsets(self.N, 2, fluxes = [{'V0': 1, 'V1': 1, 'V2': 1}], Kmax = 2)
+        self.assertEqual(Subsets, [[], []])
+        self.assertIn('Warning: whether [[0], [1], [0, 1]] are cutsets could not be determined', output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
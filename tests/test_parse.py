@@ -0,0 +1,67 @@
+# Tests of the parsing of QSopt_ex solution files (see parseOutput and parseNumber in LPSolvers)
+
+import os, shutil, tempfile, unittest
+from fractions import Fraction
+from Utilities import convertToFraction
+from LPSolvers import parseOutput, parseNumber
+
+OPTIMAL = """status = OPTIMAL
+	Value:
+obj = -7/3
+	Variables:
+R1 = 1/2
+R10 = -3
+Rx_5 = 12/8
+V1 = 4
+end
+"""
+
+class TestParse(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    def write(self, text):
+        Filename = os.path.join(self.directory, 'problem.sol')
+        with open(Filename, 'w') as f:
+            f.write(text)
+        return Filename
+    def testParseNumber(self):
+        for string in ['0', '7', '-7', '1/2', '-3/4', '12/8', '123456789012345678901234567890/7']:
+            self.assertEqual(parseNumber(string), convertToFraction(string))
+            self.assertIsInstance(parseNumber(string), Fraction)
+        self.assertEqual(parseNumber('-12/8'), Fraction(-3, 2))
+        self.assertEqual(parseNumber('2.5'), Fraction(5, 2))
+    def testOptimal(self):
+        Filename = self.write(OPTIMAL)
+        self.assertEqual(parseOutput(Filename), Fraction(-7, 3))
+        (value, dico) = parseOutput(Filename, True)
+        self.assertEqual(value, Fraction(-7, 3))
+        self.assertEqual(dico, {'R1': Fraction(1, 2), 'R10': -3, 'Rx_5': Fraction(3, 2), 'V1': 4})
+    def testSkip(self):
+        Filename = self.write(OPTIMAL)
+        self.assertEqual(parseOutput(Filename, True, skip = ('R1',))[1], {'Rx_5': Fraction(3, 2), 'V1': 4})
+        self.assertEqual(parseOutput(Filename, True, skip = ['R', 'V'])[1], {})
+        self.assertEqual(parseOutput(Filename, True, skip = ('V',))[1], {'R1': Fraction(1, 2), 'R10': -3, 'Rx_5': Fraction(3, 2)})
+    def testEndOfFile(self):
+        # the file may end right after the values, with or without a final newline
+        for text in [OPTIMAL[:OPTIMAL.index('end')], OPTIMAL[:OPTIMAL.index('end') - 1]]:
+            (value, dico) = parseOutput(self.write(text), True)
+            self.assertEqual(dico['V1'], 4)
+            self.assertEqual(len(dico), 4)
+        (value, dico) = parseOutput(self.write(OPTIMAL[:OPTIMAL.index('R1')]), True)
+        self.assertEqual((value, dico), (Fraction(-7, 3), {}))
+    def testInfeasible(self):
+        Filename = self.write('status = INFEASIBLE\n')
+        self.assertEqual(parseOutput(Filename), [])
+        self.assertEqual(parseOutput(Filename, True), ([], {}))
+    def testUnbounded(self):
+        Filename = self.write('status = UNBOUNDED\n')
+        self.assertEqual(parseOutput(Filename), [float('Inf')])
+        self.assertEqual(parseOutput(Filename, True), ([float('Inf')], {}))
+    def testNotSolved(self):
+        self.assertIsNone(parseOutput(self.write('status = UNSOLVED\n')))
+        self.assertIsNone(parseOutput(self.write(''), True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# Tests of the use of the result cache by SolverPool (see LPCache in LPSolvers)
+
+import unittest
+from fractions import Fraction
+from LPSolvers import SolverPool, setSolver, setCache, getCacheStats, useCache, restoreCache, solveProblem
+from ModelProcessing import FeasibilityTemplate
+
+class ConstantBackend:
+    # A back-end for which every linear program is feasible, with the zero vector
+    def solve(self, problem, opt = False, skip = ()):
+        return (Fraction(0), {}) if opt else Fraction(0)
+
+class TestPoolCache(unittest.TestCase):
+    def setUp(self):
+        setSolver(ConstantBackend())
+        setCache(16)
+        N = [[Fraction(x) for x in row] for row in [[1, -1, 0], [0, 1, -1]]]
+        self.template = FeasibilityTemplate(N, [0, 1, 2], 'row')
+        self.queries = [{'special': 0}, {'special': 1, 'pos': False}]
+    def tearDown(self):
+        setSolver(None)
+        setCache(0)
+    def testMapQueriesUsesCache(self):
+        with SolverPool(2, template = self.template) as pool:
+            first = pool.mapQueries(self.queries, True)
+            self.assertEqual(getCacheStats()['misses'], 2)
+            second = pool.mapQueries(self.queries, True)
+        self.assertEqual(first, second)
+        self.assertEqual(getCacheStats()['hits'], 2)
+        self.assertEqual(getCacheStats()['misses'], 2)
+    def testMapQueriesMatchesMap(self):
+        with SolverPool(2, template = self.template) as pool:
+            built = pool.map([self.template.build(**query) for query in self.queries], True)
+            queried = pool.mapQueries(self.queries, True)
+        self.assertEqual(built, queried)
+        self.assertEqual(getCacheStats()['hits'], 2)
+
+class TestCacheScope(unittest.TestCase):
+    def setUp(self):
+        setSolver(ConstantBackend())
+        setCache(0)
+        N = [[Fraction(x) for x in row] for row in [[1, -1, 0], [0, 1, -1]]]
+        self.template = FeasibilityTemplate(N, [0, 1, 2], 'row')
+    def tearDown(self):
+        setSolver(None)
+        setCache(0)
+    def testCacheIsOnlyUsedInScope(self):
+        previous = useCache()
+        try:
+            solveProblem(self.template.build(0), True)
+            solveProblem(self.template.build(0), True)
+            self.assertEqual(getCacheStats()['hits'], 1)
+        finally:
+            restoreCache(previous)
+        self.assertEqual(getCacheStats(), {})
+
+if __name__ == '__main__':
+    unittest.main()
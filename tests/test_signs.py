@@ -0,0 +1,42 @@
+# Tests of the enumeration of sign combinations by checkAllSigns (see searchSigns)
+
+import io, itertools, unittest
+from contextlib import redirect_stdout
+from fractions import Fraction
+from LPSolvers import setSolver, setCache
+from ModelProcessing import checkAllSigns, flipSigns
+
+class RuleBackend:
+    # A back-end for which a sign problem is feasible unless it makes the first reversible
+    # reaction negative; the zero vector is returned, so every child has to be solved
+    def __init__(self, first):
+        self.first = first
+        self.calls = 0
+    def solve(self, problem, opt = False, skip = ()):
+        self.calls += 1
+        value = [] if problem.getBounds('V' + str(self.first)) == (None, -1) else Fraction(0)
+        return (value, {}) if opt else value
+
+class TestCheckAllSigns(unittest.TestCase):
+    def setUp(self):
+        self.N = [[Fraction(x) for x in row] for row in [[1, -1, 0, 0, 1], [0, 1, -1, 1, 0]]]
+        self.Rev = [0, 2, 3, 4]
+        self.backend = RuleBackend(self.Rev[0])
+        setSolver(self.backend)
+        setCache(0)
+    def tearDown(self):
+        setSolver(None)
+        setCache(0)
+    def findSigns(self, workers = 0):
+        with redirect_stdout(io.StringIO()):
+            return checkAllSigns(self.N, self.Rev, workers)
+    def testPrunesInfeasibleSubtrees(self):
+        expected = [flipSigns('+' + ''.join(signs)) for signs in itertools.product('+-', repeat = 3)]
+        self.assertEqual(self.findSigns(), expected)
+        # the root has two children, and each of the 1 + 2 + 4 feasible inner nodes has two
+        self.assertEqual(self.backend.calls, 2 + 2 * 7)
+    def testParallelSearchGivesSameCombinations(self):
+        self.assertEqual(self.findSigns(3), self.findSigns())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# Tests of the grouping of proportional vectors (see Utilities) and of findSubsets and findIsozymes
+# (see ModelProcessing) against the original implementations based on groupIdentical
+
+import random, unittest
+from fractions import Fraction
+from Utilities import findSparseRows, groupIdentical, canonicalMultiple, groupProportional
+from ModelProcessing import findSubsets, findIsozymes, transpose
+
+MULTIPLES = [1, -1, 2, -3, Fraction(1, 2), Fraction(-3, 4), Fraction(5, 3)]
+
+def makeProportionalRows(generator, m, n):
+    # Random rows, a third of which are multiples (possibly negative or fractional) of earlier ones
+    values = [1, -1, 2, -2, 3, Fraction(1, 2), Fraction(-2, 3)]
+    rows = []
+    for i in range(m):
+        if rows and generator.random() < 0.35:
+            c = generator.choice(MULTIPLES)
+            rows.append([Fraction(c) * x for x in generator.choice(rows)])
+        else:
+            row = [(Fraction(generator.choice(values)) if generator.random() < 0.5 else Fraction(0)) for j in range(n)]
+            if not any(row):
+                row[generator.randrange(n)] = Fraction(1)
+            rows.append(row)
+    return rows
+
+def findOriginalSubsets(Matrix):
+    # The original findSubsets: normalizes the rows by their first nonzero entry and groups them
+    ESubsets = {}
+    Mults = [[x for x in row if x][0] for row in Matrix]
+    redMatrix = [[x / Mults[i] for x in row] for i, row in enumerate(Matrix)]
+    for group in groupIdentical(redMatrix):
+        if len(group) > 1:
+            mults = [Mults[x] for x in group]
+            ESubsets[group[0]] = [[group[x], mults[x] / mults[0]] for x in range(1, len(group))]
+    return ESubsets
+
+def findOriginalIsozymes(N):
+    # The original findIsozymes with Full = False: groups the identical columns
+    ISubsets = {}
+    for x in groupIdentical(transpose(N)):
+        if len(x) > 1:
+            ISubsets[x[0]] = x[1:]
+    return ISubsets
+
+class TestSubsets(unittest.TestCase):
+    def setUp(self):
+        generator = random.Random(3)
+        self.matrices = [makeProportionalRows(generator, m, n) for (m, n) in [(4, 3), (8, 4), (12, 6), (20, 5), (30, 8)]]
+    def testCanonicalMultiple(self):
+        vector = [(0, Fraction(-3, 4)), (2, Fraction(3, 2)), (5, 6)]
+        key = canonicalMultiple(vector)
+        self.assertEqual(key, ((0, 1), (2, -2), (5, -8)))
+        for c in MULTIPLES:
+            self.assertEqual(canonicalMultiple([(j, c * x) for (j, x) in vector]), key)
+        self.assertNotEqual(canonicalMultiple([(0, 1), (2, -2), (5, 8)]), key)
+        self.assertNotEqual(canonicalMultiple([(0, 1), (3, -2), (5, -8)]), key)
+    def testGroupProportional(self):
+        for Matrix in self.matrices:
+            rows = findSparseRows(Matrix)
+            normalized = [[x / [y for y in row if y][0] for x in row] for row in Matrix]
+            self.assertEqual(sorted(groupProportional(rows)), sorted(groupIdentical(normalized)))
+            self.assertEqual(sorted(groupProportional(rows, False)), sorted(groupIdentical(Matrix)))
+    def testFindSubsets(self):
+        for Matrix in self.matrices:
+            self.assertEqual(findSubsets(Matrix, True), findOriginalSubsets(Matrix))
+            self.assertEqual(list(findSubsets(Matrix, True).keys()), list(findOriginalSubsets(Matrix).keys()))
+    def testFindIsozymes(self):
+        for Matrix in self.matrices:
+            N = transpose(Matrix)
+            self.assertEqual(findIsozymes(N), findOriginalIsozymes(N))
+            self.assertEqual(list(findIsozymes(N).keys()), list(findOriginalIsozymes(N).keys()))
+            Full = findIsozymes(N, Full = True)
+            self.assertEqual(Full, dict([(x, [y[0] for y in group]) for (x, group) in findOriginalSubsets(Matrix).items()]))
+
+if __name__ == '__main__':
+    unittest.main()